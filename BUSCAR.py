@@ -1,23 +1,20 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import re
 import altair as alt
 import pytz
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from datetime import date, timedelta
 import calendar 
 import json
 
-# --- CONFIGURAÇÃO DE ACESSO E LIMITES ---
-SCOPE = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive",
-]
-# Substitua pelo caminho real do seu arquivo de credenciais se ele não for carregado
-CREDS_FILE = "acesso.json" 
-SPREADSHEET_ID = "1X9trwwqVCwPXY2_O667WJcOR4CHNYbBjJDVsrYNZSgc"     
+from comum.alertas import contar_alertas
+from comum.backup import get_arquivo_backup, nome_aba_backup
+from comum.busca import MAX_RESULTADOS, get_indice_texto
+from comum.indices import AgregadoDiario, IndicePedidos
+from comum.moeda import br_money, formatar_moeda
+from comum.planilha import get_repositorio
+from comum.relatorio import get_exportador
+
+# --- LIMITES ---
 LIMITE_ALTA_DIARIO = 180000.00
 LIMITE_EMERG_DIARIO = 15000.00
 
@@ -36,129 +33,58 @@ COL_FORNECEDOR = "FORNECEDOR"
 # FUNÇÕES DE VALOR E FORMATAÇÃO (Mantidas)
 # -----------------------
 
-def valor_brasileiro(valor):
-    if pd.isna(valor) or valor is None:
-        return 0.0
-    
-    s = str(valor).strip()
-    s = re.sub(r"[R$\s\.]", "", s)
-    s = s.replace(",", ".")
-    
-    try:
-        return float(s)
-    except ValueError:
-        return 0.0
-
-def br_money(valor):
-    if pd.isna(valor):
-        return "R$ 0,00"
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-
 def safe_load(df):
-    df = df.copy()
-    
-    date_cols_to_process = [c for c in [COL_DATA] if c in df.columns]
-
-    for col in date_cols_to_process:
-        df[col] = pd.to_datetime(df[col], dayfirst=True, errors="coerce") 
-        df[col] = df[col].dt.normalize()  
-
-    if COL_VALOR in df.columns:
-        df[COL_VALOR] = df[COL_VALOR].apply(valor_brasileiro)
-    
+    # As abas já chegam tipadas do repositório (DATA datetime, VALOR float)
     if COL_DATA in df.columns:
-        df = df[pd.notna(df[COL_DATA])].copy()
+        df = df[pd.notna(df[COL_DATA])]
 
     return df
 
-# -----------------------
-# FUNÇÃO DE CÁLCULO DO NOME DA ABA DE BACKUP (ALTERADO APENAS A LÓGICA)
-# -----------------------
-
-def calculate_backup_sheet_name() -> str:
-    """Calcula o nome da aba da semana passada completa (Segunda a Sexta)."""
-    today = date.today()
-    # Encontra a segunda-feira da semana anterior à atual
-    monday_last_week = today - timedelta(days=today.weekday() + 7)
-    # Encontra a sexta-feira daquela mesma semana
-    friday_last_week = monday_last_week + timedelta(days=4)
-    
-    return f"{monday_last_week.strftime('%d.%m')} a {friday_last_week.strftime('%d.%m')}"
-
-
 # -----------------------
 # FUNÇÃO DE CARREGAMENTO DE DADOS (MANTIDA)
 # -----------------------
 
-@st.cache_data(ttl=300)
-def load_sheets(today_str):
-    gc = None
-    try:
-        creds_json = st.secrets.get("google_sheets_service_account")
-        
-        if creds_json:
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(creds_json), SCOPE)
-            gc = gspread.authorize(creds)
-        else:
-            creds = ServiceAccountCredentials.from_json_keyfile_name(CREDS_FILE, SCOPE)
-            gc = gspread.authorize(creds)
-            
-    except Exception as e:
-        st.error(f"Erro ao autenticar credenciais. Erro: {e}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    
-    try:
-        sh = gc.open_by_key(SPREADSHEET_ID)
-    except Exception as e:
-        st.error(f"Erro ao abrir a planilha. Verifique o ID e as credenciais. Erro: {e}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+# cache_resource: os DataFrames tipados são compartilhados entre as sessões em
+# vez de serializados e copiados a cada rerun (ninguém os altera no lugar).
+# ``versao`` (do repositório) renova o cache quando o atualizador em segundo
+# plano troca as abas; por isso não há TTL aqui.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_sheets(today_str, versao):
+    BACKUP_SHEET_NAME = nome_aba_backup()
+    abas = ["ALTA", "EMERGENCIAL", BACKUP_SHEET_NAME]
 
+    # Todas as abas chegam numa única requisição em lote. Uma falha aqui é
+    # lançada (e não guardada no cache): a próxima execução tenta de novo
+    frames = get_repositorio().carregar_abas(abas)
 
     def load_sheet_as_df(sheet_name):
-        try:
-            data = sh.worksheet(sheet_name).get_all_values() 
-            raw_headers = [h.strip().upper() for h in data[1]]
-            seen_headers = {}
-            unique_headers = []
-            
-            for header in raw_headers:
-                clean_header = header if header else ""
-                if clean_header in seen_headers:
-                    seen_headers[clean_header] += 1
-                    unique_headers.append(f"{clean_header}_{seen_headers[clean_header]}") 
-                else:
-                    seen_headers[clean_header] = 0
-                    unique_headers.append(clean_header)
-            
-            df = pd.DataFrame(data[2:], columns=unique_headers)
-            df.replace('', pd.NA, inplace=True)
-            df.dropna(how='all', inplace=True) 
-            
-            return safe_load(df) 
-        
-        except gspread.WorksheetNotFound:
+        if sheet_name not in frames:
             return pd.DataFrame()
+        try:
+            return safe_load(frames[sheet_name])
         except Exception as e:
             st.error(f"Erro ao carregar aba {sheet_name}. Erro: {e}")
             return pd.DataFrame()
 
     df_alta = load_sheet_as_df("ALTA")
     df_emerg = load_sheet_as_df("EMERGENCIAL")
-    
-    BACKUP_SHEET_NAME = calculate_backup_sheet_name()
     df_backup = load_sheet_as_df(BACKUP_SHEET_NAME)
 
-    return df_alta, df_emerg, df_backup
+    # Índice de pedidos montado uma vez por carga (posições iloc em cada aba)
+    indice_pedidos = IndicePedidos({
+        "ALTA": df_alta,
+        "EMERGENCIAL": df_emerg,
+        BACKUP_SHEET_NAME: df_backup,
+    })
 
+    # Agregados diários (ordem por data + somas acumuladas) para o filtro por
+    # período e o painel do dia: nenhum filtro sobre o DataFrame inteiro por rerun
+    agregados = {
+        "ALTA": AgregadoDiario(df_alta),
+        "EMERGENCIAL": AgregadoDiario(df_emerg),
+    }
 
-def sum_between(df, start, end):
-    if df.empty or COL_DATA not in df.columns or COL_VALOR not in df.columns:
-        return 0.0
-    
-    end_date_normalized = pd.to_datetime(end).normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-    mask = (df[COL_DATA] >= pd.to_datetime(start).normalize()) & (df[COL_DATA] <= end_date_normalized)
-    return df.loc[mask, COL_VALOR].sum()
+    return df_alta, df_emerg, df_backup, indice_pedidos, agregados
 
 
 # -----------------------
@@ -170,11 +96,34 @@ SAO_PAULO_TZ = pytz.timezone('America/Sao_Paulo')
 today_date_tz = datetime.datetime.now(SAO_PAULO_TZ).date()
 today_date_str = today_date_tz.isoformat() 
 
+# Abre o navegador das imagens do relatório (DASHBOARD) em segundo plano,
+# para que o primeiro envio não pague a partida do kaleido
+get_exportador()
+
 if st.sidebar.button("🔄 Recarregar Dados"):
-    st.cache_data.clear()
-    st.success("Cache limpo! Recarregando dados...")
-    
-df_alta, df_emerg, df_backup = load_sheets(today_date_str)
+    if get_repositorio().atualizado_em() is None:
+        # Nada em cache (a carga inicial falhou): o atualizador não tem o que
+        # atualizar, então load_sheets chama carregar_abas de novo logo abaixo
+        load_sheets.clear()
+        st.success("Recarregando dados...")
+    else:
+        # Só antecipa o atualizador do processo: nenhum cache é apagado e a
+        # página continua com os dados atuais até a troca
+        get_repositorio().solicitar_atualizacao()
+        st.success("Atualização solicitada! Os dados novos aparecem em instantes.")
+
+try:
+    df_alta, df_emerg, df_backup, indice_pedidos, agregados = load_sheets(today_date_str, get_repositorio().versao)
+except Exception as e:
+    st.error(f"Erro ao carregar as abas da planilha. Erro: {e}")
+    vazio = AgregadoDiario(pd.DataFrame())
+    df_alta, df_emerg, df_backup = pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    indice_pedidos, agregados = IndicePedidos({}), {"ALTA": vazio, "EMERGENCIAL": vazio}
+
+atualizado_em = get_repositorio().atualizado_em()
+if atualizado_em is not None:
+    hora_dados = datetime.datetime.fromtimestamp(atualizado_em, SAO_PAULO_TZ).strftime('%H:%M:%S')
+    st.sidebar.caption(f"🕒 Dados de {hora_dados}")
 
 
 # ----------------------------------------------------
@@ -186,8 +135,8 @@ st.sidebar.header("📊 Filtro por período")
 start_date = st.sidebar.date_input("Data inicial", datetime.date.today() - datetime.timedelta(days=30))
 end_date = st.sidebar.date_input("Data final", datetime.date.today())
 
-total_alta = sum_between(df_alta, start_date, end_date)
-total_emerg = sum_between(df_emerg, start_date, end_date)
+total_alta = agregados["ALTA"].total(start_date, end_date)
+total_emerg = agregados["EMERGENCIAL"].total(start_date, end_date)
 
 st.sidebar.markdown("### 💵 Totais filtrados:")
 st.sidebar.success(f"ALTA: {br_money(total_alta)}") 
@@ -206,36 +155,13 @@ hoje = pd.to_datetime(today_date_tz).normalize()
 data_amanha = hoje + datetime.timedelta(days=1)
 data_amanha_br = data_amanha.strftime('%d/%m') 
 
-qtde_nao_aprovada_total = 0 
-qtde_nao_aprovada_amanha = 0
-qtde_aprovada_total = 0 
-qtde_aprovada_amanha = 0
-
-if COL_STATUS in df_alta.columns and COL_DATA in df_alta.columns:
-    
-    df_alta["STATUS_CLEAN"] = df_alta[COL_STATUS].astype(str).str.strip().str.upper()
-    df_alta['DATA_ONLY'] = df_alta[COL_DATA].dt.normalize()
-
-    # 1. Base para 'Amanhã'
-    df_base_amanha = df_alta[
-        (df_alta['DATA_ONLY'] == data_amanha) & 
-        (pd.notna(df_alta['DATA_ONLY']))
-    ].copy()
-    
-    # 2. Base para 'Total Pendente' (Amanhã e dias seguintes)
-    # ALTERADO: Filtro >= para garantir o total futuro correto
-    df_base_total = df_alta[
-        (df_alta['DATA_ONLY'] >= data_amanha) & 
-        (pd.notna(df_alta['DATA_ONLY']))
-    ].copy()
-    
-    # Cálculos para NÃO APROVADAS
-    qtde_nao_aprovada_amanha = df_base_amanha[df_base_amanha["STATUS_CLEAN"] == "NÃO APROVADA"].shape[0]
-    qtde_nao_aprovada_total = df_base_total[df_base_total["STATUS_CLEAN"] == "NÃO APROVADA"].shape[0] 
+# Uma única passada sobre a aba em cache (sem colunas auxiliares nem cópias)
+alertas = contar_alertas(df_alta, hoje)
 
-    # Cálculos para APROVADAS
-    qtde_aprovada_amanha = df_base_amanha[df_base_amanha["STATUS_CLEAN"] == "APROVADA"].shape[0]
-    qtde_aprovada_total = df_base_total[df_base_total["STATUS_CLEAN"] == "APROVADA"].shape[0] 
+qtde_nao_aprovada_amanha = alertas.at["NÃO APROVADA", "AMANHÃ"]
+qtde_nao_aprovada_total = alertas.at["NÃO APROVADA", "FUTURAS"]
+qtde_aprovada_amanha = alertas.at["APROVADA", "AMANHÃ"]
+qtde_aprovada_total = alertas.at["APROVADA", "FUTURAS"]
 
 
 # CONSTRUÇÃO E EXIBIÇÃO DOS ALERTAS
@@ -253,6 +179,19 @@ mensagem_aprovada = (
 )
 st.sidebar.warning(mensagem_aprovada, icon="⚠️")
 
+# Relatório calculado só quando pedido (mede a memória de todas as abas)
+if st.sidebar.toggle("💾 Memória das abas em cache"):
+    relatorio = get_repositorio().relatorio_memoria()
+    st.sidebar.dataframe(relatorio, hide_index=True)
+
+# Células de DATA que não viraram data na carga (a linha é a da planilha)
+if st.sidebar.toggle("📅 Datas inválidas nas abas"):
+    invalidas = get_repositorio().relatorio_datas()
+    if invalidas.empty:
+        st.sidebar.success("Todas as datas foram reconhecidas.")
+    else:
+        st.sidebar.dataframe(invalidas, hide_index=True)
+
 # ----------------------------------------------------
 # 5. RODAPÉ (MANTIDO)
 # ----------------------------------------------------
@@ -286,7 +225,7 @@ st.title("Sistema de Consulta de Pedidos – *ALTA*, *EMERGENCIAL* e *BACKUP*")
 
 # Exibe o nome da aba de backup que está sendo rastreada
 try:
-    BACKUP_SHEET_NAME = calculate_backup_sheet_name()
+    BACKUP_SHEET_NAME = nome_aba_backup()
     st.info(f"Aba de Backup de Emergencial sendo rastreada: **{BACKUP_SHEET_NAME}**")
 except Exception:
     pass 
@@ -309,31 +248,40 @@ def show_result(row, sheet_name):
 
 
 if pedido_input:
-    pid = pedido_input.strip().upper() 
-    
-    def search_df(df, pid):
-        if COL_PEDIDO in df.columns and not df.empty:
-            return df[df[COL_PEDIDO].astype(str).str.strip().str.upper() == pid]
-        return pd.DataFrame()
-
-    res_alta = search_df(df_alta, pid)
-    res_emerg = search_df(df_emerg, pid)
-    res_backup = search_df(df_backup, pid) 
+    # Consulta no índice montado no carregamento: todas as ocorrências por aba
+    ocorrencias = indice_pedidos.buscar(pedido_input)
+    frames_por_aba = {"ALTA": df_alta, "EMERGENCIAL": df_emerg, BACKUP_SHEET_NAME: df_backup}
 
-    if res_alta.empty and res_emerg.empty and res_backup.empty:
-        st.warning(f"❌ Pedido '{pedido_input}' não encontrado em nenhuma aba.")
+    if not ocorrencias:
+        # Fora das abas atuais: consulta o arquivo das semanas anteriores
+        # (baixa as semanas ainda não arquivadas só nesse caso)
+        try:
+            with st.spinner("Procurando nas abas de backup anteriores..."):
+                arquivados = safe_load(get_arquivo_backup().localizar([pedido_input]))
+        except Exception as e:
+            st.error(f"Erro ao consultar as abas de backup anteriores. Erro: {e}")
+            arquivados = pd.DataFrame(columns=["ABA"])
+        if arquivados.empty:
+            st.warning(f"❌ Pedido '{pedido_input}' não encontrado em nenhuma aba.")
+            if get_arquivo_backup().completando:
+                st.info("As semanas de backup mais antigas ainda estão sendo baixadas. Tente de novo em instantes.")
+        for aba, linhas in arquivados.groupby("ABA", observed=True, sort=False):
+            repetido = f" ({len(linhas)} registros)" if len(linhas) > 1 else ""
+            st.info(f"🗄️ Pedido encontrado no arquivo de BACKUP: {aba}{repetido}")
+            for _, row in linhas.iterrows():
+                show_result(row, aba)
     else:
-        if not res_alta.empty:
-            st.success("🟦 Pedido encontrado na aba ALTA")
-            show_result(res_alta.iloc[0], "ALTA")
-
-        if not res_emerg.empty:
-            st.success("🟥 Pedido encontrado na aba EMERGENCIAL")
-            show_result(res_emerg.iloc[0], "EMERGENCIAL")
-            
-        if not res_backup.empty:
-            st.info(f"🗄️ Pedido encontrado na aba de BACKUP: {BACKUP_SHEET_NAME}")
-            show_result(res_backup.iloc[0], BACKUP_SHEET_NAME)
+        for aba, posicoes in ocorrencias.items():
+            repetido = f" ({len(posicoes)} registros)" if len(posicoes) > 1 else ""
+            if aba == "ALTA":
+                st.success(f"🟦 Pedido encontrado na aba ALTA{repetido}")
+            elif aba == "EMERGENCIAL":
+                st.success(f"🟥 Pedido encontrado na aba EMERGENCIAL{repetido}")
+            else:
+                st.info(f"🗄️ Pedido encontrado na aba de BACKUP: {aba}{repetido}")
+
+            for posicao in posicoes:
+                show_result(frames_por_aba[aba].iloc[posicao], aba)
 
 ## 2) Pesquisa por Data
 
@@ -343,14 +291,15 @@ data_busca = st.date_input("Selecione a data do pedido:", key="data_busca_2")
 if data_busca:
     data_busca_dt = pd.to_datetime(data_busca).normalize()  
 
-    mask_alta = pd.notna(df_alta[COL_DATA]) & (df_alta[COL_DATA] == data_busca_dt)
-    alta_filtrado = df_alta[mask_alta].copy()
-    
-    mask_emerg = pd.notna(df_emerg[COL_DATA]) & (df_emerg[COL_DATA] == data_busca_dt)
-    emerg_filtrado = df_emerg[mask_emerg].copy()
+    agregado_alta = agregados["ALTA"]
+    agregado_emerg = agregados["EMERGENCIAL"]
+
+    # Linhas do dia pelas posições ordenadas por data
+    alta_filtrado = agregado_alta.dia(data_busca_dt)
+    emerg_filtrado = agregado_emerg.dia(data_busca_dt)
     
-    total_valor_dia_alta = alta_filtrado[COL_VALOR].sum()
-    total_valor_dia_emerg = emerg_filtrado[COL_VALOR].sum()
+    total_valor_dia_alta = agregado_alta.total(data_busca_dt, data_busca_dt)
+    total_valor_dia_emerg = agregado_emerg.total(data_busca_dt, data_busca_dt)
     total_geral = total_valor_dia_alta + total_valor_dia_emerg
 
     st.markdown(f"### 💰 Gastos Diários em {data_busca_dt.strftime('%d/%m/%Y')}")
@@ -380,12 +329,12 @@ if data_busca:
     if not alta_filtrado.empty:
         st.write("### 🟦 Pedidos da ALTA")
         alta_show = alta_filtrado.copy()
-        alta_show[COL_VALOR] = alta_show[COL_VALOR].apply(br_money)
+        alta_show[COL_VALOR] = formatar_moeda(alta_show[COL_VALOR])
         st.dataframe(alta_show[[COL_PEDIDO, COL_VALOR] + [c for c in COLS_BASE if c != COL_PEDIDO]], hide_index=True)
         
         # Gráfico Alta
         top_alta = alta_filtrado.sort_values(by=COL_VALOR, ascending=False).head(10).copy()
-        top_alta['VALOR_TEXTO'] = top_alta[COL_VALOR].apply(br_money)
+        top_alta['VALOR_TEXTO'] = formatar_moeda(top_alta[COL_VALOR])
         chart_bar_alta = alt.Chart(top_alta).mark_bar(color='rgb(66, 133, 244)').encode(
             x=alt.X(COL_VALOR, title='', axis=None),
             y=alt.Y(COL_PEDIDO, sort='-x', title=''),
@@ -399,12 +348,12 @@ if data_busca:
     if not emerg_filtrado.empty:
         st.write("### 🟥 Pedidos da EMERGENCIAL")
         emerg_show = emerg_filtrado.copy()
-        emerg_show[COL_VALOR] = emerg_show[COL_VALOR].apply(br_money)
+        emerg_show[COL_VALOR] = formatar_moeda(emerg_show[COL_VALOR])
         st.dataframe(emerg_show[[COL_PEDIDO, COL_VALOR] + [c for c in COLS_BASE if c != COL_PEDIDO]], hide_index=True)
 
         # Gráfico Emergencial
         top_emerg = emerg_filtrado.sort_values(by=COL_VALOR, ascending=False).head(10).copy()
-        top_emerg['VALOR_TEXTO'] = top_emerg[COL_VALOR].apply(br_money)
+        top_emerg['VALOR_TEXTO'] = formatar_moeda(top_emerg[COL_VALOR])
         chart_bar_emerg = alt.Chart(top_emerg).mark_bar(color='red').encode(
             x=alt.X(COL_VALOR, title='', axis=None),
             y=alt.Y(COL_PEDIDO, sort='-x', title=''),
@@ -416,20 +365,24 @@ if data_busca:
         st.altair_chart((chart_bar_emerg + chart_text_emerg).properties(height=300), use_container_width=True)
 
     if not alta_filtrado.empty or not emerg_filtrado.empty:
-        df_combinado = pd.concat([alta_filtrado, emerg_filtrado], ignore_index=True)
-        df_filtrado_pedido = df_combinado[df_combinado[COL_STATUS].astype(str).str.strip().str.upper() == "PEDIDO"].copy()
+        # Somas por unidade já pré-calculadas por (dia, status, unidade)
+        gastos_por_unidade = pd.concat([
+            agregado_alta.por_unidade(data_busca_dt, status="PEDIDO"),
+            agregado_emerg.por_unidade(data_busca_dt, status="PEDIDO"),
+        ])
         
-        if not df_filtrado_pedido.empty:
+        if not gastos_por_unidade.empty:
             st.markdown("---")
             st.subheader(f"🏢 Gasto por Unidade Suprida (Status: PEDIDO) em {data_busca_dt.strftime('%d/%m/%Y')}")
-            gastos_por_unidade = df_filtrado_pedido.groupby(COL_UNIDADE)[COL_VALOR].sum().reset_index()
+            gastos_por_unidade = gastos_por_unidade.groupby(level=0).sum().rename_axis(COL_UNIDADE).rename(COL_VALOR).reset_index()
             gastos_show = gastos_por_unidade.sort_values(by=COL_VALOR, ascending=False)
+            gastos_show['VALOR_TEXTO'] = formatar_moeda(gastos_show[COL_VALOR])
             
             for index, row in gastos_show.iterrows():
                 st.markdown(
                     f"""<div style="display: flex; justify-content: space-between; padding: 5px 0; border-bottom: 1px solid #282828;">
                         <span style='font-size: 15px; font-weight: 500; color: white;'>{row[COL_UNIDADE]}</span>
-                        <span style='font-size: 15px; font-weight: 500; color: #AAAAAA;'>{br_money(row[COL_VALOR])}</span>
+                        <span style='font-size: 15px; font-weight: 500; color: #AAAAAA;'>{row['VALOR_TEXTO']}</span>
                     </div>""", unsafe_allow_html=True
                 ) 
         else:
@@ -437,4 +390,34 @@ if data_busca:
 
 
     else:
-        st.info(f"Nenhum pedido encontrado para calcular gastos por unidade em {data_busca_dt.strftime('%d/%m/%Y')}.")
\ No newline at end of file
+        st.info(f"Nenhum pedido encontrado para calcular gastos por unidade em {data_busca_dt.strftime('%d/%m/%Y')}.")
+
+## 3) Busca livre (fornecedor, carro, observações)
+
+st.subheader("🔎 Buscar por fornecedor, carro ou observação")
+CAMPOS_LIVRE = {"Todos os campos": None, "Fornecedor": [COL_FORNECEDOR], "Carro/Utilização": [COL_CARRO],
+                "Observações": ["OBSERVAÇÕES"], "Pedido": [COL_PEDIDO]}
+col_busca, col_campo = st.columns([3, 1])
+consulta_livre = col_busca.text_input("Palavras (sem acento, prefixo ou com erro de digitação):",
+                                      placeholder="ex.: 24600, mercedes, pneu")
+campo_livre = col_campo.selectbox("Campo:", list(CAMPOS_LIVRE))
+
+if consulta_livre:
+    # Índice do processo: a cada nova versão dos dados só as linhas que
+    # mudaram são reindexadas (as semanas arquivadas entram como estão)
+    indice_texto = get_indice_texto()
+    indice_texto.atualizar({
+        "ALTA": df_alta, "EMERGENCIAL": df_emerg, BACKUP_SHEET_NAME: df_backup,
+        **get_arquivo_backup().semanas(),
+    })
+    achados = indice_texto.buscar_linhas(consulta_livre, CAMPOS_LIVRE[campo_livre])
+
+    if achados.empty:
+        st.warning(f"❌ Nada encontrado para '{consulta_livre}'.")
+    else:
+        limite = " (primeiros resultados)" if len(achados) >= MAX_RESULTADOS else ""
+        st.info(f"Registros encontrados: **{len(achados)}**{limite}")
+        achados[COL_VALOR] = formatar_moeda(achados[COL_VALOR])
+        achados[COL_DATA] = pd.to_datetime(achados[COL_DATA]).dt.strftime('%d/%m/%Y')
+        colunas = ["ABA", COL_DATA, COL_PEDIDO, COL_VALOR, COL_STATUS, COL_UNIDADE, COL_CARRO, COL_FORNECEDOR, "OBSERVAÇÕES"]
+        st.dataframe(achados[[c for c in colunas if c in achados.columns]], hide_index=True)
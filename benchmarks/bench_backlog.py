@@ -0,0 +1,74 @@
+"""
+Benchmark: resolução em lote do BACKLOG (perform_search) contra a busca
+antiga, pedido a pedido, com 10 mil pedidos colados e abas de 100 mil linhas.
+
+A busca antiga é medida numa amostra de pedidos e extrapolada, porque
+rodá-la inteira leva minutos.
+
+Uso: python benchmarks/bench_backlog.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pages.BACKLOG import COLUNA_CARRO, perform_search
+
+LINHAS_POR_ABA = 100_000
+PEDIDOS_COLADOS = 10_000
+AMOSTRA_ANTIGA = 200
+
+
+# --- Implementação antiga, copiada de pages/BACKLOG.py para comparação ---
+
+def search_pedido(pedido, data, carro_selecionado):
+    found_data = {
+        "Pedido": pedido, "Origem": "", "Data": "", COLUNA_CARRO: "",
+        "Status": "Pedido Não Encontrado", "Carro Foco": carro_selecionado
+    }
+    for sheet_name, df in data.items():
+        match = df[df['PEDIDO'] == pedido]
+        if not match.empty:
+            row = match.iloc[0]
+            found_data.update({
+                "Origem": sheet_name, "Data": row.get('DATA', ''),
+                COLUNA_CARRO: row.get(COLUNA_CARRO, ''), "Status": row.get('STATUS', '')
+            })
+            return found_data
+    return found_data
+
+
+def gerar_abas():
+    rng = np.random.default_rng(7)
+    abas = {}
+    for i, nome in enumerate(["ALTA", "EMERGENCIAL", "01.09 a 05.09"]):
+        pedidos = rng.integers(100_000, 400_000, size=LINHAS_POR_ABA)
+        abas[nome] = pd.DataFrame({
+            "PEDIDO": pedidos.astype(str),
+            "DATA": "01/09/2025",
+            COLUNA_CARRO: [f"CARRO {i}"] * LINHAS_POR_ABA,
+            "STATUS": rng.choice(["APROVADA", "PEDIDO", "COTAÇÃO"], size=LINHAS_POR_ABA),
+        })
+    return abas
+
+
+if __name__ == "__main__":
+    abas = gerar_abas()
+    pedidos = sorted({str(p) for p in np.random.default_rng(3).integers(100_000, 450_000, size=PEDIDOS_COLADOS)})
+    print(f"{len(pedidos)} pedidos, 3 abas de {LINHAS_POR_ABA} linhas")
+
+    inicio = time.perf_counter()
+    novo = perform_search(pedidos, abas, "BACKLOG")
+    tempo_novo = time.perf_counter() - inicio
+
+    amostra = pedidos[:AMOSTRA_ANTIGA]
+    inicio = time.perf_counter()
+    antigo = [search_pedido(p, abas, "BACKLOG") for p in amostra]
+    tempo_antigo = (time.perf_counter() - inicio) * len(pedidos) / len(amostra)
+
+    print(f"{'busca pedido a pedido (estimado)':<34} {tempo_antigo:8.3f} s")
+    print(f"{'perform_search em lote':<34} {tempo_novo:8.3f} s")
+    print("mesmos resultados na amostra:", antigo == novo[:AMOSTRA_ANTIGA])
@@ -0,0 +1,130 @@
+"""
+Benchmark: busca de pedidos em dois anos de abas de backup semanais
+("dd.mm a dd.mm"), baixando as abas a cada busca (como seria sem o arquivo)
+contra ``ArquivoBackup`` (semanas baixadas uma vez, sob demanda, e
+consultadas por um índice).
+
+Mede, sobre um ``BackendMemoria`` (sem latência de rede), o tempo local e
+as requisições de cada caso; o tempo estimado soma ``LATENCIA`` segundos
+por requisição, como contra o Google Sheets:
+
+- sem arquivo: uma busca de pedido ausente baixa todas as semanas, em lotes
+- primeira falta: o arquivo lista as abas e baixa na hora só as
+  ``SEMANAS_POR_BUSCA`` mais recentes; o resto vem em segundo plano
+- acertos: pedidos já arquivados (nenhuma requisição)
+- reinício: novo processo lendo o arquivo do disco (nenhuma requisição)
+
+Uso: python benchmarks/bench_backup.py
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.backup import ABAS_POR_LOTE, SEMANAS_POR_BUSCA, ArquivoBackup, nome_aba_backup
+from comum.planilha import BackendMemoria, RepositorioPlanilha
+
+SEMANAS = 104
+LINHAS_POR_SEMANA = 400
+BUSCAS = 200
+LATENCIA = 0.4
+HOJE = date(2025, 10, 16)
+CABECALHO = ["DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "PEDIDO", "VALOR", "FORNECEDOR", "STATUS"]
+
+
+def gerar_planilha():
+    rng = np.random.default_rng(3)
+    abas = {"ALTA": [["ALTA"], CABECALHO], "EMERGENCIAL": [["EMERGENCIAL"], CABECALHO]}
+    segunda = HOJE - timedelta(days=HOJE.weekday() + 7)
+    pedido = 100_000
+    for semana in range(SEMANAS + 1):
+        inicio = segunda - timedelta(weeks=semana)
+        nome = f"{inicio.strftime('%d.%m')} a {(inicio + timedelta(days=4)).strftime('%d.%m')}"
+        linhas = [["BACKUP"], CABECALHO]
+        for _ in range(LINHAS_POR_SEMANA):
+            dia = inicio + timedelta(days=int(rng.integers(0, 5)))
+            linhas.append([
+                dia.strftime("%d/%m/%Y"), "NEVES", "24600", str(pedido),
+                f"R$ {rng.uniform(10, 5000):.2f}".replace(".", ","), "FORNECEDOR X", "PEDIDO",
+            ])
+            pedido += 1
+        abas[nome] = linhas
+    return abas, pedido
+
+
+def sem_arquivo(backend, pedido):
+    """Baixa todas as semanas (em lotes) e procura o pedido em cada uma."""
+    semanas = [aba for aba in backend.listar_abas() if " a " in aba and aba != nome_aba_backup(HOJE)]
+    for i in range(0, len(semanas), ABAS_POR_LOTE):
+        for linhas in backend.ler_varias(semanas[i:i + ABAS_POR_LOTE]).values():
+            if any(len(linha) > 3 and linha[3] == pedido for linha in linhas[2:]):
+                return True
+    return False
+
+
+def medir(backend, funcao):
+    antes = backend.chamadas
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, backend.chamadas - antes, resultado
+
+
+def linha(nome, segundos, requisicoes):
+    print(f"{nome:<34} {segundos * 1000:>10.2f} {requisicoes:>6} {segundos + requisicoes * LATENCIA:>13.2f}")
+
+
+if __name__ == "__main__":
+    abas, ultimo = gerar_planilha()
+    backend = BackendMemoria(abas)
+    rng = np.random.default_rng(9)
+    # Pedidos das semanas anteriores à semana passada (a primeira aba gerada)
+    alvos = [str(p) for p in rng.integers(100_000 + LINHAS_POR_SEMANA, ultimo, BUSCAS)]
+    print(f"{SEMANAS} semanas arquivadas, {SEMANAS * LINHAS_POR_SEMANA:,} linhas; latência estimada {LATENCIA} s/requisição")
+    print(f"{'caso':<34} {'local (ms)':>10} {'req.':>6} {'estimado (s)':>13}")
+
+    segundos, requisicoes, achou = medir(backend, lambda: sem_arquivo(backend, "999"))
+    assert not achou
+    linha("sem arquivo (pedido ausente)", segundos, requisicoes)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        repositorio = RepositorioPlanilha(backend)
+        arquivo = ArquivoBackup(repositorio, pasta)
+        # Pedido da semana arquivada mais recente: está entre as baixadas na hora
+        recente = str(100_000 + LINHAS_POR_SEMANA)
+        segundos, requisicoes, achados = medir(backend, lambda: arquivo.localizar([recente], hoje=HOJE))
+        assert len(achados) == 1 and achados["PEDIDO"].iloc[0] == recente
+        assert len(arquivo.abas) >= SEMANAS_POR_BUSCA
+        linha(f"arquivo: primeira falta ({SEMANAS_POR_BUSCA} semanas)", segundos, requisicoes)
+        segundos, requisicoes, _ = medir(backend, arquivo.aguardar)
+        assert len(arquivo.abas) == SEMANAS and arquivo.ultimo_erro is None
+        linha("arquivo: resto em segundo plano", segundos, requisicoes)
+
+        tempos = []
+        antes = backend.chamadas
+        for alvo in alvos:
+            segundos, _, achados = medir(backend, lambda: arquivo.localizar([alvo], hoje=HOJE))
+            assert len(achados) == 1
+            tempos.append(segundos)
+        linha("arquivo: acerto (mediana)", statistics.median(tempos), backend.chamadas - antes)
+
+        segundos, requisicoes, achados = medir(backend, lambda: arquivo.localizar(["999"], hoje=HOJE))
+        assert achados.empty
+        linha("arquivo: pedido inexistente", segundos, requisicoes)
+
+        segundos, requisicoes, achados = medir(backend, lambda: arquivo.localizar(alvos, hoje=HOJE))
+        assert set(achados["PEDIDO"]) == set(alvos)
+        linha(f"arquivo: {BUSCAS} pedidos de uma vez", segundos, requisicoes)
+
+        reiniciado = ArquivoBackup(repositorio, pasta)
+        segundos, requisicoes, achados = medir(backend, lambda: reiniciado.localizar([alvos[1]], hoje=HOJE))
+        assert len(achados) == 1
+        linha("reinício: leitura do disco + busca", segundos, requisicoes)
+
+        print(f"\nsemanas no arquivo: {len(arquivo.abas)}, mais recente '{arquivo.abas[0]}', "
+              f"mais antiga '{arquivo.abas[-1]}'; semana passada ('{nome_aba_backup(HOJE)}') "
+              f"fora do arquivo: {nome_aba_backup(HOJE) not in arquivo.abas}")
@@ -0,0 +1,146 @@
+"""
+Benchmark: busca livre (PEDIDO, FORNECEDOR, CARRO | UTILIZAÇÃO e
+OBSERVAÇÕES) em ALTA, EMERGENCIAL e um ano de semanas de backup, por
+``IndiceTexto`` contra a varredura das colunas a cada consulta
+(``str.contains`` sobre os textos normalizados, sem erro de digitação).
+
+Mede a montagem do índice, a atualização quando o atualizador troca a
+cauda da ALTA (algumas linhas alteradas e novas) contra a remontagem do
+zero, e a mediana das consultas: exata, prefixo, sem acento, com erro de
+digitação e com duas palavras. Confere que ``linhas`` ignora as linhas
+que saíram numa ``atualizar`` depois da busca.
+
+Uso: python benchmarks/bench_busca.py
+"""
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.busca import CAMPOS_BUSCA, IndiceTexto, palavras
+
+LINHAS_ALTA = 40_000
+LINHAS_EMERG = 10_000
+SEMANAS = 52
+LINHAS_POR_SEMANA = 400
+CAUDA = 200
+REPETICOES = 200
+
+FORNECEDORES = [
+    "MERCEDES-BENZ DO BRASIL", "Auto Peças São João", "VOLVO", "Retífica Irmãos Araújo",
+    "PNEUS MINAS", "Elétrica Conceição", "Scania Latin America", "Borracharia do Zé",
+]
+OBSERVACOES = ["", "", "troca de pneu", "revisão preventiva", "URGENTE - carro parado", "aguardando nota fiscal"]
+CONSULTAS = {
+    "exata (carro)": "24600",
+    "prefixo": "merc",
+    "sem acento": "retifica araujo",
+    "erro de digitação": "mercedez",
+    "duas palavras": "pneu 24600",
+}
+
+
+def gerar_aba(rng, linhas, primeiro_pedido):
+    return pd.DataFrame({
+        "PEDIDO": [str(p) for p in range(primeiro_pedido, primeiro_pedido + linhas)],
+        "FORNECEDOR": rng.choice(FORNECEDORES, linhas),
+        "CARRO | UTILIZAÇÃO": [str(c) for c in rng.integers(20_000, 30_000, linhas)],
+        "OBSERVAÇÕES": rng.choice(OBSERVACOES, linhas),
+    }, index=pd.RangeIndex(3, linhas + 3))
+
+
+def gerar_frames():
+    rng = np.random.default_rng(11)
+    frames = {"ALTA": gerar_aba(rng, LINHAS_ALTA, 100_000), "EMERGENCIAL": gerar_aba(rng, LINHAS_EMERG, 500_000)}
+    for semana in range(SEMANAS):
+        frames[f"SEMANA {semana:02d}"] = gerar_aba(rng, LINHAS_POR_SEMANA, 1_000_000 + semana * LINHAS_POR_SEMANA)
+    return frames
+
+
+def nova_cauda(df, rng):
+    """Como o atualizador: a cauda da aba relida (CAUDA linhas alteradas e CAUDA novas)."""
+    novo = df.copy()
+    novo.iloc[-CAUDA:, 1] = rng.choice(FORNECEDORES, CAUDA)
+    extra = gerar_aba(rng, CAUDA, 900_000)
+    extra.index = pd.RangeIndex(novo.index[-1] + 1, novo.index[-1] + 1 + CAUDA)
+    return pd.concat([novo, extra])
+
+
+def normalizar(serie):
+    """Textos sem acentos e em maiúsculas, como o índice faz."""
+    texto = serie.fillna("").astype(str).str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True)
+    return texto.str.upper()
+
+
+def varredura(normalizados, consulta):
+    """Linhas com todas as palavras em alguma coluna (sem índice)."""
+    achados = 0
+    for colunas in normalizados.values():
+        mascara = None
+        for palavra in palavras(consulta):
+            contem = np.logical_or.reduce([col.str.contains(palavra, regex=False).to_numpy() for col in colunas])
+            mascara = contem if mascara is None else mascara & contem
+        achados += int(mascara.sum())
+    return achados
+
+
+def mediana(funcao, repeticoes=REPETICOES):
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+if __name__ == "__main__":
+    frames = gerar_frames()
+    total = sum(len(df) for df in frames.values())
+    print(f"{len(frames)} abas, {total:,} linhas, campos {CAMPOS_BUSCA}")
+
+    indice = IndiceTexto()
+    inicio = time.perf_counter()
+    indice.atualizar(frames)
+    montagem = time.perf_counter() - inicio
+    print(f"montagem do índice: {montagem:.2f} s ({len(indice._vocabulario):,} palavras)")
+
+    segundos, _ = mediana(lambda: indice.atualizar(frames), 20)
+    print(f"atualizar sem mudanças: {segundos * 1000:.3f} ms")
+
+    atualizados = dict(frames, ALTA=nova_cauda(frames["ALTA"], np.random.default_rng(1)))
+    antes = indice.linhas_indexadas
+    inicio = time.perf_counter()
+    indice.atualizar(atualizados)
+    incremental = time.perf_counter() - inicio
+    do_zero = IndiceTexto()
+    inicio = time.perf_counter()
+    do_zero.atualizar(atualizados)
+    remontagem = time.perf_counter() - inicio
+    print(f"nova cauda da ALTA: incremental {incremental * 1000:.1f} ms "
+          f"({indice.linhas_indexadas - antes} linhas reindexadas), do zero {remontagem * 1000:.1f} ms")
+    for consulta in CONSULTAS.values():
+        assert indice.buscar(consulta, limite=10**9) == do_zero.buscar(consulta, limite=10**9), consulta
+
+    normalizados = {aba: [normalizar(df[c]) for c in CAMPOS_BUSCA] for aba, df in atualizados.items()}
+    print(f"\n{'consulta':<20} {'texto':<18} {'índice (ms)':>11} {'achados':>8} {'varredura (ms)':>15} {'achados':>8}")
+    for nome, consulta in CONSULTAS.items():
+        segundos, resultados = mediana(lambda: indice.buscar(consulta))
+        total_indice = len(indice.buscar(consulta, limite=10**9))
+        segundos_varredura, achados = mediana(lambda: varredura(normalizados, consulta), 5)
+        print(f"{nome:<20} {consulta:<18} {segundos * 1000:>11.3f} {total_indice:>8,} "
+              f"{segundos_varredura * 1000:>15.1f} {achados:>8,}")
+
+    # Resultados de uma busca anterior a uma atualizar que tirou a ALTA:
+    # as linhas que sumiram são ignoradas, e buscar_linhas já vem coerente
+    resultados = indice.buscar(CONSULTAS["prefixo"], limite=10**9)
+    sem_alta = {aba: df for aba, df in atualizados.items() if aba != "ALTA"}
+    indice.atualizar(sem_alta)
+    restantes = indice.linhas(resultados)
+    assert "ALTA" not in set(restantes["ABA"]) and len(restantes) == sum(aba != "ALTA" for (aba, _), _ in resultados)
+    achados = indice.buscar_linhas(CONSULTAS["prefixo"], limite=10**9)
+    assert achados[["ABA", "LINHA", "RELEVÂNCIA"]].equals(restantes[["ABA", "LINHA", "RELEVÂNCIA"]])
+    print(f"\nlinhas após tirar a ALTA: {len(restantes):,} de {len(resultados):,} resultados, sem KeyError")
@@ -0,0 +1,64 @@
+"""
+Benchmark: tamanho do que é enviado à planilha para cadastrar um pedido,
+com a aba ALTA crescendo. A gravação antiga reescrevia a aba inteira
+(``conexao.update`` com todas as linhas); ``RepositorioPlanilha.acrescentar``
+manda só a linha nova num append.
+
+Roda sobre ``BackendMemoria`` (planilha em memória), que registra o tamanho
+em JSON de cada escrita.
+
+Uso: python benchmarks/bench_cadastro.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.planilha import ABA_ALTA, BackendMemoria, RepositorioPlanilha
+from comum.tipos import para_planilha
+
+TAMANHOS = [1_000, 10_000, 100_000]
+CABECALHO = [
+    "DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "PEDIDO", "VALOR", "FORNECEDOR",
+    "STATUS", "AVALIAÇÃO", "OBSERVAÇÕES",
+]
+
+
+def gerar_aba(linhas):
+    dados = [
+        [f"{1 + i % 28:02d}/09/2025", "NEVES", "MANUTENÇÃO", str(100_000 + i),
+         f"R$ {i % 9_999},{i % 100:02d}", "FORNECEDOR X", "PEDIDO", "UNIDADE", ""]
+        for i in range(linhas)
+    ]
+    return [["PLANILHA ALTA"], list(CABECALHO)] + dados
+
+
+def registro(pedido):
+    return {
+        "DATA": "16/10/2025", "UNIDADE": "NEVES", "CARRO | UTILIZAÇÃO": "24600",
+        "PEDIDO": pedido, "VALOR": 1234.5, "FORNECEDOR": "FORNECEDOR Y",
+        "STATUS": "APROVADA", "AVALIAÇÃO": "UNIDADE", "OBSERVAÇÕES": "",
+    }
+
+
+def bytes_reescrita(df):
+    # O que conexao.update enviava: a aba inteira mais a linha nova
+    valores = para_planilha(df).values.tolist()
+    return len(json.dumps({"values": valores}, ensure_ascii=False).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    print(f"{'linhas na aba':>14} {'reescrita (bytes)':>18} {'append (bytes)':>15} {'append (ms)':>12}")
+    for tamanho in TAMANHOS:
+        backend = BackendMemoria({ABA_ALTA: gerar_aba(tamanho)})
+        repositorio = RepositorioPlanilha(backend)
+        df = repositorio.carregar_aba(ABA_ALTA)
+
+        inicio = time.perf_counter()
+        linha = repositorio.acrescentar(ABA_ALTA, [registro("999999")])
+        tempo = (time.perf_counter() - inicio) * 1000
+
+        assert "999999" in set(repositorio.carregar_aba(ABA_ALTA)["PEDIDO"])
+        assert linha == tamanho + 3
+        print(f"{tamanho:>14} {bytes_reescrita(df):>18} {backend.bytes_enviados[-1]:>15} {tempo:>12.1f}")
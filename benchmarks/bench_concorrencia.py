@@ -0,0 +1,147 @@
+"""
+Simulação: gravações concorrentes na aba ALTA com cópias em cache antigas.
+
+Dois repositórios (duas instâncias do app, cada uma com o seu cache e a sua
+fila de gravação) gravam pedidos sobre o mesmo ``BackendMemoria``, com TTL
+de leitura de uma hora, enquanto uma "pessoa" acrescenta e edita linhas
+direto na planilha. Parte dos pedidos é enviada pelas duas instâncias e
+pela pessoa ao mesmo tempo.
+
+Confere que nenhum pedido fica duplicado nem se perde, que cada envio
+recebeu a linha certa (ou a recusa) e que o cache de cada instância, depois
+da atualização, é igual a uma carga nova da planilha. Mostra também quantas
+leituras cada gravação custou.
+
+Uso: python benchmarks/bench_concorrencia.py
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.cadastro import FilaEscrita
+from comum.planilha import ABA_ALTA, BackendMemoria, RepositorioPlanilha
+
+LINHAS = 5_000
+ENVIOS_POR_SESSAO = 40
+SESSOES_POR_INSTANCIA = 4
+TTL_LEITURA = 3_600
+CABECALHO = [
+    "DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "PEDIDO", "VALOR", "FORNECEDOR",
+    "STATUS", "AVALIAÇÃO", "OBSERVAÇÕES",
+]
+
+
+def linha_planilha(pedido, obs=""):
+    return ["16/10/2025", "NEVES", "MANUTENÇÃO", pedido, "R$ 10,00", "FORNECEDOR X", "PEDIDO", "UNIDADE", obs]
+
+
+def registro(pedido):
+    return {
+        "DATA": "16/10/2025", "UNIDADE": "NEVES", "CARRO | UTILIZAÇÃO": "24600",
+        "PEDIDO": pedido, "VALOR": 10.0, "FORNECEDOR": "FORNECEDOR Y",
+        "STATUS": "PEDIDO", "AVALIAÇÃO": "UNIDADE", "OBSERVAÇÕES": "",
+    }
+
+
+def pessoa(backend, pedidos, parar):
+    """
+    Acrescenta pedidos (os que ainda não estão na planilha) e edita
+    observações das últimas linhas direto na planilha.
+    """
+    rng = random.Random(7)
+    fila = list(pedidos)
+    while fila and not parar.is_set():
+        with backend.trava:
+            aba = backend.abas[ABA_ALTA]
+            if fila and rng.random() < 0.5:
+                pedido = fila.pop()
+                if any(len(linha) > 3 and linha[3] == pedido for linha in aba):
+                    continue
+                while aba and not any(aba[-1]):
+                    aba.pop()
+                aba.append(linha_planilha(pedido))
+            else:
+                alvo = aba[rng.randrange(max(2, len(aba) - 50), len(aba))]
+                alvo[-1] = f"editado {rng.random():.6f}"
+        time.sleep(0.002)
+
+
+def main():
+    backend = BackendMemoria({
+        ABA_ALTA: [["PLANILHA ALTA"], list(CABECALHO)]
+        + [linha_planilha(str(100_000 + i)) for i in range(LINHAS)]
+        + [[""] * len(CABECALHO)] * 50
+    })
+    instancias = [RepositorioPlanilha(backend, ttl=TTL_LEITURA) for _ in range(2)]
+    for repositorio in instancias:
+        repositorio.carregar_aba(ABA_ALTA)
+    filas = [FilaEscrita(repositorio, intervalo=0.02) for repositorio in instancias]
+
+    # Pedidos novos; os múltiplos de 3 também são gravados pela pessoa
+    pedidos = [str(900_000 + i) for i in range(ENVIOS_POR_SESSAO * SESSOES_POR_INSTANCIA)]
+    resultados = []
+    trava_resultados = threading.Lock()
+
+    def sessao(fila, semente):
+        rng = random.Random(semente)
+        for pedido in rng.sample(pedidos, ENVIOS_POR_SESSAO):
+            resultado = fila.enviar(ABA_ALTA, [registro(pedido)]).result(timeout=60)[0]
+            with trava_resultados:
+                resultados.append(resultado)
+
+    parar = threading.Event()
+    leituras_antes = backend.chamadas
+    humano = threading.Thread(target=pessoa, args=(backend, pedidos[::3], parar))
+    sessoes = [
+        threading.Thread(target=sessao, args=(fila, 10 * n + s))
+        for n, fila in enumerate(filas) for s in range(SESSOES_POR_INSTANCIA)
+    ]
+    inicio = time.perf_counter()
+    humano.start()
+    for thread in sessoes:
+        thread.start()
+    for thread in sessoes:
+        thread.join()
+    parar.set()
+    humano.join()
+    duracao = time.perf_counter() - inicio
+
+    aba = backend.abas[ABA_ALTA]
+    contagem = Counter(linha[3] for linha in aba[2:] if len(linha) > 3 and linha[3])
+    duplicados = [pedido for pedido, n in contagem.items() if n > 1]
+    gravados = [r for r in resultados if r["LINHA"] is not None]
+    recusados = [r for r in resultados if r["ERRO"] is not None]
+    linhas_erradas = [r for r in gravados if aba[r["LINHA"] - 1][3] != r["PEDIDO"]]
+    recusas_indevidas = [r for r in recusados if contagem[r["PEDIDO"]] == 0]
+    escritas = len(backend.bytes_enviados)
+
+    print(f"{len(resultados)} envios em {duracao:.2f} s: {len(gravados)} gravados, {len(recusados)} recusados")
+    print(f"pedidos duplicados na planilha: {len(duplicados)}")
+    print(f"envios gravados em linha errada: {len(linhas_erradas)}")
+    print(f"recusas sem o pedido na planilha: {len(recusas_indevidas)}")
+    enviados = {r["PEDIDO"] for r in resultados}
+    print(f"pedidos enviados e ausentes: {len(enviados - set(contagem))}")
+    print(f"requisições: {backend.chamadas - leituras_antes} para {escritas} appends")
+
+    referencia = RepositorioPlanilha(backend).carregar_aba(ABA_ALTA)
+    for n, repositorio in enumerate(instancias):
+        repositorio.expirar()
+        repositorio.atualizar([ABA_ALTA])
+        try:
+            pd.testing.assert_frame_equal(repositorio.carregar_aba(ABA_ALTA), referencia)
+            print(f"cache da instância {n + 1} igual à planilha: True")
+        except AssertionError as erro:
+            print(f"cache da instância {n + 1} igual à planilha: False\n", erro)
+
+    assert not duplicados and not linhas_erradas and not recusas_indevidas
+    assert enviados <= set(contagem)
+
+
+if __name__ == "__main__":
+    main()
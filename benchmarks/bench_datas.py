@@ -0,0 +1,84 @@
+"""
+Benchmark: conversão da coluna DATA (200 mil linhas "dd/mm/aaaa", 1% fora
+do formato) por inferência (``dayfirst=True``, como antes), pelo formato
+explícito sozinho e por ``converter_datas`` (formato explícito mais a
+segunda tentativa nas células fora dele).
+
+Mostra também quantas células cada caminho deixou sem data: a inferência
+fixa o formato pela primeira célula preenchida e descarta as demais
+variações; se essa primeira célula estiver fora do formato (segundo
+cenário), perde a coluna quase inteira.
+
+Uso: python benchmarks/bench_datas.py
+"""
+import os
+import statistics
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.tipos import FORMATO_DATA, converter_datas
+
+LINHAS = 200_000
+FORA_DO_FORMATO = 0.01
+REPETICOES = 5
+
+# Variações encontradas na planilha: espaços, data do Excel, ano com dois
+# dígitos, traços e textos que não são data
+VARIACOES = [" {d} ", "{iso} 00:00:00", "{curta}", "{tracos}", "SEM DATA", "31/02/2025"]
+
+
+def gerar_coluna():
+    rng = np.random.default_rng(5)
+    datas = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, LINHAS), unit="D")
+    textos = datas.strftime(FORMATO_DATA).to_numpy(dtype=object, copy=True)
+    for i in np.flatnonzero(rng.random(LINHAS) < FORA_DO_FORMATO):
+        data = datas[i]
+        textos[i] = VARIACOES[i % len(VARIACOES)].format(
+            d=textos[i], iso=data.strftime("%Y-%m-%d"),
+            curta=data.strftime("%d/%m/%y"), tracos=data.strftime("%d-%m-%Y"),
+        )
+    textos[rng.random(LINHAS) < 0.02] = None
+    return pd.Series(textos, dtype=object)
+
+
+def medir(funcao):
+    tempos, resultado = [], None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def comparar(coluna):
+    preenchidas = int(coluna.notna().sum())
+    caminhos = {
+        "inferência (dayfirst=True)": lambda: pd.to_datetime(coluna, dayfirst=True, errors="coerce").dt.normalize(),
+        "formato explícito": lambda: pd.to_datetime(coluna, format=FORMATO_DATA, errors="coerce").dt.normalize(),
+        "converter_datas": lambda: converter_datas(coluna)[0],
+    }
+    print(f"{'caminho':<28} {'mediana (s)':>12} {'sem data':>9}")
+    for nome, funcao in caminhos.items():
+        segundos, datas = medir(funcao)
+        print(f"{nome:<28} {segundos:>12.4f} {int(datas.isna().sum()) - (len(coluna) - preenchidas):>9,}")
+
+
+if __name__ == "__main__":
+    # A inferência avisa quando o formato deduzido ignora dayfirst
+    warnings.simplefilter("ignore", UserWarning)
+    coluna = gerar_coluna()
+    print(f"{LINHAS:,} linhas, {int(coluna.notna().sum()):,} preenchidas")
+    comparar(coluna)
+
+    print("\nprimeira célula como data do Excel (\"2025-01-01 00:00:00\"):")
+    coluna_excel = coluna.copy()
+    coluna_excel.iloc[0] = "2025-01-01 00:00:00"
+    comparar(coluna_excel)
+
+    invalidas = converter_datas(coluna)[1]
+    print("\ntextos sem data em converter_datas:", sorted(set(invalidas)))
@@ -0,0 +1,91 @@
+"""
+Benchmark: latência de exportação PNG das figuras do DASHBOARD
+(``gerar_figura``), a frio e com o navegador aquecido.
+
+- a frio: ``fig.to_image``, como antes; cada chamada abre e fecha um
+  navegador do kaleido
+- aquecido: ``ExportadorImagens``, com o navegador aberto uma vez (o tempo
+  de abertura é mostrado à parte) e reaproveitado
+- relatório: os quatro PNGs do e-mail por ``gerar_anexos``, um depois do
+  outro (a frio) e ao mesmo tempo (aquecido)
+
+Requer kaleido >= 1 e Chrome (``kaleido_get_chrome``).
+
+Uso: python benchmarks/bench_exportacao.py
+"""
+import importlib
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.relatorio import ExportadorImagens, exportar_png, gerar_anexos
+
+dashboard = importlib.import_module("pages.4_DASHBOARD")
+
+REPETICOES = 5
+UNIDADES = [
+    "ADMINISTRATIVO", "CEL.FABRICIANO", "DURVAL DE BARROS", "EXPEDIÇÃO", "GARANTIA",
+    "INDUSTRIA", "ITAUNA", "JARDIM MONTANHÊS", "LAGOA SANTA", "LAVRAS",
+    "MONTES CLAROS", "NEVES", "NOVA LIMA", "VARGINHA", "VESPASIANO",
+]
+
+
+def gerar_ranking(semente):
+    rng = np.random.default_rng(semente)
+    ranking = pd.DataFrame({"UNIDADE": UNIDADES, "VALOR_NUM": rng.uniform(500, 50_000, len(UNIDADES)).round(2)})
+    return ranking.sort_values("VALOR_NUM", ascending=True)
+
+
+def gerar_tabela():
+    linhas = [
+        {"DATA": "17/10/2025", "UNIDADE": u, "CARRO | UTILIZAÇÃO": "24600", "PEDIDO": str(100_000 + i), "VALOR": "R$ 1.234,56"}
+        for i, u in enumerate(UNIDADES)
+    ]
+    return pd.DataFrame(linhas)
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    figuras = [
+        dashboard.gerar_figura(gerar_ranking(i), f"Ranking {i}", cor)
+        for i, cor in enumerate(["#106332", "#1F617E", "#942525"])
+    ]
+    tabela = gerar_tabela()
+    figura_tabela = dashboard.gerar_figura_tabela(tabela)
+    altura_tabela = 150 + len(tabela) * 35
+
+    frio = [medir(lambda: figuras[0].to_image(format="png", width=1000, height=800)) for _ in range(REPETICOES)]
+
+    exportador = ExportadorImagens()
+    abertura = medir(exportador.iniciar)
+    if not exportador.ativo:
+        sys.exit(f"Navegador do kaleido indisponível: {exportador.ultimo_erro}")
+    aquecido = [medir(lambda: exportador.exportar(figuras[0], 1000, 800)) for _ in range(REPETICOES)]
+
+    print(f"{'exportação de uma figura':<34} {'mediana (s)':>12} {'mínimo (s)':>11}")
+    print(f"{'a frio (fig.to_image)':<34} {statistics.median(frio):>12.3f} {min(frio):>11.3f}")
+    print(f"{'aquecido (ExportadorImagens)':<34} {statistics.median(aquecido):>12.3f} {min(aquecido):>11.3f}")
+    print(f"{'abertura do navegador (uma vez)':<34} {abertura:>12.3f}")
+
+    def anexos(com_exportador):
+        fonte = exportador if com_exportador else None
+        pngs = {f"Ranking_{i}.png": exportar_png(fig, 1000, 800, fonte) for i, fig in enumerate(figuras)}
+        pngs["Programacao_Amanha.png"] = exportar_png(figura_tabela, 1100, altura_tabela, fonte)
+        return pngs
+
+    _, tempos_frio = gerar_anexos(anexos(False), max_simultaneos=1)
+    _, tempos_aquecido = gerar_anexos(anexos(True))
+    print("\nrelatório, a frio e em sequência:")
+    print(tempos_frio.to_string(index=False))
+    print("\nrelatório, aquecido e em paralelo:")
+    print(tempos_aquecido.to_string(index=False))
@@ -0,0 +1,130 @@
+"""
+Simulação: recarga incremental (cauda de ``janela`` linhas) contra carga
+completa da aba ALTA, com as linhas vazias que a planilha tem no fim.
+
+Um repositório com recargas parciais acompanha um ``BackendMemoria`` em que
+a aba termina em ``VAZIAS`` linhas vazias (como as abas reais). A cada
+passo, a planilha é alterada direto no backend, o repositório faz uma
+recarga incremental e o DataFrame em cache é comparado com uma carga
+completa nova. Os passos cobrem:
+
+- pedido digitado na primeira linha vazia (sob as linhas vazias do fim)
+- edição de uma linha dentro da janela
+- vários pedidos novos de uma vez
+- linhas finais apagadas
+- pedido digitado várias linhas abaixo do último (com vazias no meio)
+
+Mostra, para cada passo, se o cache ficou igual à carga completa e quantas
+linhas com dados a última recarga incremental leu, contra as da aba.
+
+Uso: python benchmarks/bench_incremental.py
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.planilha import ABA_ALTA, BackendMemoria, RepositorioPlanilha
+
+LINHAS = 500
+VAZIAS = 1_000
+JANELA = 200
+RECARGAS_POR_PASSO = 3
+CABECALHO = [
+    "DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "PEDIDO", "VALOR", "FORNECEDOR",
+    "STATUS", "AVALIAÇÃO", "OBSERVAÇÕES",
+]
+
+
+def linha_planilha(pedido, obs=""):
+    return ["16/10/2025", "NEVES", "24600", pedido, "R$ 10,00", "FORNECEDOR X", "PEDIDO", "UNIDADE", obs]
+
+
+def ultima_com_dados(aba):
+    return max(i for i, linha in enumerate(aba) if any(str(c).strip() for c in linha))
+
+
+def digitar_na_primeira_vazia(aba):
+    aba[ultima_com_dados(aba) + 1] = linha_planilha("800001")
+
+
+def editar_na_janela(aba):
+    aba[ultima_com_dados(aba) - 50][-1] = "editado"
+
+
+def varios_pedidos(aba):
+    inicio = ultima_com_dados(aba) + 1
+    for i in range(30):
+        aba[inicio + i] = linha_planilha(str(800_100 + i))
+
+
+def apagar_finais(aba):
+    fim = ultima_com_dados(aba)
+    for i in range(fim - 9, fim + 1):
+        aba[i] = [""] * len(CABECALHO)
+
+
+def digitar_abaixo(aba):
+    aba[ultima_com_dados(aba) + 15] = linha_planilha("800200")
+
+
+PASSOS = {
+    "pedido na primeira linha vazia": digitar_na_primeira_vazia,
+    "edição dentro da janela": editar_na_janela,
+    "30 pedidos novos": varios_pedidos,
+    "10 linhas finais apagadas": apagar_finais,
+    "pedido 15 linhas abaixo do último": digitar_abaixo,
+}
+
+
+def contar_leituras(backend):
+    """Guarda em ``backend.linhas_lidas`` as linhas com dados da última ``ler_caudas``."""
+    ler_caudas = backend.ler_caudas
+
+    def contando(pedidos):
+        resultado = ler_caudas(pedidos)
+        backend.linhas_lidas = sum(
+            sum(1 for linha in linhas if any(str(c).strip() for c in linha))
+            for _, linhas in resultado.values()
+        )
+        return resultado
+
+    backend.ler_caudas = contando
+
+
+def main():
+    backend = BackendMemoria({
+        ABA_ALTA: [["PLANILHA ALTA"], list(CABECALHO)]
+        + [linha_planilha(str(100_000 + i)) for i in range(LINHAS)]
+        + [[""] * len(CABECALHO) for _ in range(VAZIAS)]
+    })
+    # Sem recarga completa periódica: só o caminho incremental é exercitado
+    contar_leituras(backend)
+    repositorio = RepositorioPlanilha(backend, janela=JANELA, recarga_completa_a_cada=10**9)
+    repositorio.carregar_aba(ABA_ALTA)
+    print(f"aba com {LINHAS} linhas de dados e {VAZIAS} vazias no fim; janela de {JANELA} linhas")
+    print(f"{'passo':<36} {'igual':>6} {'linhas lidas (incr./aba)':>30}")
+
+    falhas = []
+    for nome, alterar in PASSOS.items():
+        alterar(backend.abas[ABA_ALTA])
+        for _ in range(RECARGAS_POR_PASSO):
+            repositorio.expirar()
+            repositorio.atualizar([ABA_ALTA])
+        com_dados = sum(1 for linha in backend.abas[ABA_ALTA][2:] if any(str(c).strip() for c in linha))
+
+        referencia = RepositorioPlanilha(backend).carregar_aba(ABA_ALTA)
+        try:
+            pd.testing.assert_frame_equal(repositorio.carregar_aba(ABA_ALTA), referencia)
+            igual = True
+        except AssertionError:
+            igual = False
+            falhas.append(nome)
+        print(f"{nome:<36} {str(igual):>6} {backend.linhas_lidas:>15,} / {com_dados:,}")
+
+    assert not falhas, falhas
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: conversão de uma aba crua (lista de linhas da API) em DataFrame
+tipado, comparando a montagem antiga (completar todas as linhas, montar o
+DataFrame, trocar '' por NA e só então descartar as linhas vazias) com
+``valores_para_df``, numa aba de 50 mil linhas com muitas linhas vazias no
+fim, como as nossas.
+
+Uso: python benchmarks/bench_ingestao.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.planilha import LINHA_CABECALHO, valores_para_df
+from comum.tipos import tipar_df
+
+LINHAS = 50_000
+LINHAS_VAZIAS_NO_FIM = 20_000
+CABECALHO = [
+    "DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "PEDIDO", "VALOR", "FORNECEDOR",
+    "STATUS", "AVALIAÇÃO", "OBSERVAÇÕES", "", "", "", "", "", "", "",
+]
+
+
+# --- Implementação antiga, copiada de BUSCAR.py para comparação ---
+
+def completar_linhas(valores, largura=None):
+    if largura is None:
+        largura = max((len(linha) for linha in valores), default=0)
+    return [list(linha[:largura]) + [""] * (largura - len(linha)) for linha in valores]
+
+
+def load_sheet_as_df(valores):
+    valores = completar_linhas(valores)
+    raw_headers = [str(h).strip().upper() for h in valores[LINHA_CABECALHO]]
+    seen_headers = {}
+    unique_headers = []
+    for header in raw_headers:
+        if header in seen_headers:
+            seen_headers[header] += 1
+            unique_headers.append(f"{header}_{seen_headers[header]}")
+        else:
+            seen_headers[header] = 0
+            unique_headers.append(header)
+
+    dados = valores[LINHA_CABECALHO + 1:]
+    df = pd.DataFrame(dados, columns=unique_headers, index=range(LINHA_CABECALHO + 2, LINHA_CABECALHO + 2 + len(dados)))
+    df.replace('', pd.NA, inplace=True)
+    df.dropna(how='all', inplace=True)
+    return df
+
+
+def gerar_aba():
+    rng = np.random.default_rng(11)
+    preenchidas = LINHAS - LINHAS_VAZIAS_NO_FIM
+    dias = rng.integers(1, 29, size=preenchidas)
+    reais = rng.integers(1, 50_000, size=preenchidas)
+    centavos = rng.integers(0, 100, size=preenchidas)
+    unidades = rng.choice(["NEVES", "ITAUNA", "LAVRAS", "VARGINHA"], size=preenchidas)
+    status = rng.choice(["PEDIDO", "APROVADA", "COTAÇÃO", ""], size=preenchidas)
+
+    linhas = [["PLANILHA ALTA"], list(CABECALHO)]
+    for i in range(preenchidas):
+        linha = [
+            f"{dias[i]:02d}/09/2025", unidades[i], "MANUTENÇÃO", str(100_000 + i),
+            f"R$ {reais[i]},{centavos[i]:02d}", "FORNECEDOR X", status[i], "", "obs",
+        ]
+        # A API omite as células vazias do fim, então as linhas variam de tamanho
+        if status[i] == "":
+            linha = linha[:6]
+        linhas.append(linha)
+    # Linhas com formatação ou fórmulas, mas sem conteúdo, no fim da aba
+    linhas += [[""] * len(CABECALHO) for _ in range(LINHAS_VAZIAS_NO_FIM)]
+    return linhas
+
+
+def cronometrar(nome, funcao, repeticoes=5):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    print(f"{nome:<34} {melhor:8.3f} s")
+    return resultado
+
+
+if __name__ == "__main__":
+    valores = gerar_aba()
+    print(f"{LINHAS} linhas ({LINHAS_VAZIAS_NO_FIM} vazias no fim), {len(CABECALHO)} colunas")
+
+    cronometrar("montagem antiga", lambda: load_sheet_as_df(valores))
+    cronometrar("valores_para_df", lambda: valores_para_df(valores))
+    antigo = cronometrar("montagem antiga + tipagem", lambda: tipar_df(load_sheet_as_df(valores)))
+    novo = cronometrar("valores_para_df + tipagem", lambda: tipar_df(valores_para_df(valores)))
+
+    try:
+        pd.testing.assert_frame_equal(antigo, novo)
+        print("mesmo DataFrame tipado: True")
+    except AssertionError as erro:
+        print("mesmo DataFrame tipado: False\n", erro)
@@ -0,0 +1,174 @@
+"""
+Simulação: requisições da carga a frio de ALTA, EMERGENCIAL e da aba de
+backup por ``carregar_abas`` (um lote) contra a leitura antiga, aba por aba
+(``sh.worksheet(aba).get_all_values()``: metadados e valores por aba).
+
+Confere, com ``assert``, as idas ao servidor em cada caso:
+
+- ``BackendMemoria``: carga a frio = 1 chamada; aba repetida dentro do TTL
+  e aba inexistente já consultada = nenhuma
+- ``BackendGoogleSheets`` sobre um cliente falso do gspread, que conta
+  ``fetch_sheet_metadata`` e ``values_batch_get``: carga a frio = metadados
+  + 1 batchGet; com os títulos já conhecidos = só o batchGet; aba
+  desconhecida ou lote recusado (aba renomeada) = metadados de novo
+
+O tempo mostrado soma ``LATENCIA`` por requisição (a latência típica de
+uma chamada à API), além do processamento local.
+
+Uso: python benchmarks/bench_lote.py
+"""
+import os
+import sys
+import time
+
+import gspread
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.backup import nome_aba_backup
+from comum.planilha import (
+    ABAS_PRINCIPAIS, BackendGoogleSheets, BackendMemoria, RepositorioPlanilha, valores_para_df,
+)
+
+LATENCIA = 0.15
+LINHAS = {"ALTA": 20_000, "EMERGENCIAL": 5_000, nome_aba_backup(): 800}
+CABECALHO = ["DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "PEDIDO", "VALOR", "FORNECEDOR", "STATUS"]
+
+
+def gerar_abas():
+    abas = {}
+    for numero, (aba, linhas) in enumerate(LINHAS.items()):
+        abas[aba] = [[f"PLANILHA {aba}"], list(CABECALHO)] + [
+            ["16/10/2025", "NEVES", "24600", str(numero * 1_000_000 + i), "R$ 10,00", "FORNECEDOR X", "PEDIDO"]
+            for i in range(linhas)
+        ]
+    abas["OUTRA"] = [["OUTRA"], ["A"], ["1"]]
+    return abas
+
+
+class _RespostaErro:
+    text = ""
+
+    def json(self):
+        return {"error": {"code": 400, "message": "Unable to parse range", "status": "INVALID_ARGUMENT"}}
+
+
+class PlanilhaFalsa:
+    """Imita ``gspread.Spreadsheet`` sobre listas de linhas, contando as requisições."""
+
+    def __init__(self, abas):
+        self.abas = abas
+        self.contagem = {"metadados": 0, "batchGet": 0, "get": 0}
+        self.recusar_lote = False
+
+    def _esperar(self, tipo):
+        self.contagem[tipo] += 1
+        time.sleep(LATENCIA)
+
+    @staticmethod
+    def _aba(intervalo):
+        return intervalo.split("!")[0][1:-1].replace("''", "'")
+
+    def fetch_sheet_metadata(self):
+        self._esperar("metadados")
+        return {"sheets": [{"properties": {"title": aba}} for aba in self.abas]}
+
+    def values_batch_get(self, intervalos):
+        self._esperar("batchGet")
+        if self.recusar_lote:
+            self.recusar_lote = False
+            raise gspread.exceptions.APIError(_RespostaErro())
+        return {"valueRanges": [{"values": self.abas[self._aba(i)]} for i in intervalos]}
+
+    def values_get(self, intervalo):
+        self._esperar("get")
+        return {"values": self.abas[self._aba(intervalo)]}
+
+    def requisicoes(self):
+        return sum(self.contagem.values())
+
+
+class ClienteFalso:
+    def __init__(self, planilha):
+        self.planilha = planilha
+
+    def open_by_key(self, chave):
+        return self.planilha
+
+
+def leitura_antiga(planilha, abas):
+    """Como a versão antiga: ``sh.worksheet(aba)`` (metadados) e ``get_all_values()`` por aba."""
+    frames = {}
+    for aba in abas:
+        planilha.fetch_sheet_metadata()
+        frames[aba] = valores_para_df(planilha.values_get(f"'{aba}'")["values"])
+    return frames
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def conferir_memoria(abas, pedidas):
+    backend = BackendMemoria(abas)
+    repositorio = RepositorioPlanilha(backend)
+    repositorio.carregar_abas(pedidas)
+    assert backend.chamadas == 1, backend.chamadas
+    repositorio.carregar_abas(pedidas)
+    assert backend.chamadas == 1, backend.chamadas
+
+    # Aba inexistente: fica no cache como ausente, sem nova consulta
+    repositorio.carregar_abas(pedidas + ["NÃO EXISTE"])
+    antes = backend.chamadas
+    assert "NÃO EXISTE" not in repositorio.carregar_abas(pedidas + ["NÃO EXISTE"])
+    assert backend.chamadas == antes, (antes, backend.chamadas)
+    print(f"BackendMemoria: carga a frio de {len(pedidas)} abas em 1 chamada; cache e aba ausente sem chamadas")
+
+
+def main():
+    abas = gerar_abas()
+    pedidas = ABAS_PRINCIPAIS + [nome_aba_backup()]
+    conferir_memoria(abas, pedidas)
+
+    antiga = PlanilhaFalsa(abas)
+    frames_antigos, segundos_antigos = cronometrar(lambda: leitura_antiga(antiga, pedidas))
+
+    planilha = PlanilhaFalsa(abas)
+    backend = BackendGoogleSheets(ClienteFalso(planilha), "falsa")
+    frames, segundos = cronometrar(lambda: RepositorioPlanilha(backend).carregar_abas(pedidas))
+    assert planilha.contagem == {"metadados": 1, "batchGet": 1, "get": 0}, planilha.contagem
+    for aba in pedidas:
+        pd.testing.assert_frame_equal(
+            frames[aba].reset_index(drop=True),
+            RepositorioPlanilha(BackendMemoria({aba: abas[aba]})).carregar_aba(aba).reset_index(drop=True),
+        )
+    print(f"\n{'leitura (a frio)':<34} {'requisições':>11} {'tempo (s)':>10}")
+    print(f"{'aba por aba (antiga)':<34} {antiga.requisicoes():>11} {segundos_antigos:>10.2f}")
+    print(f"{'carregar_abas (metadados + lote)':<34} {planilha.requisicoes():>11} {segundos:>10.2f}")
+    assert antiga.requisicoes() == 2 * len(pedidas) and len(frames_antigos) == len(pedidas)
+
+    # Outro repositório (ex.: após limpar o cache) com os títulos já conhecidos: só o lote
+    planilha.contagem = dict.fromkeys(planilha.contagem, 0)
+    RepositorioPlanilha(backend).carregar_abas(pedidas)
+    assert planilha.contagem == {"metadados": 0, "batchGet": 1, "get": 0}, planilha.contagem
+    print(f"{'com títulos conhecidos':<34} {planilha.requisicoes():>11}")
+
+    # Aba que o backend ainda não conhece: metadados antes do lote
+    planilha.contagem = dict.fromkeys(planilha.contagem, 0)
+    abas["NOVA"] = [["NOVA"], ["PEDIDO"], ["1"]]
+    assert "NOVA" in RepositorioPlanilha(backend).carregar_abas(pedidas + ["NOVA"])
+    assert planilha.contagem == {"metadados": 1, "batchGet": 1, "get": 0}, planilha.contagem
+    print(f"{'com uma aba desconhecida':<34} {planilha.requisicoes():>11}")
+
+    # Lote recusado (aba renomeada entre duas cargas): metadados e novo lote
+    planilha.contagem = dict.fromkeys(planilha.contagem, 0)
+    planilha.recusar_lote = True
+    assert set(RepositorioPlanilha(backend).carregar_abas(pedidas)) == set(pedidas)
+    assert planilha.contagem == {"metadados": 1, "batchGet": 2, "get": 0}, planilha.contagem
+    print(f"{'com o lote recusado uma vez':<34} {planilha.requisicoes():>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: conversão de moeda vetorizada (parse_moeda) contra os caminhos
+antigos com ``.apply`` linha a linha, numa coluna sintética de 500 mil linhas,
+e formatação vetorizada (formatar_moeda) contra ``apply(br_money)``, com
+valores de meio centavo (as duas devem arredondar igual).
+
+Uso: python benchmarks/bench_moeda.py
+"""
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.moeda import br_money, formatar_moeda, parse_moeda
+
+LINHAS = 500_000
+
+# Meio centavo e casos em que o binário fica logo abaixo da metade
+MEIOS_CENTAVOS = [0.005, -0.005, 0.015, 0.125, 1.005, 2.675, 999.995, -1234.565, 0.004, -0.004]
+
+
+# --- Implementações antigas, copiadas das páginas para comparação ---
+
+def valor_brasileiro(valor):
+    if pd.isna(valor) or valor is None:
+        return 0.0
+    s = str(valor).strip()
+    s = re.sub(r"[R$\s\.]", "", s)
+    s = s.replace(",", ".")
+    try:
+        return float(s)
+    except ValueError:
+        return 0.0
+
+
+def limpar_moeda(v):
+    if pd.isna(v) or v == "": return 0.0
+    s = str(v).replace("R$", "").replace(" ", "").replace(".", "").replace(",", ".")
+    try: return float(s)
+    except: return 0.0
+
+
+def cadastrar_str_replace(serie):
+    limpo = (
+        serie.astype(str)
+        .str.replace("R$", "", regex=False)
+        .str.replace(".", "", regex=False)
+        .str.replace(",", ".", regex=False)
+        .str.strip()
+    )
+    return pd.to_numeric(limpo, errors="coerce").fillna(0.0)
+
+
+def gerar_coluna(n):
+    rng = np.random.default_rng(42)
+    centavos = rng.integers(-50_000, 5_000_000, size=n)
+    textos = [
+        f"R$ {c / 100:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        for c in centavos
+    ]
+    serie = pd.Series(textos, dtype=object)
+    serie[rng.random(n) < 0.02] = ""
+    return serie
+
+
+def cronometrar(nome, funcao, serie):
+    inicio = time.perf_counter()
+    resultado = funcao(serie)
+    print(f"{nome:<32} {time.perf_counter() - inicio:8.3f} s")
+    return resultado
+
+
+if __name__ == "__main__":
+    serie = gerar_coluna(LINHAS)
+    print(f"{LINHAS} linhas")
+    referencia = cronometrar("apply(valor_brasileiro)", lambda s: s.apply(valor_brasileiro), serie)
+    cronometrar("apply(limpar_moeda)", lambda s: s.apply(limpar_moeda), serie)
+    cronometrar("CADASTRAR (.str.replace)", cadastrar_str_replace, serie)
+    novo = cronometrar("parse_moeda", parse_moeda, serie)
+    print("resultados iguais ao valor_brasileiro:", bool(np.allclose(referencia, novo)))
+
+    valores = pd.concat([novo, pd.Series(MEIOS_CENTAVOS)], ignore_index=True)
+    print()
+    antigo = cronometrar("apply(br_money)", lambda s: s.apply(br_money), valores)
+    formatado = cronometrar("formatar_moeda", formatar_moeda, valores)
+    print("resultados iguais ao br_money:", bool((antigo == formatado).all()))
+    print("meio centavo:", dict(zip(MEIOS_CENTAVOS, formatado.iloc[-len(MEIOS_CENTAVOS):])))
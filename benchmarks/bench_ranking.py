@@ -0,0 +1,110 @@
+"""
+Benchmark: rankings do DASHBOARD (ALTA, EMERGENCIAL e total) com um ano
+de pedidos, pelo caminho antigo (filtro de STATUS, ``preparar_dados_plotly``
+por aba, concat e novo groupby) e por ``calcular_rankings``, em uma passada.
+
+As abas são tipadas como no repositório (``tipar_df``); os dois caminhos
+recebem as mesmas abas e os resultados são conferidos entre si, para uma
+semana e para o ano inteiro.
+
+Uso: python benchmarks/bench_ranking.py
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from comum.cadastro import STATUS, UNIDADE
+from comum.moeda import formatar_moeda, parse_moeda
+from comum.ranking import calcular_rankings
+from comum.tipos import tipar_df
+
+LINHAS_POR_DIA = {"ALTA": 150, "EMERGENCIAL": 40}
+DIAS = 365
+REPETICOES = 5
+INICIO_ANO = date(2025, 1, 1)
+
+
+# --- Implementação antiga, copiada de pages/4_DASHBOARD.py para comparação ---
+
+def preparar_dados_plotly(df, d_inicio, d_fim):
+    if df.empty: return pd.DataFrame()
+    df = df.copy()
+    df['UNIDADE'] = df['UNIDADE'].astype(str).str.strip().str.upper()
+    df['DATA_DT'] = pd.to_datetime(df['DATA'], dayfirst=True, errors='coerce').dt.date
+    df['VALOR_NUM'] = parse_moeda(df['VALOR'])
+    mask = (df['DATA_DT'] >= d_inicio) & (df['DATA_DT'] <= d_fim)
+    df_filtrado = df.loc[mask]
+    ranking = df_filtrado.groupby('UNIDADE')['VALOR_NUM'].sum().reset_index()
+    return ranking.sort_values('VALOR_NUM', ascending=True)
+
+
+def rankings_antigos(data_dict, data_inicio, data_fim):
+    df_alta_orig = data_dict.get('ALTA', pd.DataFrame())
+    df_alta_filt = df_alta_orig[df_alta_orig['STATUS'].astype(str).str.strip().str.upper() == "PEDIDO"] if not df_alta_orig.empty else pd.DataFrame()
+    df_alta = preparar_dados_plotly(df_alta_filt, data_inicio, data_fim)
+    df_emerg = preparar_dados_plotly(data_dict.get('EMERGENCIAL', pd.DataFrame()), data_inicio, data_fim)
+
+    df_total = pd.concat([df_alta, df_emerg], ignore_index=True)
+    if not df_total.empty:
+        df_total = df_total.groupby('UNIDADE')['VALOR_NUM'].sum().reset_index().sort_values('VALOR_NUM', ascending=True)
+    return {"ALTA": df_alta, "EMERGENCIAL": df_emerg, "TOTAL": df_total}
+
+
+def gerar_abas():
+    """Abas de um ano, como texto da planilha (unidades com caixa e espaços variados)."""
+    rng = np.random.default_rng(11)
+    abas = {}
+    for aba, por_dia in LINHAS_POR_DIA.items():
+        n = por_dia * DIAS
+        datas = pd.Timestamp(INICIO_ANO) + pd.to_timedelta(rng.integers(0, DIAS, n), unit="D")
+        unidades = rng.choice(UNIDADE, n).astype(object)
+        variantes = rng.random(n)
+        unidades[variantes < 0.05] = [u.lower() for u in unidades[variantes < 0.05]]
+        unidades[variantes > 0.95] = [f" {u} " for u in unidades[variantes > 0.95]]
+        valores = formatar_moeda(pd.Series(rng.uniform(10, 20_000, n).round(2))).to_numpy(dtype=object, copy=True)
+        valores[rng.random(n) < 0.02] = ""
+        abas[aba] = tipar_df(pd.DataFrame({
+            "DATA": datas.strftime("%d/%m/%Y"),
+            "UNIDADE": unidades,
+            "CARRO | UTILIZAÇÃO": "24600",
+            "PEDIDO": (100_000 + np.arange(n)).astype(str),
+            "VALOR": valores,
+            "STATUS": rng.choice(STATUS, n),
+        }))
+    return abas
+
+
+def conferir(antigos, novos):
+    for chave, antigo in antigos.items():
+        esperado = antigo.sort_values("UNIDADE").reset_index(drop=True)
+        obtido = novos[chave].sort_values("UNIDADE").reset_index(drop=True)
+        pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False)
+
+
+def medir(funcao):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+if __name__ == "__main__":
+    abas = gerar_abas()
+    semana = (date(2025, 10, 13), date(2025, 10, 19))
+    ano = (INICIO_ANO, INICIO_ANO + timedelta(days=DIAS - 1))
+    print("linhas: " + ", ".join(f"{aba} {len(df):,}" for aba, df in abas.items()))
+
+    print(f"{'período':<10} {'antigo (s)':>11} {'uma passada (s)':>16} {'ganho':>7}")
+    for nome, (d_inicio, d_fim) in (("semana", semana), ("ano", ano)):
+        conferir(rankings_antigos(abas, d_inicio, d_fim), calcular_rankings(abas, d_inicio, d_fim))
+        antigo = medir(lambda: rankings_antigos(abas, d_inicio, d_fim))
+        novo = medir(lambda: calcular_rankings(abas, d_inicio, d_fim))
+        print(f"{nome:<10} {antigo:>11.4f} {novo:>16.4f} {antigo / novo:>6.1f}x")
@@ -0,0 +1,76 @@
+"""
+Contagem de alertas de status por horizonte de datas (amanhã, futuras,
+próximos 7 dias...) numa única passada sobre a aba, sem alterar nem copiar
+o DataFrame em cache.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+STATUS_ALERTA = ["NÃO APROVADA", "APROVADA", "COTAÇÃO", "PEDIDO"]
+
+# Horizontes em dias a partir de hoje, inclusive; fim None = sem limite
+HORIZONTES_ALERTA: Dict[str, Tuple[int, Optional[int]]] = {
+    "AMANHÃ": (1, 1),
+    "FUTURAS": (1, None),
+    "PRÓXIMOS 7 DIAS": (1, 7),
+}
+
+
+def codigos_status(serie: pd.Series, status: List[str]) -> np.ndarray:
+    """
+    Posição de cada linha em ``status`` (após strip/upper), ou -1. Em colunas
+    categóricas só as categorias são normalizadas, não as linhas.
+    """
+    alvo = pd.Index(status)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = pd.Index(serie.cat.categories).astype("string").str.strip().str.upper()
+        mapa = np.append(alvo.get_indexer(categorias), -1)
+        return mapa[serie.cat.codes.to_numpy()]
+    return alvo.get_indexer(serie.astype("string").str.strip().str.upper())
+
+
+def contar_alertas(
+    df: pd.DataFrame,
+    hoje,
+    status: List[str] = STATUS_ALERTA,
+    horizontes: Dict[str, Tuple[int, Optional[int]]] = HORIZONTES_ALERTA,
+    col_data: str = "DATA",
+    col_status: str = "STATUS",
+) -> pd.DataFrame:
+    """
+    Quantidade de linhas por status (linhas) e horizonte (colunas).
+
+    As linhas relevantes são contadas uma vez num histograma status x dia
+    (``np.bincount``); cada horizonte é uma diferença de somas acumuladas
+    desse histograma, então novos status ou horizontes não custam novos
+    filtros sobre a aba.
+    """
+    resultado = pd.DataFrame(0, index=list(status), columns=list(horizontes))
+    if df.empty or col_data not in df.columns or col_status not in df.columns or not horizontes:
+        return resultado
+
+    codigos = codigos_status(df[col_status], status)
+    dias = (df[col_data] - pd.Timestamp(hoje).normalize()).dt.days.to_numpy(dtype="float64", na_value=np.nan)
+
+    inicio_min = min(inicio for inicio, _ in horizontes.values())
+    fins = [fim for _, fim in horizontes.values() if fim is not None]
+    fim_max = max(fins + [inicio_min])
+
+    validos = (codigos >= 0) & ~np.isnan(dias) & (dias >= inicio_min)
+    # Dias além de fim_max caem todos no último compartimento
+    deslocamento = np.minimum(dias[validos], fim_max + 1).astype(np.int64) - inicio_min
+    largura = fim_max + 2 - inicio_min
+
+    histograma = np.bincount(
+        codigos[validos] * largura + deslocamento,
+        minlength=len(status) * largura,
+    ).reshape(len(status), largura)
+    acumulado = np.concatenate([np.zeros((len(status), 1), dtype=np.int64), histograma.cumsum(axis=1)], axis=1)
+
+    for nome, (inicio, fim) in horizontes.items():
+        i = inicio - inicio_min
+        j = largura if fim is None else fim - inicio_min + 1
+        resultado[nome] = acumulado[:, j] - acumulado[:, i]
+    return resultado
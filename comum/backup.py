@@ -0,0 +1,332 @@
+"""
+Abas de backup semanais ("dd.mm a dd.mm") e o arquivo local das semanas
+anteriores.
+
+As páginas carregam, pelo repositório, só ALTA, EMERGENCIAL e a aba da
+semana passada (``nome_aba_backup``). As semanas mais antigas ficam em
+``ArquivoBackup``: um único DataFrame tipado com as colunas usadas nas
+consultas, mais ABA, SEMANA e LINHA (número da linha na aba), e um índice
+pedido -> linhas do arquivo. Uma consulta é uma busca nesse índice, qualquer
+que seja o número de semanas arquivadas.
+
+O arquivo cresce sob demanda: só quando um pedido não é encontrado nele a
+lista de abas da planilha é consultada (no máximo a cada ``ttl_abas``
+segundos) e as semanas ainda não arquivadas são baixadas, em lotes, pelo
+repositório (``ler_sem_cache``, na vez das recargas do atualizador). Elas
+não entram no cache do repositório, que as atualizaria a cada ciclo. A
+busca que provocou o download espera só as ``semanas_por_busca`` mais
+recentes; as demais são baixadas em segundo plano. Semanas fechadas não
+mudam, então cada aba é baixada uma única vez; o arquivo fica em disco
+(Parquet) e é reaproveitado ao reiniciar.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import streamlit as st
+
+from comum.indices import COL_PEDIDO, IndicePedidos
+from comum.planilha import (
+    PASTA_SNAPSHOT_PADRAO, VARIAVEL_PASTA_SNAPSHOT, get_repositorio, valores_para_df,
+)
+from comum.tipos import concatenar_tipados, tipar_df
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+PADRAO_ABA_BACKUP = re.compile(r"^(\d{2})\.(\d{2}) a (\d{2})\.(\d{2})$")
+
+# Colunas guardadas de cada semana (as usadas pelo BUSCAR, inclusive na
+# busca livre, e pelo BACKLOG)
+COLUNAS_ARQUIVO = [
+    "PEDIDO", "DATA", "VALOR", "STATUS", "UNIDADE", "CARRO | UTILIZAÇÃO", "FORNECEDOR",
+    "OBSERVAÇÕES",
+]
+
+# Abas por requisição ao baixar semanas, semanas baixadas durante uma busca
+# (as mais recentes; o resto vem em segundo plano) e intervalo mínimo entre
+# duas consultas à lista de abas da planilha
+ABAS_POR_LOTE = 10
+SEMANAS_POR_BUSCA = 10
+TTL_LISTA_ABAS = 300
+
+# Anos considerados ao deduzir o ano de uma aba (o nome só tem dia e mês)
+ANOS_BACKUP = 6
+
+# Muda quando o formato do arquivo em disco muda (cópias antigas são ignoradas)
+VERSAO_FORMATO = 2
+_CHAVE_METADADOS = b"saritur_backup"
+_INDICE = "ARQUIVO"
+
+
+def nome_aba_backup(hoje: Optional[date] = None) -> str:
+    """Nome da aba da semana passada completa (segunda a sexta)."""
+    hoje = hoje or date.today()
+    segunda = hoje - timedelta(days=hoje.weekday() + 7)
+    sexta = segunda + timedelta(days=4)
+    return f"{segunda.strftime('%d.%m')} a {sexta.strftime('%d.%m')}"
+
+
+def inicio_semana(aba: str, hoje: Optional[date] = None) -> Optional[date]:
+    """
+    Primeiro dia de uma aba "dd.mm a dd.mm". O nome não tem ano: vale o
+    mais recente, até ``hoje``, em que a data cai numa segunda-feira (as
+    abas vão de segunda a sexta); sem nenhum, o mais recente. None se o
+    nome não for de uma aba de backup.
+    """
+    encontrado = PADRAO_ABA_BACKUP.match(aba.strip())
+    if encontrado is None:
+        return None
+    hoje = hoje or date.today()
+    dia, mes = int(encontrado.group(1)), int(encontrado.group(2))
+    candidatas = []
+    for ano in range(hoje.year, hoje.year - ANOS_BACKUP - 1, -1):
+        try:
+            inicio = date(ano, mes, dia)
+        except ValueError:
+            continue
+        if inicio <= hoje:
+            candidatas.append(inicio)
+    segundas = [inicio for inicio in candidatas if inicio.weekday() == 0]
+    return (segundas or candidatas or [None])[0]
+
+
+def _semana_para_df(linhas: List[List[str]], aba: str, inicio: date) -> pd.DataFrame:
+    """Linhas (texto) de uma aba de backup nas colunas do arquivo."""
+    df = valores_para_df(linhas)
+    if COL_PEDIDO not in df.columns:
+        return pd.DataFrame()
+    df = df.reindex(columns=COLUNAS_ARQUIVO)
+    df = df[df[COL_PEDIDO].fillna("").str.strip() != ""]
+    return df.assign(ABA=aba, SEMANA=pd.Timestamp(inicio), LINHA=df.index)
+
+
+class ArquivoBackup:
+    """
+    Arquivo das semanas de backup anteriores à semana passada (a da aba
+    que as páginas já carregam), baixadas pelo ``repositorio``. ``pasta``
+    None (ou sem pyarrow): só em memória. ``abas`` são as semanas já
+    arquivadas, da mais recente para a mais antiga; ``abas_baixadas`` conta
+    as baixadas por este processo.
+
+    Consultas só seguram ``_lock`` para ler o índice; downloads rodam fora
+    dele, um de cada vez (``_baixando``), e entram no arquivo de uma vez.
+    ``completando`` diz se ainda há semanas sendo baixadas em segundo plano.
+    """
+
+    def __init__(
+        self,
+        repositorio,
+        pasta: Optional[str] = None,
+        ttl_abas: float = TTL_LISTA_ABAS,
+        abas_por_lote: int = ABAS_POR_LOTE,
+        semanas_por_busca: int = SEMANAS_POR_BUSCA,
+    ):
+        self.repositorio = repositorio
+        self.backend = repositorio.backend
+        self.pasta = pasta if pa is not None else None
+        self.ttl_abas = ttl_abas
+        self.abas_por_lote = abas_por_lote
+        self.semanas_por_busca = semanas_por_busca
+        self.ultimo_erro: Optional[Exception] = None
+        self.df = pd.DataFrame(columns=COLUNAS_ARQUIVO + ["ABA", "SEMANA", "LINHA"])
+        self.abas: List[str] = []
+        self.abas_baixadas = 0
+        self._indice = IndicePedidos({})
+        self._semanas: Optional[Dict[str, pd.DataFrame]] = None
+        self._lista: List[str] = []
+        self._lista_em = float("-inf")
+        self._lido = False
+        self._lock = threading.Lock()
+        self._baixando = threading.Lock()
+        self._completador: Optional[threading.Thread] = None
+
+    def _arquivo(self) -> str:
+        chave = hashlib.sha1(str(self.backend.spreadsheet_id).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.pasta, f"{chave}.parquet")
+
+    def _carimbo(self) -> dict:
+        return {"formato": VERSAO_FORMATO, "planilha": str(self.backend.spreadsheet_id)}
+
+    def _instalar(self, df: pd.DataFrame, abas: List[str]):
+        self.df = df.reset_index(drop=True)
+        self.abas = abas
+        self._indice = IndicePedidos({_INDICE: self.df})
+        self._semanas = None
+
+    def _ler_disco(self):
+        """Carrega o arquivo em disco (uma vez por processo)."""
+        self._lido = True
+        if self.pasta is None or not os.path.exists(self._arquivo()):
+            return
+        try:
+            bruto = (pq.read_schema(self._arquivo()).metadata or {}).get(_CHAVE_METADADOS)
+            metadados = json.loads(bruto) if bruto else {}
+            if any(metadados.get(campo) != valor for campo, valor in self._carimbo().items()):
+                return
+            df = pq.read_table(self._arquivo(), memory_map=True).to_pandas()
+        except (OSError, ValueError, pa.ArrowException):
+            return
+        self._instalar(concatenar_tipados([df]) if not df.empty else df, metadados["abas"])
+
+    def _salvar(self, df: pd.DataFrame, abas: List[str]):
+        if self.pasta is None:
+            return
+        os.makedirs(self.pasta, exist_ok=True)
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        metadados = dict(self._carimbo(), abas=abas, salvo_em=time.time())
+        tabela = tabela.replace_schema_metadata({
+            **(tabela.schema.metadata or {}),
+            _CHAVE_METADADOS: json.dumps(metadados, ensure_ascii=False).encode("utf-8"),
+        })
+        destino = self._arquivo()
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, destino)
+
+    def pendentes(self, hoje: Optional[date] = None) -> List[str]:
+        """
+        Semanas da planilha anteriores à semana passada e ainda não
+        arquivadas, da mais recente para a mais antiga. A lista de abas é
+        relida no máximo a cada ``ttl_abas`` segundos.
+        """
+        hoje = hoje or date.today()
+        if time.monotonic() - self._lista_em > self.ttl_abas:
+            self._lista = self.repositorio.listar_abas()
+            self._lista_em = time.monotonic()
+
+        limite = hoje - timedelta(days=hoje.weekday() + 7)
+        arquivadas = set(self.abas)
+        semanas = [(inicio_semana(aba, hoje), aba) for aba in self._lista if aba not in arquivadas]
+        return [aba for inicio, aba in sorted((s for s in semanas if s[0] and s[0] < limite), reverse=True)]
+
+    def _incorporar(self, abas: List[str], hoje: Optional[date] = None):
+        """
+        Baixa as semanas em lotes e as junta ao arquivo (e ao disco). Chamado
+        com ``_baixando``; ``_lock`` só é tomado para trocar o arquivo.
+        """
+        hoje = hoje or date.today()
+        semanas = []
+        for i in range(0, len(abas), self.abas_por_lote):
+            lote = abas[i:i + self.abas_por_lote]
+            valores = self.repositorio.ler_sem_cache(lote)
+            self.abas_baixadas += len(lote)
+            for aba in lote:
+                semana = _semana_para_df(valores.get(aba, []), aba, inicio_semana(aba, hoje))
+                if not semana.empty:
+                    semanas.append(semana)
+        # Todas as semanas novas tipadas de uma vez
+        novas = tipar_df(pd.concat(semanas, ignore_index=True)) if semanas else None
+
+        with self._lock:
+            df = self.df
+            if novas is not None:
+                df = concatenar_tipados([df, novas]) if not df.empty else novas
+                df["ABA"] = df["ABA"].astype(str).astype("category")
+                # Mais recentes primeiro: a primeira ocorrência de um pedido é a da última semana
+                df = df.sort_values(["SEMANA", "LINHA"], ascending=[False, True], kind="stable")
+            arquivadas = sorted(self.abas + abas, key=lambda aba: inicio_semana(aba, hoje), reverse=True)
+            self._instalar(df, arquivadas)
+            df, arquivadas = self.df, self.abas
+        self._salvar(df, arquivadas)
+
+    def _baixar(self, hoje: Optional[date] = None):
+        """
+        Baixa as ``semanas_por_busca`` semanas pendentes mais recentes e
+        deixa as demais para o segundo plano.
+        """
+        with self._baixando:
+            novas = self.pendentes(hoje)
+            if novas:
+                self._incorporar(novas[:self.semanas_por_busca], hoje)
+        if len(novas) > self.semanas_por_busca:
+            self._completar_em_segundo_plano(hoje)
+
+    def _completar_em_segundo_plano(self, hoje: Optional[date] = None):
+        with self._lock:
+            if self.completando:
+                return
+            self._completador = threading.Thread(
+                target=self._completar, args=(hoje,), name="completar-arquivo-backup", daemon=True
+            )
+            self._completador.start()
+
+    def _completar(self, hoje: Optional[date] = None):
+        """
+        Baixa as semanas que faltam. Cada lote é uma requisição na vez das
+        recargas, então o atualizador intercala as suas; o arquivo (e o
+        índice) é refeito uma vez, no fim.
+        """
+        try:
+            with self._baixando:
+                novas = self.pendentes(hoje)
+                if novas:
+                    self._incorporar(novas, hoje)
+        except Exception as e:
+            self.ultimo_erro = e
+
+    @property
+    def completando(self) -> bool:
+        """Se ainda há semanas sendo baixadas em segundo plano."""
+        return self._completador is not None and self._completador.is_alive()
+
+    def aguardar(self, tempo_limite: Optional[float] = None):
+        """Espera o download em segundo plano terminar (se houver)."""
+        completador = self._completador
+        if completador is not None:
+            completador.join(tempo_limite)
+
+    def localizar(self, pedidos: Iterable[str], hoje: Optional[date] = None) -> pd.DataFrame:
+        """
+        Todas as linhas arquivadas dos pedidos, na ordem de ``pedidos`` e,
+        para cada um, da semana mais recente para a mais antiga. Se algum
+        pedido não estiver no arquivo, as semanas ainda não arquivadas mais
+        recentes são baixadas antes (ver ``pendentes`` e ``_baixar``); com
+        ``completando``, as mais antigas ainda estão chegando.
+        """
+        chaves = list(dict.fromkeys(str(p).strip().upper() for p in pedidos))
+        with self._lock:
+            if not self._lido:
+                self._ler_disco()
+            faltando = any(chave not in self._indice for chave in chaves)
+        if faltando and not self.completando:
+            self._baixar(hoje)
+
+        with self._lock:
+            posicoes = [
+                posicao
+                for chave in chaves
+                for posicao in self._indice.buscar(chave).get(_INDICE, [])
+            ]
+            return self.df.iloc[posicoes].reset_index(drop=True)
+
+    def semanas(self) -> Dict[str, pd.DataFrame]:
+        """
+        As semanas já arquivadas, ``{aba: linhas}``, com o índice no número
+        da linha na aba (como os DataFrames do repositório). Não baixa nada;
+        os mesmos objetos são devolvidos até o arquivo mudar.
+        """
+        with self._lock:
+            if not self._lido:
+                self._ler_disco()
+            if self._semanas is None:
+                grupos = self.df.groupby("ABA", observed=True, sort=False) if not self.df.empty else []
+                self._semanas = {str(aba): grupo.set_index("LINHA") for aba, grupo in grupos}
+            return self._semanas
+
+
+@st.cache_resource(show_spinner=False)
+def get_arquivo_backup() -> ArquivoBackup:
+    """Arquivo do processo, baixado pelo repositório compartilhado."""
+    pasta = os.environ.get(VARIAVEL_PASTA_SNAPSHOT, PASTA_SNAPSHOT_PADRAO)
+    return ArquivoBackup(get_repositorio(), os.path.join(pasta, "backup"))
@@ -0,0 +1,357 @@
+"""
+Busca livre sobre os pedidos: índice invertido em memória das colunas
+PEDIDO, FORNECEDOR, CARRO | UTILIZAÇÃO e OBSERVAÇÕES de várias abas.
+
+Os textos são normalizados uma vez (sem acentos, em maiúsculas) e quebrados
+em palavras. Cada campo tem um dicionário palavra -> linhas; o vocabulário
+de todos os campos fica ordenado, para buscas por prefixo com ``bisect``, e
+as palavras com ``MIN_FUZZY`` letras ou mais entram num índice de deleções
+(cada palavra sem uma das letras), para achar as que estão a uma edição da
+consultada sem percorrer o vocabulário.
+
+Uma consulta com várias palavras devolve as linhas que contêm todas, cada
+uma por igualdade, prefixo ou erro de digitação (uma letra trocada, a mais,
+a menos ou duas vizinhas invertidas), nessa ordem de relevância.
+
+``atualizar`` recebe as abas a cada nova versão dos dados e só refaz as
+linhas que mudaram: cada aba guarda um hash por linha, e só as linhas com
+hash novo (ou que sumiram) são retiradas e indexadas de novo.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+CAMPOS_BUSCA = ["PEDIDO", "FORNECEDOR", "CARRO | UTILIZAÇÃO", "OBSERVAÇÕES"]
+
+# Palavras mais curtas não têm busca com erro de digitação (muitos falsos
+# positivos); palavras só com números só a têm se nada bater exatamente ou
+# por prefixo (24600 e 24300 são carros diferentes)
+MIN_FUZZY = 4
+
+# Teto de palavras do vocabulário expandidas por um prefixo e de linhas
+# devolvidas por consulta
+MAX_PREFIXOS = 200
+MAX_RESULTADOS = 500
+
+# Relevância de cada tipo de correspondência
+PESO_EXATO = 3
+PESO_PREFIXO = 2
+PESO_FUZZY = 1
+
+# Cada linha indexada é um inteiro: código da aba nos bits altos e o número
+# da linha invertido nos baixos, de modo que a ordem dos inteiros é a ordem
+# de exibição (abas na ordem em que foram vistas, linhas mais recentes antes)
+_BITS_LINHA = 32
+_MASCARA_LINHA = (1 << _BITS_LINHA) - 1
+
+_ACENTOS = re.compile("[\u0300-\u036f]")
+_PALAVRA = re.compile(r"[A-Z0-9]+")
+
+
+def palavras(texto) -> List[str]:
+    """Palavras (letras e números) de um texto, sem acentos, em maiúsculas e sem repetição."""
+    normalizado = _ACENTOS.sub("", unicodedata.normalize("NFKD", str(texto))).upper()
+    return list(dict.fromkeys(_PALAVRA.findall(normalizado)))
+
+
+def _delecoes(palavra: str) -> Set[str]:
+    return {palavra[:i] + palavra[i + 1:] for i in range(len(palavra))}
+
+
+def _uma_edicao(a: str, b: str) -> bool:
+    """Distância de edição (com transposição de vizinhas) até 1."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diferencas = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+        if len(diferencas) == 1:
+            return True
+        i = diferencas[0]
+        return len(diferencas) == 2 and diferencas[1] == i + 1 and a[i] == b[i + 1] and a[i + 1] == b[i]
+    curta, longa = (a, b) if len(a) < len(b) else (b, a)
+    i = next((i for i, (x, y) in enumerate(zip(curta, longa)) if x != y), len(curta))
+    return curta[i:] == longa[i + 1:]
+
+
+class IndiceTexto:
+    """
+    Índice invertido das ``campos`` das abas passadas a ``atualizar``. As
+    linhas são as do índice dos DataFrames (o número da linha na aba, como
+    no repositório). Seguro para uso por várias sessões.
+    """
+
+    def __init__(self, campos: Optional[List[str]] = None):
+        self.campos = list(campos or CAMPOS_BUSCA)
+        self._postagens: Dict[str, Dict[str, Set[int]]] = {campo: {} for campo in self.campos}
+        # Palavra -> em quantos pares (campo, linha) aparece
+        self._uso: Dict[str, int] = {}
+        self._vocabulario: List[str] = []
+        self._por_delecao: Dict[str, Set[str]] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._hashes: Dict[str, pd.Series] = {}
+        self._codigos: Dict[str, int] = {}
+        self._abas: List[str] = []
+        self._lock = threading.RLock()
+        self.linhas_indexadas = 0
+
+    def __len__(self) -> int:
+        return sum(len(h) for h in self._hashes.values())
+
+    # --- manutenção ---
+
+    def _codigo(self, aba: str) -> int:
+        if aba not in self._codigos:
+            self._codigos[aba] = len(self._abas)
+            self._abas.append(aba)
+        return self._codigos[aba]
+
+    def _hash_linhas(self, df: pd.DataFrame) -> pd.Series:
+        colunas = [campo for campo in self.campos if campo in df.columns]
+        if not colunas or df.empty:
+            return pd.Series(dtype="uint64", index=df.index[:0])
+        return pd.util.hash_pandas_object(df[colunas], index=False, categorize=True)
+
+    def _grupos(self, aba: str, df: pd.DataFrame):
+        """
+        (campo, palavras, linhas) de cada valor distinto de cada campo: os
+        campos se repetem muito (fornecedores, carros), então cada texto é
+        normalizado uma vez, e as suas linhas entram juntas.
+        """
+        base = self._codigo(aba) << _BITS_LINHA
+        documentos = base | (_MASCARA_LINHA - df.index.to_numpy(dtype="int64"))
+        for campo in self.campos:
+            if campo not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[campo])
+            ordem = np.argsort(codigos, kind="stable")
+            limites = np.searchsorted(codigos[ordem], np.arange(len(valores) + 1))
+            agrupados = documentos[ordem]
+            for k, valor in enumerate(valores):
+                termos = palavras(valor)
+                if termos:
+                    yield campo, termos, agrupados[limites[k]:limites[k + 1]].tolist()
+
+    def _novas_palavras(self, novas: List[str]):
+        # Poucas palavras novas (atualização) entram no lugar; muitas (carga
+        # inicial), com uma única ordenação
+        if len(novas) > 64:
+            self._vocabulario = sorted(self._vocabulario + novas)
+        else:
+            for palavra in novas:
+                bisect.insort(self._vocabulario, palavra)
+        for palavra in novas:
+            if len(palavra) >= MIN_FUZZY:
+                for delecao in _delecoes(palavra):
+                    self._por_delecao.setdefault(delecao, set()).add(palavra)
+
+    def _palavra_removida(self, palavra: str):
+        posicao = bisect.bisect_left(self._vocabulario, palavra)
+        del self._vocabulario[posicao]
+        if len(palavra) >= MIN_FUZZY:
+            for delecao in _delecoes(palavra):
+                vizinhas = self._por_delecao[delecao]
+                vizinhas.discard(palavra)
+                if not vizinhas:
+                    del self._por_delecao[delecao]
+
+    def _adicionar(self, aba: str, df: pd.DataFrame):
+        novas = []
+        for campo, termos, documentos in self._grupos(aba, df):
+            postagens = self._postagens[campo]
+            for palavra in termos:
+                existentes = postagens.get(palavra)
+                if existentes is None:
+                    postagens[palavra] = set(documentos)
+                else:
+                    existentes.update(documentos)
+                uso = self._uso.get(palavra, 0)
+                if uso == 0:
+                    novas.append(palavra)
+                self._uso[palavra] = uso + len(documentos)
+        self._novas_palavras(novas)
+        self.linhas_indexadas += len(df)
+
+    def _remover(self, aba: str, df: pd.DataFrame):
+        for campo, termos, documentos in self._grupos(aba, df):
+            postagens = self._postagens[campo]
+            for palavra in termos:
+                existentes = postagens[palavra]
+                existentes.difference_update(documentos)
+                if not existentes:
+                    del postagens[palavra]
+                self._uso[palavra] -= len(documentos)
+                if self._uso[palavra] == 0:
+                    del self._uso[palavra]
+                    self._palavra_removida(palavra)
+
+    def atualizar(self, frames: Dict[str, pd.DataFrame]):
+        """
+        Passa a indexar exatamente ``frames`` (``{aba: df}``). Abas com o
+        mesmo DataFrame da chamada anterior não são nem lidas; nas demais,
+        só as linhas novas, alteradas ou removidas são refeitas. Os
+        DataFrames são guardados sem cópia e não devem ser alterados.
+        """
+        with self._lock:
+            for aba in [aba for aba in self._frames if aba not in frames]:
+                self._remover(aba, self._frames.pop(aba))
+                del self._hashes[aba]
+
+            for aba, df in frames.items():
+                anterior = self._frames.get(aba)
+                if anterior is df:
+                    continue
+                novos = self._hash_linhas(df)
+                antigos = self._hashes.get(aba, novos.iloc[:0])
+
+                comuns = antigos.index.intersection(novos.index)
+                alteradas = comuns[antigos[comuns].to_numpy() != novos[comuns].to_numpy()]
+                saem = antigos.index.difference(novos.index).union(alteradas)
+                entram = novos.index.difference(antigos.index).union(alteradas)
+
+                if anterior is not None and len(saem):
+                    self._remover(aba, anterior.loc[saem])
+                if len(entram):
+                    self._adicionar(aba, df.loc[entram])
+                self._frames[aba] = df
+                self._hashes[aba] = novos
+
+    # --- consulta ---
+
+    def _correspondencias(self, palavra: str) -> Dict[str, int]:
+        """Palavras do vocabulário que casam com ``palavra`` e o peso de cada uma."""
+        pesos = {}
+        inicio = bisect.bisect_left(self._vocabulario, palavra)
+        for candidata in self._vocabulario[inicio:inicio + MAX_PREFIXOS]:
+            if not candidata.startswith(palavra):
+                break
+            pesos[candidata] = PESO_EXATO if candidata == palavra else PESO_PREFIXO
+
+        numerica = palavra.isdigit()
+        if len(palavra) >= MIN_FUZZY and not (numerica and pesos):
+            candidatas = set(self._por_delecao.get(palavra, ()))
+            for delecao in _delecoes(palavra):
+                candidatas |= self._por_delecao.get(delecao, set())
+                if delecao in self._uso:
+                    candidatas.add(delecao)
+            for candidata in candidatas:
+                if candidata not in pesos and _uma_edicao(palavra, candidata):
+                    pesos[candidata] = PESO_FUZZY
+        return pesos
+
+    def _niveis(self, palavra: str, campos: List[str]) -> List[Tuple[int, Set[int]]]:
+        """(peso, linhas) de uma palavra da consulta, do maior peso ao menor."""
+        por_peso: Dict[int, List[Set[int]]] = {}
+        for candidata, peso in self._correspondencias(palavra).items():
+            for campo in campos:
+                documentos = self._postagens[campo].get(candidata)
+                if documentos:
+                    por_peso.setdefault(peso, []).append(documentos)
+        # Os conjuntos do índice são usados sem cópia quando possível: o
+        # resultado só vale enquanto o lock estiver com quem chamou. Uma
+        # linha pode estar em mais de um nível (fica com o maior, ver buscar)
+        return [
+            (peso, conjuntos[0] if len(conjuntos) == 1 else set().union(*conjuntos))
+            for peso, conjuntos in sorted(por_peso.items(), reverse=True)
+        ]
+
+    def buscar(
+        self,
+        consulta: str,
+        campos: Optional[Iterable[str]] = None,
+        limite: int = MAX_RESULTADOS,
+    ) -> List[Tuple[Tuple[str, int], int]]:
+        """
+        Linhas com todas as palavras de ``consulta`` (em qualquer um dos
+        ``campos``; padrão: todos), como ``((aba, linha), relevância)``, da
+        mais relevante para a menos; empates na ordem das abas e das linhas
+        mais recentes.
+        """
+        termos = palavras(consulta)
+        if not termos:
+            return []
+        campos = [campo for campo in (campos or self.campos) if campo in self._postagens]
+
+        with self._lock:
+            niveis = [self._niveis(termo, campos) for termo in termos]
+            if len(niveis) == 1:
+                grupos = dict(niveis[0])
+            else:
+                # Só operações de conjunto: as linhas com todas as palavras,
+                # agrupadas pela soma dos pesos (poucos grupos, qualquer que
+                # seja o número de linhas)
+                por_tamanho = sorted(niveis, key=lambda nivel: sum(len(docs) for _, docs in nivel))
+                comuns = set().union(*[docs for _, docs in por_tamanho[0]])
+                for nivel in por_tamanho[1:]:
+                    comuns = set().union(*[comuns & docs for _, docs in nivel])
+                grupos = {0: comuns} if comuns else {}
+                for nivel in niveis:
+                    proximos: Dict[int, Set[int]] = {}
+                    for total, documentos in grupos.items():
+                        for peso, do_nivel in nivel:
+                            achados = documentos & do_nivel
+                            if achados:
+                                proximos.setdefault(total + peso, set()).update(achados)
+                    grupos = proximos
+
+            # Do grupo de maior soma para o menor; uma linha que também caiu
+            # num grupo menor (por estar em mais de um nível) sai só no maior
+            resultados, emitidos = [], set()
+            for relevancia in sorted(grupos, reverse=True):
+                if len(resultados) >= limite:
+                    break
+                for documento in sorted(grupos[relevancia]):
+                    if documento in emitidos:
+                        continue
+                    if len(resultados) >= limite:
+                        break
+                    emitidos.add(documento)
+                    aba = self._abas[documento >> _BITS_LINHA]
+                    resultados.append(((aba, _MASCARA_LINHA - (documento & _MASCARA_LINHA)), relevancia))
+        return resultados
+
+    def linhas(self, resultados: List[Tuple[Tuple[str, int], int]]) -> pd.DataFrame:
+        """
+        As linhas dos resultados de ``buscar``, com ABA, LINHA e RELEVÂNCIA na
+        frente. As que já saíram do índice são ignoradas; para linhas que
+        correspondam à busca, use ``buscar_linhas``.
+        """
+        partes = []
+        with self._lock:
+            for (aba, linha), relevancia in resultados:
+                # Linha (ou aba) que saiu numa ``atualizar`` depois da busca
+                df = self._frames.get(aba)
+                if df is not None and linha in df.index:
+                    partes.append((aba, linha, relevancia, df.loc[linha]))
+        if not partes:
+            return pd.DataFrame(columns=["ABA", "LINHA", "RELEVÂNCIA"])
+        tabela = pd.DataFrame([linha for _, _, _, linha in partes])
+        # As semanas arquivadas já trazem ABA (e SEMANA) entre as colunas
+        tabela = tabela.drop(columns=["ABA", "LINHA", "RELEVÂNCIA"], errors="ignore")
+        tabela.insert(0, "RELEVÂNCIA", [r for _, _, r, _ in partes])
+        tabela.insert(0, "LINHA", [linha for _, linha, _, _ in partes])
+        tabela.insert(0, "ABA", [aba for aba, _, _, _ in partes])
+        return tabela.reset_index(drop=True)
+
+    def buscar_linhas(
+        self,
+        consulta: str,
+        campos: Optional[Iterable[str]] = None,
+        limite: int = MAX_RESULTADOS,
+    ) -> pd.DataFrame:
+        """``buscar`` e ``linhas`` sob o mesmo lock: nenhuma ``atualizar`` entre as duas."""
+        with self._lock:
+            return self.linhas(self.buscar(consulta, campos, limite))
+
+
+@st.cache_resource(show_spinner=False)
+def get_indice_texto() -> IndiceTexto:
+    """Índice do processo, compartilhado pelas sessões (atualizado pelas páginas)."""
+    return IndiceTexto()
@@ -0,0 +1,236 @@
+"""
+Cadastro de pedidos: validação de registros (um a um ou em lote colado /
+CSV / XLSX) e fila de gravação compartilhada pelo processo.
+
+A fila junta tudo o que for enviado dentro de ``INTERVALO_GRAVACAO``
+segundos, por qualquer sessão, numa única chamada de append por aba. Cada
+envio recebe um ``Future`` com o resultado de cada um dos seus registros:
+linha gravada ou motivo da recusa.
+"""
+import io
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+import streamlit as st
+
+from comum.indices import COL_PEDIDO, IndicePedidos, normalizar_pedido
+from comum.moeda import parse_moeda
+from comum.planilha import ConflitoEscrita, get_repositorio, montar_cabecalho
+from comum.tipos import converter_datas
+
+INTERVALO_GRAVACAO = 1.0
+
+UNIDADE = [
+    "ADMINISTRATIVO", "CEL.FABRICIANO", "DURVAL DE BARROS", "EXPEDIÇÃO", "GARANTIA",
+    "INDUSTRIA", "ITAUNA", "JARDIM MONTANHÊS", "LAGOA SANTA", "LAVRAS",
+    "MONTES CLAROS", "OLIVEIRA", "PREDIO ADM", "SÃO MARCOS", "VENDA DE VEICULOS",
+    "IPATINGA", "MORRO ALTO", "NEVES", "NOVA LIMA", "VARGINHA", "VESPASIANO",
+]
+STATUS = ["APROVADA", "NÃO APROVADA", "COTAÇÃO", "PEDIDO"]
+AVALIACAO = ["EXPEDIÇÃO", "FINANCEIRO", "UNIDADE"]
+
+COLUNAS_CADASTRO = [
+    "DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "PEDIDO", "VALOR",
+    "FORNECEDOR", "STATUS", "AVALIAÇÃO", "OBSERVAÇÕES",
+]
+CAMPOS_OBRIGATORIOS = ["PEDIDO", "DATA", "UNIDADE", "CARRO | UTILIZAÇÃO", "STATUS"]
+
+# Nomes alternativos aceitos no cabeçalho dos lotes
+SINONIMOS = {
+    "CARRO": "CARRO | UTILIZAÇÃO",
+    "UTILIZAÇÃO": "CARRO | UTILIZAÇÃO",
+    "CARRO/UTILIZAÇÃO": "CARRO | UTILIZAÇÃO",
+    "AVALIACAO": "AVALIAÇÃO",
+    "OBSERVAÇÃO": "OBSERVAÇÕES",
+    "OBSERVACOES": "OBSERVAÇÕES",
+    "PEDIDO/SOLICITAÇÃO": "PEDIDO",
+    "PREVISÃO DE PAGAMENTO": "DATA",
+}
+
+
+# -----------------------
+# LEITURA E VALIDAÇÃO DE LOTES
+# -----------------------
+
+def ler_lote(conteudo: Union[str, bytes], nome_arquivo: Optional[str] = None) -> pd.DataFrame:
+    """
+    Lê um lote de pedidos colado (texto copiado do Excel ou CSV) ou enviado
+    como .csv/.xlsx. A primeira linha é o cabeçalho; todas as células vêm
+    como texto, sem espaços nas pontas.
+    """
+    if nome_arquivo and nome_arquivo.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(io.BytesIO(conteudo), dtype=str)
+    else:
+        texto = conteudo.decode("utf-8-sig") if isinstance(conteudo, bytes) else conteudo
+        primeira = texto.strip().splitlines()[0] if texto.strip() else ""
+        separador = "\t" if "\t" in primeira else ";" if ";" in primeira else ","
+        df = pd.read_csv(io.StringIO(texto), sep=separador, dtype=str, keep_default_na=False)
+
+    colunas = montar_cabecalho(list(df.columns))
+    df.columns = [SINONIMOS.get(c, c) for c in colunas]
+    df = df.fillna("").astype(str).apply(lambda coluna: coluna.str.strip())
+    return df[(df != "").any(axis=1)]
+
+
+def validar_lote(df: pd.DataFrame, indice: IndicePedidos) -> Tuple[List[Dict[str, object]], pd.DataFrame]:
+    """
+    Valida cada linha do lote: campos obrigatórios, data, valor, unidade,
+    status e avaliação conhecidos, pedido ainda não cadastrado (``indice``)
+    e não repetido no próprio lote.
+
+    Devolve os registros válidos, prontos para gravação, e uma tabela com
+    uma linha por recusa (LINHA é a linha no arquivo, contando o cabeçalho).
+    """
+    df = df.reindex(columns=list(dict.fromkeys(list(df.columns) + COLUNAS_CADASTRO)), fill_value="")
+    # dd/mm/aaaa; datas vindas do Excel ("2025-10-16 00:00:00") também valem
+    datas = converter_datas(df["DATA"])[0]
+    valores = parse_moeda(df["VALOR"])
+    valor_invalido = (df["VALOR"] != "") & (
+        ~df["VALOR"].str.contains(r"\d", regex=True)
+        | ((valores == 0) & df["VALOR"].str.contains(r"[1-9]", regex=True))
+    )
+    pedidos = normalizar_pedido(df[COL_PEDIDO]).fillna("")
+    repetidos = pedidos.duplicated(keep="first") & (pedidos != "")
+
+    registros, recusas = [], []
+    for posicao, (rotulo, linha) in enumerate(df.iterrows()):
+        erros = [f"{campo} obrigatório" for campo in CAMPOS_OBRIGATORIOS if linha[campo] == ""]
+        if linha["DATA"] != "" and pd.isna(datas[rotulo]):
+            erros.append(f"data inválida: {linha['DATA']}")
+        if valor_invalido[rotulo]:
+            erros.append(f"valor inválido: {linha['VALOR']}")
+        for campo, opcoes in (("UNIDADE", UNIDADE), ("STATUS", STATUS), ("AVALIAÇÃO", AVALIACAO)):
+            if linha[campo] != "" and linha[campo].upper() not in opcoes:
+                erros.append(f"{campo} desconhecido: {linha[campo]}")
+        if pedidos[rotulo] in indice:
+            erros.append("pedido já cadastrado")
+        elif repetidos[rotulo]:
+            erros.append("pedido repetido no lote")
+
+        if erros:
+            recusas.append({"LINHA": posicao + 2, "PEDIDO": linha[COL_PEDIDO], "ERRO": "; ".join(erros)})
+            continue
+        registro = {campo: linha[campo] for campo in COLUNAS_CADASTRO}
+        registro.update({
+            "DATA": datas[rotulo].strftime("%d/%m/%Y"),
+            "VALOR": float(valores[rotulo]) if linha["VALOR"] != "" else None,
+            "UNIDADE": linha["UNIDADE"].upper(),
+            "STATUS": linha["STATUS"].upper(),
+            "AVALIAÇÃO": linha["AVALIAÇÃO"].upper(),
+        })
+        registros.append(registro)
+
+    return registros, pd.DataFrame(recusas, columns=["LINHA", "PEDIDO", "ERRO"])
+
+
+# -----------------------
+# FILA DE GRAVAÇÃO
+# -----------------------
+
+class FilaEscrita:
+    """
+    Fila de gravação do processo. ``enviar`` não grava na hora: o primeiro
+    envio abre uma janela de ``intervalo`` segundos e tudo o que chegar
+    nela (de qualquer sessão) é gravado com um único append por aba.
+
+    No momento da gravação, os pedidos são conferidos entre si (envios
+    concorrentes podem repetir o mesmo pedido) e contra a aba relida pelo
+    repositório (``acrescentar`` com ``coluna_unica``), então a cópia em
+    cache pode ser antiga sem risco de gravar um pedido duplicado. O
+    ``Future`` de cada envio recebe uma lista com um dicionário por
+    registro: ``PEDIDO``, ``LINHA`` (gravada, ou None) e ``ERRO``.
+    """
+
+    def __init__(self, repositorio, intervalo: float = INTERVALO_GRAVACAO):
+        self.repositorio = repositorio
+        self.intervalo = intervalo
+        self._pendentes: List[Tuple[str, List[Dict[str, object]], Future]] = []
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enviar(self, aba: str, registros: List[Dict[str, object]]) -> Future:
+        futuro = Future()
+        with self._lock:
+            self._pendentes.append((aba, list(registros), futuro))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="fila-escrita", daemon=True)
+                self._thread.start()
+        self._acordar.set()
+        return futuro
+
+    def _executar(self):
+        while True:
+            self._acordar.wait()
+            # Janela para juntar os envios que chegarem em seguida
+            time.sleep(self.intervalo)
+            self._acordar.clear()
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava agora tudo o que está na fila (um append por aba)."""
+        with self._lock:
+            lote, self._pendentes = self._pendentes, []
+
+        por_aba: Dict[str, List[Tuple[List[Dict[str, object]], Future]]] = {}
+        for aba, registros, futuro in lote:
+            por_aba.setdefault(aba, []).append((registros, futuro))
+        for aba, envios in por_aba.items():
+            self._gravar(aba, envios)
+
+    def _gravar(self, aba: str, envios: List[Tuple[List[Dict[str, object]], Future]]):
+        resultados = [
+            [{"PEDIDO": r.get(COL_PEDIDO), "LINHA": None, "ERRO": None} for r in registros]
+            for registros, _ in envios
+        ]
+        try:
+            aceitos, destinos = [], []
+            vistos = set()
+            for i, (registros, _) in enumerate(envios):
+                for j, registro in enumerate(registros):
+                    chave = str(registro.get(COL_PEDIDO, "")).strip().upper()
+                    if chave in vistos:
+                        resultados[i][j]["ERRO"] = "pedido já cadastrado"
+                        continue
+                    vistos.add(chave)
+                    aceitos.append(registro)
+                    destinos.append((i, j))
+
+            while aceitos:
+                try:
+                    primeira = self.repositorio.acrescentar(aba, aceitos, coluna_unica=COL_PEDIDO)
+                except ConflitoEscrita as conflito:
+                    # Gravados por outra pessoa depois da nossa cópia
+                    repetidos = set(conflito.valores)
+                    gravados = conflito.primeira is not None
+                    restantes = []
+                    for deslocamento, (registro, (i, j)) in enumerate(zip(aceitos, destinos)):
+                        if str(registro.get(COL_PEDIDO, "")).strip().upper() in repetidos:
+                            resultados[i][j]["ERRO"] = "pedido já cadastrado"
+                        elif gravados:
+                            resultados[i][j]["LINHA"] = conflito.primeira + deslocamento
+                        else:
+                            restantes.append((registro, (i, j)))
+                    aceitos = [registro for registro, _ in restantes]
+                    destinos = [destino for _, destino in restantes]
+                    continue
+                for deslocamento, (i, j) in enumerate(destinos):
+                    resultados[i][j]["LINHA"] = primeira + deslocamento
+                break
+        except Exception as e:
+            for resultado in resultados:
+                for item in resultado:
+                    if item["LINHA"] is None and item["ERRO"] is None:
+                        item["ERRO"] = f"falha na gravação: {e}"
+
+        for (_, futuro), resultado in zip(envios, resultados):
+            futuro.set_result(resultado)
+
+
+@st.cache_resource(show_spinner=False)
+def get_fila_escrita() -> FilaEscrita:
+    """Fila única do processo, sobre o repositório compartilhado."""
+    return FilaEscrita(get_repositorio())
@@ -0,0 +1,204 @@
+"""
+Índices em memória construídos uma vez, no carregamento dos dados, e
+guardados junto com os DataFrames.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from comum.moeda import TIPO_TEXTO
+
+COL_PEDIDO = "PEDIDO"
+
+
+def normalizar_pedido(serie: pd.Series) -> pd.Series:
+    """Número do pedido sem espaços nas pontas e em maiúsculas."""
+    return serie.astype(TIPO_TEXTO).str.strip().str.upper()
+
+
+class IndicePedidos:
+    """
+    Índice de número de pedido normalizado -> posições (``iloc``) em cada aba.
+
+    A normalização da coluna é feita uma única vez; cada consulta é uma
+    busca em dicionário por aba. Pedidos repetidos guardam todas as
+    posições, na ordem em que aparecem na aba.
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], coluna: str = COL_PEDIDO):
+        self.abas = list(frames)
+        self._posicoes: Dict[str, Dict[str, np.ndarray]] = {}
+
+        for aba, df in frames.items():
+            if df.empty or coluna not in df.columns:
+                self._posicoes[aba] = {}
+                continue
+            chaves = normalizar_pedido(df[coluna]).reset_index(drop=True)
+            # groupby ignora os NA; posições relativas ao DataFrame original
+            grupos = chaves.groupby(chaves, sort=False).indices
+            grupos.pop("", None)
+            self._posicoes[aba] = grupos
+
+    def buscar(self, pedido: str) -> Dict[str, np.ndarray]:
+        """
+        Todas as ocorrências do pedido, por aba, na ordem das abas. Abas
+        sem ocorrência ficam de fora.
+        """
+        chave = str(pedido).strip().upper()
+        return {
+            aba: self._posicoes[aba][chave]
+            for aba in self.abas if chave in self._posicoes[aba]
+        }
+
+    def primeira(self, pedido: str) -> Optional[Tuple[str, int]]:
+        """``(aba, posição)`` da primeira ocorrência, respeitando a ordem das abas."""
+        for aba, posicoes in self.buscar(pedido).items():
+            return aba, int(posicoes[0])
+        return None
+
+    def __contains__(self, pedido: str) -> bool:
+        return self.primeira(pedido) is not None
+
+
+def resolver_pedidos(
+    pedidos: List[str],
+    frames: Dict[str, pd.DataFrame],
+    coluna: str = COL_PEDIDO,
+    colunas: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Resolve uma lista de pedidos contra várias abas com um único merge.
+
+    Vale a primeira ocorrência, na ordem de ``frames`` e, dentro da aba, na
+    ordem das linhas. O resultado tem uma linha por pedido, na ordem de
+    ``pedidos``, com a coluna ``ORIGEM`` (nome da aba) e as colunas da linha
+    encontrada (ou só as de ``colunas``); pedidos não encontrados ficam com NA.
+    """
+    partes = []
+    for aba, df in frames.items():
+        if df.empty or coluna not in df.columns:
+            continue
+        if colunas is not None:
+            df = df[[coluna] + [c for c in colunas if c in df.columns and c != coluna]]
+        partes.append(df.drop_duplicates(coluna, keep="first").assign(ORIGEM=aba))
+
+    consulta = pd.DataFrame({coluna: pd.Series(pedidos, dtype=object)})
+    if not partes:
+        return consulta.assign(ORIGEM=pd.NA)
+
+    uniao = pd.concat(partes, ignore_index=True).drop_duplicates(coluna, keep="first")
+    uniao[coluna] = uniao[coluna].astype(object)
+    return consulta.merge(uniao, on=coluna, how="left")
+
+
+class AgregadoDiario:
+    """
+    Agregados por dia de uma aba já tipada (DATA datetime, VALOR float).
+
+    Na construção, as posições das linhas são ordenadas pela data (ordem
+    estável) e são calculadas as somas e contagens por dia, com somas
+    acumuladas. O DataFrame não é copiado: guarda-se só a referência e as
+    posições ordenadas. Assim:
+
+    - o total de qualquer intervalo são duas buscas binárias e uma subtração;
+    - as linhas de um dia são uma fatia contígua das posições ordenadas;
+    - as somas por status e por unidade de um dia vêm prontas.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        col_data: str = "DATA",
+        col_valor: str = "VALOR",
+        col_status: str = "STATUS",
+        col_unidade: str = "UNIDADE",
+    ):
+        self.col_data = col_data
+        self.col_valor = col_valor
+
+        self.frame = df
+        if df.empty or col_data not in df.columns or col_valor not in df.columns:
+            posicoes = np.array([], dtype="int64")
+            datas = np.array([], dtype="datetime64[ns]")
+            valores = np.array([], dtype="float64")
+        else:
+            posicoes = np.flatnonzero(df[col_data].notna().to_numpy())
+            datas = df[col_data].to_numpy(dtype="datetime64[ns]")[posicoes]
+            valores = df[col_valor].to_numpy(dtype="float64", na_value=0.0)[posicoes]
+
+        ordem = np.argsort(datas, kind="stable")
+        # Posições (em ``frame``) das linhas com data, em ordem de data
+        self._ordem = posicoes[ordem]
+        self._datas = datas[ordem]
+        valores = valores[ordem]
+
+        self._dias, inicio_dia = np.unique(self._datas, return_index=True)
+        somas = np.add.reduceat(valores, inicio_dia) if len(valores) else valores
+        contagens = np.diff(np.append(inicio_dia, len(valores)))
+        self._soma_acumulada = np.concatenate([[0.0], np.cumsum(somas)])
+        self._qtde_acumulada = np.concatenate([[0], np.cumsum(contagens)])
+
+        self.por_dia = pd.DataFrame(
+            {"SOMA": somas, "QTDE": contagens},
+            index=pd.DatetimeIndex(self._dias, name=col_data),
+        )
+
+        # Somas por (dia, status normalizado, unidade); vazio se faltar coluna
+        if col_status in df.columns and col_unidade in df.columns and len(self._ordem):
+            status = df[col_status].astype("string").str.strip().str.upper().to_numpy()
+            detalhe = pd.DataFrame({
+                col_data: self._datas,
+                col_status: status[self._ordem],
+                col_unidade: df[col_unidade].to_numpy()[self._ordem],
+                col_valor: valores,
+            })
+            self.detalhe = detalhe.groupby([col_data, col_status, col_unidade], sort=True)[col_valor].sum()
+        else:
+            self.detalhe = pd.Series(
+                dtype="float64",
+                index=pd.MultiIndex.from_arrays([[], [], []], names=[col_data, col_status, col_unidade]),
+            )
+
+    @staticmethod
+    def _dia(data) -> np.datetime64:
+        return np.datetime64(pd.Timestamp(data).normalize(), "ns")
+
+    def _intervalo_dias(self, inicio, fim) -> Tuple[int, int]:
+        i = np.searchsorted(self._dias, self._dia(inicio), side="left")
+        j = np.searchsorted(self._dias, self._dia(fim), side="right")
+        return i, max(i, j)
+
+    def total(self, inicio, fim) -> float:
+        """Soma de VALOR entre os dias ``inicio`` e ``fim``, inclusive."""
+        i, j = self._intervalo_dias(inicio, fim)
+        return float(self._soma_acumulada[j] - self._soma_acumulada[i])
+
+    def quantidade(self, inicio, fim) -> int:
+        """Número de linhas entre os dias ``inicio`` e ``fim``, inclusive."""
+        i, j = self._intervalo_dias(inicio, fim)
+        return int(self._qtde_acumulada[j] - self._qtde_acumulada[i])
+
+    def dia(self, data) -> pd.DataFrame:
+        """Linhas de um único dia (só elas são copiadas do DataFrame, sem filtro)."""
+        alvo = self._dia(data)
+        i = np.searchsorted(self._datas, alvo, side="left")
+        j = np.searchsorted(self._datas, alvo, side="right")
+        return self.frame.iloc[self._ordem[i:j]]
+
+    def por_status(self, data) -> pd.Series:
+        """Soma de VALOR por status (normalizado) num dia."""
+        try:
+            return self.detalhe.xs(pd.Timestamp(self._dia(data)), level=0).groupby(level=0).sum()
+        except KeyError:
+            return pd.Series(dtype="float64")
+
+    def por_unidade(self, data, status: Optional[str] = None) -> pd.Series:
+        """Soma de VALOR por unidade num dia, opcionalmente só de um status."""
+        try:
+            do_dia = self.detalhe.xs(pd.Timestamp(self._dia(data)), level=0)
+            if status is not None:
+                return do_dia.xs(status, level=0)
+            return do_dia.groupby(level=1).sum()
+        except KeyError:
+            return pd.Series(dtype="float64")
@@ -0,0 +1,117 @@
+"""
+Conversão e formatação de valores em reais (R$) usadas por todas as páginas.
+
+As funções de coluna trabalham sobre a Series inteira de uma vez, sem
+``.apply`` linha a linha, e têm a mesma semântica em qualquer página.
+
+Leitura (``parse_moeda``):
+
+- "R$ 1.234,56", "1.234,56", "R$1234,5" -> 1234.56 / 1234.5
+- "-R$ 1.234,56", "R$ -1.234,56" e "(1.234,56)" -> -1234.56
+- vazio, NA ou texto que não é número -> 0.0
+- colunas já numéricas são mantidas (NaN -> 0.0)
+
+Formatação (``br_money`` e ``formatar_moeda``):
+
+- 1234.5 -> "R$ 1.234,50"; -1234.5 -> "-R$ 1.234,50"; NaN -> "R$ 0,00"
+- meio centavo arredonda para cima (para longe do zero), pelo valor decimal
+  que se lê: 0.005 -> "R$ 0,01", 2.675 -> "R$ 2,68", -0.005 -> "-R$ 0,01"
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    # Tipo compacto para colunas de texto (também usado na tipagem das abas)
+    TIPO_TEXTO = "string[pyarrow]"
+except ImportError:
+    pa = None
+    TIPO_TEXTO = "string"
+
+# Caracteres descartados antes da conversão: "R", "$", espaços (inclusive o
+# não separável), pontos de milhar e parênteses. Substituições literais são
+# bem mais rápidas que uma expressão regular sobre a coluna inteira.
+_CARACTERES_IGNORADOS = ("R", "$", " ", "\u00a0", "\t", ".", "(", ")")
+_NUMERO_VALIDO = r"[+-]?(\d+\.?\d*|\.\d+)"
+
+
+def parse_moeda(serie: pd.Series) -> pd.Series:
+    """Converte uma coluna de valores em reais para float64."""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype("float64").fillna(0.0)
+
+    texto = serie.astype(TIPO_TEXTO).str.strip()
+    negativo = (texto.str.startswith("(") & texto.str.endswith(")")).fillna(False).astype(bool)
+
+    for caractere in _CARACTERES_IGNORADOS:
+        texto = texto.str.replace(caractere, "", regex=False)
+    texto = texto.str.replace(",", ".", regex=False)
+
+    valido = texto.str.fullmatch(_NUMERO_VALIDO).fillna(False).astype(bool)
+    valores = texto.where(valido).astype("float64")
+    valores = valores.where(~negativo, -valores)
+    return valores.fillna(0.0)
+
+
+def _centavos(absoluto):
+    """
+    Centavos de valores não negativos, meio centavo para cima. O produto é
+    arredondado antes para que 2.675 * 100 (267.49999999999997 em binário)
+    conte como 267.5, como o valor escrito.
+    """
+    return np.floor(np.round(absoluto * 100, 6) + 0.5)
+
+
+def _texto_centavos(centavos: int, negativo: bool) -> str:
+    sinal = "-" if negativo and centavos > 0 else ""
+    inteiro = f"{centavos // 100:,}".replace(",", ".")
+    return f"{sinal}R$ {inteiro},{centavos % 100:02d}"
+
+
+def br_money(valor) -> str:
+    """Formata um único valor como "R$ 1.234,56"."""
+    if pd.isna(valor):
+        return "R$ 0,00"
+    return _texto_centavos(int(_centavos(abs(float(valor)))), valor < 0)
+
+
+def formatar_moeda(serie: pd.Series) -> pd.Series:
+    """
+    Formata uma coluna numérica inteira como "R$ 1.234,56".
+
+    Com pyarrow, os centavos e os grupos de milhar são calculados com
+    aritmética inteira e montados com os kernels de texto do Arrow, sem
+    formatar valor por valor em Python.
+    """
+    valores = pd.to_numeric(serie, errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+    centavos_total = _centavos(np.abs(valores)).astype(np.int64)
+    if pa is None:
+        textos = [_texto_centavos(c, n) for c, n in zip(centavos_total.tolist(), (valores < 0).tolist())]
+        return pd.Series(textos, index=serie.index, dtype=object)
+
+    inteiro = centavos_total // 100
+    centavos = pc.utf8_lpad(pa.array(centavos_total % 100).cast(pa.string()), width=2, padding="0")
+
+    # Grupos de milhar, do menos para o mais significativo. O grupo mais alto
+    # de cada número não leva zeros à esquerda; grupos inexistentes ficam
+    # nulos e são ignorados na junção.
+    grupos = []
+    restante = inteiro
+    ordem = 0
+    while True:
+        grupo = pa.array(restante % 1000).cast(pa.string())
+        restante = restante // 1000
+        tem_mais = restante > 0
+        texto = pc.if_else(pa.array(tem_mais), pc.utf8_lpad(grupo, width=3, padding="0"), grupo)
+        if ordem > 0:
+            texto = pc.if_else(pa.array(inteiro >= 1000 ** ordem), texto, pa.scalar(None, pa.string()))
+        grupos.insert(0, texto)
+        ordem += 1
+        if not tem_mais.any():
+            break
+
+    parte_inteira = pc.binary_join_element_wise(*grupos, ".", null_handling="skip")
+    prefixo = pc.if_else(pa.array((valores < 0) & (centavos_total > 0)), "-R$ ", "R$ ")
+    texto = pc.binary_join_element_wise(prefixo, parte_inteira, ",", centavos, "")
+    return pd.Series(texto.to_numpy(zero_copy_only=False), index=serie.index, dtype=object)
@@ -0,0 +1,1023 @@
+"""
+Camada única de acesso às planilhas do Google Sheets.
+
+Todas as páginas (BUSCAR, BACKLOG, CADASTRAR e DASHBOARD) leem as abas por
+aqui: existe um único cliente autorizado por processo e um único cache de
+DataFrames já tratados, indexado por (planilha, aba). As colunas são
+tipadas na carga conforme o esquema de ``comum.tipos``.
+
+O backend é plugável. Em produção usamos o Google Sheets; em testes ou uso
+local, ``BackendMemoria`` (opcionalmente carregado de um arquivo .xlsx)
+substitui a planilha real.
+
+As abas carregadas também são gravadas em disco (``comum.snapshot``): depois
+de um reinício, elas são servidas da cópia local enquanto a planilha é
+consultada em segundo plano. Um thread do processo mantém as abas em dia,
+de modo que as páginas não esperam pela rede (exceto na primeira carga de
+uma aba sem cópia alguma).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from itertools import islice, zip_longest
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import gspread
+import pandas as pd
+import streamlit as st
+from oauth2client.service_account import ServiceAccountCredentials
+
+from comum.snapshot import SnapshotLocal
+from comum.tipos import concatenar_tipados, para_planilha, relatorio_memoria, tipar_df
+
+# --- CONFIGURAÇÃO DE ACESSO ---
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+]
+CREDS_FILE = "acesso.json"
+SPREADSHEET_ID = "1X9trwwqVCwPXY2_O667WJcOR4CHNYbBjJDVsrYNZSgc"
+
+# Quando definida, aponta para um .xlsx usado no lugar do Google Sheets
+VARIAVEL_PLANILHA_LOCAL = "SARITUR_PLANILHA_LOCAL"
+
+# Pasta das cópias locais das abas (pode ser trocada pela variável de ambiente)
+VARIAVEL_PASTA_SNAPSHOT = "SARITUR_PASTA_SNAPSHOT"
+PASTA_SNAPSHOT_PADRAO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "planilhas"
+)
+
+ABA_ALTA = "ALTA"
+ABA_EMERGENCIAL = "EMERGENCIAL"
+ABAS_PRINCIPAIS = [ABA_ALTA, ABA_EMERGENCIAL]
+
+# A primeira linha das abas é um título; o cabeçalho fica na segunda
+LINHA_CABECALHO = 1
+
+TTL_PADRAO = 300
+
+# Intervalo entre as atualizações feitas pelo thread do processo
+INTERVALO_ATUALIZACAO = 60
+
+# Recarga incremental: linhas finais sempre baixadas de novo (edições recentes)
+# e a cada quantas recargas parciais uma aba é baixada por completo
+JANELA_INCREMENTAL = 200
+RECARGA_COMPLETA_A_CADA = 12
+
+
+class AbaNaoEncontrada(KeyError):
+    """A aba solicitada não existe na planilha."""
+
+
+class ConflitoEscrita(Exception):
+    """
+    A gravação foi recusada porque a aba mudou desde a cópia em cache e os
+    registros colidem com as linhas novas (ex.: pedido já gravado por outra
+    pessoa). ``valores`` traz os valores repetidos da coluna única.
+
+    Se outra escrita entrou entre a conferência e o append, a colisão só é
+    vista depois de gravar: as linhas repetidas são apagadas, as demais
+    ficam gravadas e ``primeira`` traz o número da primeira linha (como o
+    retorno de ``acrescentar``). Antes de gravar, ``primeira`` é None.
+    """
+
+    def __init__(self, aba: str, coluna: str, valores: List[str], primeira: Optional[int] = None):
+        super().__init__(f"{coluna} já existente na aba {aba}: {', '.join(valores)}")
+        self.aba = aba
+        self.coluna = coluna
+        self.valores = valores
+        self.primeira = primeira
+
+
+# -----------------------
+# BACKENDS
+# -----------------------
+
+def _aparar(linha: List[str]) -> List[str]:
+    """Remove as células vazias do fim da linha (a API não as devolve)."""
+    fim = len(linha)
+    while fim and not str(linha[fim - 1]).strip():
+        fim -= 1
+    return [str(c) for c in linha[:fim]]
+
+
+def _cauda_normalizada(linhas: List[List[str]], largura: int) -> List[List[str]]:
+    """Linhas até a coluna ``largura``, aparadas e sem as linhas vazias do fim."""
+    cauda = [_aparar(linha[:largura]) for linha in linhas]
+    while cauda and not cauda[-1]:
+        cauda.pop()
+    return cauda
+
+
+def _linhas_com_conteudo(linhas: List[List[str]]) -> int:
+    """
+    Quantas linhas vão até a última com alguma célula preenchida: as linhas
+    vazias do fim (a aba pode ter milhares) não contam.
+    """
+    fim = len(linhas)
+    while fim and not any(str(c).strip() for c in linhas[fim - 1]):
+        fim -= 1
+    return fim
+
+
+def _intervalo_aba(aba: str) -> str:
+    """Notação A1 para a aba inteira, com aspas simples escapadas."""
+    return "'" + aba.replace("'", "''") + "'"
+
+
+def _coluna_a1(numero: int) -> str:
+    """Letra da coluna em notação A1 (1 -> A, 27 -> AA)."""
+    letras = ""
+    while numero:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+class BackendGoogleSheets:
+    """
+    Lê as abas de uma planilha do Google Sheets aberta pela chave.
+
+    ``ler_varias`` busca todas as abas num único ``values:batchGet`` e devolve
+    as linhas como a API as entrega (sem as células vazias do fim). Os
+    nomes das abas existentes ficam guardados; os metadados só são
+    consultados de novo quando uma aba pedida não é conhecida ou o lote
+    falha (aba renomeada ou apagada), ou seja, uma ou duas requisições.
+
+    ``client`` pode ser uma função que devolve o cliente: assim a
+    autorização só acontece na primeira requisição.
+    """
+
+    def __init__(self, client: Union[gspread.Client, Callable[[], gspread.Client]], spreadsheet_id: str):
+        self.spreadsheet_id = spreadsheet_id
+        self._client = client
+        self._sh = None
+        self._titulos = None
+
+    def _planilha(self) -> gspread.Spreadsheet:
+        if self._sh is None:
+            client = self._client() if callable(self._client) else self._client
+            self._sh = client.open_by_key(self.spreadsheet_id)
+        return self._sh
+
+    def _atualizar_titulos(self) -> List[str]:
+        metadados = self._planilha().fetch_sheet_metadata()
+        titulos = [p["properties"]["title"] for p in metadados.get("sheets", [])]
+        self._titulos = set(titulos)
+        return titulos
+
+    def listar_abas(self) -> List[str]:
+        """Títulos de todas as abas, na ordem da planilha (uma requisição de metadados)."""
+        return self._atualizar_titulos()
+
+    def _ler_lote(self, abas: List[str]) -> Dict[str, List[List[str]]]:
+        presentes = [aba for aba in abas if aba in self._titulos]
+        if not presentes:
+            return {}
+
+        resposta = self._planilha().values_batch_get([_intervalo_aba(aba) for aba in presentes])
+        return {
+            aba: intervalo.get("values", [])
+            for aba, intervalo in zip(presentes, resposta.get("valueRanges", []))
+        }
+
+    def ler_varias(self, abas: List[str]) -> Dict[str, List[List[str]]]:
+        if self._titulos is None or not set(abas) <= self._titulos:
+            self._atualizar_titulos()
+            return self._ler_lote(abas)
+
+        try:
+            return self._ler_lote(abas)
+        except gspread.exceptions.APIError:
+            self._atualizar_titulos()
+            return self._ler_lote(abas)
+
+    def ler_caudas(self, pedidos: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[List[str], List[List[str]]]]:
+        """
+        Para cada aba, com ``(linha_inicial, largura)``, devolve a linha de
+        cabeçalho e as linhas a partir de ``linha_inicial`` (1-based), até a
+        coluna ``largura``. Tudo num único ``values:batchGet``.
+        """
+        if self._titulos is None or not set(pedidos) <= self._titulos:
+            self._atualizar_titulos()
+        presentes = [aba for aba in pedidos if aba in self._titulos]
+        if not presentes:
+            return {}
+
+        linha_cabecalho = LINHA_CABECALHO + 1
+        intervalos = []
+        for aba in presentes:
+            inicio, largura = pedidos[aba]
+            intervalos.append(f"{_intervalo_aba(aba)}!{linha_cabecalho}:{linha_cabecalho}")
+            intervalos.append(f"{_intervalo_aba(aba)}!A{inicio}:{_coluna_a1(largura)}")
+
+        faixas = self._planilha().values_batch_get(intervalos).get("valueRanges", [])
+        resultado = {}
+        for i, aba in enumerate(presentes):
+            cabecalho = faixas[2 * i].get("values", [[]])
+            resultado[aba] = (cabecalho[0] if cabecalho else [], faixas[2 * i + 1].get("values", []))
+        return resultado
+
+    def acrescentar_linhas(self, aba: str, linhas: List[List[str]]) -> int:
+        """
+        Acrescenta as linhas depois da última linha com dados da aba num
+        único ``values:append``; só as linhas novas trafegam. Devolve o
+        número (1-based) da primeira linha gravada.
+        """
+        resposta = self._planilha().values_append(
+            _intervalo_aba(aba),
+            params={"valueInputOption": "USER_ENTERED", "insertDataOption": "INSERT_ROWS"},
+            body={"values": linhas},
+        )
+        intervalo = resposta.get("updates", {}).get("updatedRange", "")
+        return int(re.search(r"![A-Z]+(\d+)", intervalo).group(1))
+
+    def limpar_linhas(self, aba: str, numeros: List[int]):
+        """Apaga o conteúdo das linhas (1-based) num único ``values:batchClear``."""
+        self._planilha().values_batch_clear(
+            body={"ranges": [f"{_intervalo_aba(aba)}!{numero}:{numero}" for numero in numeros]}
+        )
+
+
+class BackendMemoria:
+    """
+    Substituto local da planilha: cada aba é uma lista de linhas de strings,
+    como as devolvidas pela API (linhas de comprimentos diferentes são aceitas).
+
+    ``chamadas`` conta as idas ao "servidor", para conferir quantas
+    requisições cada operação faria contra o Google Sheets, e
+    ``bytes_enviados`` o tamanho (JSON) de cada escrita. Cada chamada é
+    atômica, como no servidor, então vários repositórios (ou threads
+    simulando outras pessoas) podem usar o mesmo backend ao mesmo tempo.
+    """
+
+    def __init__(self, abas: Dict[str, List[List[str]]], spreadsheet_id: str = "memoria"):
+        self.spreadsheet_id = spreadsheet_id
+        self.abas = {nome: [list(linha) for linha in linhas] for nome, linhas in abas.items()}
+        self.chamadas = 0
+        self.bytes_enviados: List[int] = []
+        self.trava = threading.Lock()
+
+    @classmethod
+    def de_arquivo(cls, caminho: str) -> "BackendMemoria":
+        """Carrega todas as abas de um arquivo .xlsx exportado da planilha."""
+        planilhas = pd.read_excel(caminho, sheet_name=None, header=None, dtype=str)
+        abas = {
+            nome: df.fillna("").values.tolist()
+            for nome, df in planilhas.items()
+        }
+        return cls(abas, spreadsheet_id=os.path.abspath(caminho))
+
+    def listar_abas(self) -> List[str]:
+        with self.trava:
+            self.chamadas += 1
+            return list(self.abas)
+
+    def ler_varias(self, abas: List[str]) -> Dict[str, List[List[str]]]:
+        with self.trava:
+            self.chamadas += 1
+            return {
+                aba: [list(linha) for linha in self.abas[aba]]
+                for aba in abas if aba in self.abas
+            }
+
+    def ler_caudas(self, pedidos: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[List[str], List[List[str]]]]:
+        with self.trava:
+            return self._ler_caudas(pedidos)
+
+    def _ler_caudas(self, pedidos: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[List[str], List[List[str]]]]:
+        self.chamadas += 1
+        resultado = {}
+        for aba, (inicio, largura) in pedidos.items():
+            if aba not in self.abas:
+                continue
+            linhas = self.abas[aba]
+            cabecalho = linhas[LINHA_CABECALHO] if len(linhas) > LINHA_CABECALHO else []
+            resultado[aba] = (list(cabecalho), [list(linha[:largura]) for linha in linhas[inicio - 1:]])
+        return resultado
+
+    def acrescentar_linhas(self, aba: str, linhas: List[List[str]]) -> int:
+        with self.trava:
+            return self._acrescentar_linhas(aba, linhas)
+
+    def _acrescentar_linhas(self, aba: str, linhas: List[List[str]]) -> int:
+        self.chamadas += 1
+        self.bytes_enviados.append(len(json.dumps({"values": linhas}, ensure_ascii=False).encode("utf-8")))
+        if aba not in self.abas:
+            raise AbaNaoEncontrada(aba)
+
+        destino = self.abas[aba]
+        # Como a API: depois da última linha com algum conteúdo
+        while destino and not any(str(c).strip() for c in destino[-1]):
+            destino.pop()
+        primeira = len(destino) + 1
+        destino.extend(list(linha) for linha in linhas)
+        return primeira
+
+    def limpar_linhas(self, aba: str, numeros: List[int]):
+        with self.trava:
+            self.chamadas += 1
+            destino = self.abas[aba]
+            for numero in numeros:
+                destino[numero - 1] = [""] * len(destino[numero - 1])
+
+
+# -----------------------
+# CONVERSÃO DOS VALORES BRUTOS
+# -----------------------
+
+def montar_cabecalho(linha: List[str]) -> List[str]:
+    """
+    Cabeçalho em maiúsculas, com sufixo ``_1``, ``_2``... nos nomes repetidos.
+    O sufixo nunca colide com outra coluna (ex.: "A", "A_1", "A" -> "A",
+    "A_1", "A_2"), então os nomes são sempre únicos.
+    """
+    raw_headers = [str(h).strip().upper() for h in linha]
+    seen_headers = {}
+    unique_headers = []
+    usados = set()
+
+    for header in raw_headers:
+        nome = header
+        while nome in usados:
+            seen_headers[header] = seen_headers.get(header, 0) + 1
+            nome = f"{header}_{seen_headers[header]}"
+        usados.add(nome)
+        unique_headers.append(nome)
+    return unique_headers
+
+
+def linhas_para_df(linhas: List[List[str]], colunas: List[str], primeira_linha: int) -> pd.DataFrame:
+    """
+    Monta o DataFrame de um trecho da aba. O índice é o número da linha na
+    planilha (1-based, a partir de ``primeira_linha``), o que permite trocar
+    só o final de um DataFrame já carregado.
+
+    As linhas podem ter comprimentos diferentes. As totalmente vazias (as
+    abas têm milhares delas no fim) são descartadas antes de montar o
+    DataFrame, e as demais são transpostas em colunas de uma vez
+    (``zip_longest`` completa as células que faltam). Células vazias viram
+    None; o tipo final das colunas vem de ``comum.tipos.tipar_df``.
+    """
+    posicoes = [i for i, linha in enumerate(linhas) if any(linha)]
+    cheias = [linhas[i] for i in posicoes]
+
+    largura = len(colunas)
+    por_coluna = list(islice(zip_longest(*cheias, fillvalue=""), largura))
+    por_coluna += [("",) * len(cheias)] * (largura - len(por_coluna))
+
+    dados = {
+        coluna: [valor if valor != "" else None for valor in valores]
+        for coluna, valores in zip(colunas, por_coluna)
+    }
+    indice = pd.Index([primeira_linha + i for i in posicoes], dtype="int64")
+    return pd.DataFrame(dados, index=indice, columns=colunas, dtype=object)
+
+
+def valores_para_df(valores: List[List[str]]) -> pd.DataFrame:
+    """
+    Converte uma aba inteira (título, cabeçalho e dados) em DataFrame. O
+    cabeçalho é completado até a largura da linha mais longa.
+    """
+    if len(valores) <= LINHA_CABECALHO:
+        return pd.DataFrame()
+
+    largura = max(len(linha) for linha in valores)
+    cabecalho = list(valores[LINHA_CABECALHO])
+    colunas = montar_cabecalho(cabecalho + [""] * (largura - len(cabecalho)))
+    return linhas_para_df(valores[LINHA_CABECALHO + 1:], colunas, LINHA_CABECALHO + 2)
+
+
+# -----------------------
+# REPOSITÓRIO COM CACHE
+# -----------------------
+
+class _Entrada:
+    """Última cópia conhecida de uma aba (``df`` é None se a aba não existe)."""
+
+    def __init__(self, df: Optional[pd.DataFrame], cabecalho: List[str], total_linhas: int):
+        self.df = df
+        self.cabecalho = cabecalho
+        self.total_linhas = total_linhas
+        self.carregado_em = time.monotonic()
+        # Horário (relógio de parede) dos dados, para exibição
+        self.atualizado_em = time.time()
+        self.recargas_parciais = 0
+        # Textos das últimas linhas da aba (a partir de ``cauda_inicio``), como
+        # lidos da planilha; 0 quando desconhecidos (cópia vinda do disco)
+        self.cauda_inicio = 0
+        self.cauda: List[List[str]] = []
+        # (linha, coluna, texto) das células de data que não viraram data
+        self.datas_invalidas: List[Tuple[int, str, str]] = []
+
+    def definir_cauda(self, inicio: int, linhas: List[List[str]], janela: int):
+        cauda = _cauda_normalizada(linhas, len(self.cabecalho))
+        excesso = max(0, len(cauda) - janela)
+        self.cauda_inicio = inicio + excesso
+        self.cauda = cauda[excesso:]
+
+    @property
+    def assinatura(self) -> Optional[Tuple[int, str]]:
+        """
+        Versão da aba: número de linhas com conteúdo e hash das linhas
+        finais. Duas cópias com a mesma assinatura têm o mesmo fim de aba.
+        """
+        if not self.cauda_inicio:
+            return None
+        return _assinatura(self.cauda_inicio, self.cauda)
+
+
+def _assinatura(inicio: int, cauda: List[List[str]]) -> Tuple[int, str]:
+    conteudo = json.dumps(cauda, ensure_ascii=False).encode("utf-8")
+    return (inicio - 1 + len(cauda), hashlib.sha1(conteudo).hexdigest())
+
+
+def _mesmo_conteudo(atual: _Entrada, nova: _Entrada) -> bool:
+    """A nova leitura de uma aba trouxe exatamente o que já está em cache?"""
+    if atual.df is None or nova.df is None:
+        return atual.df is None and nova.df is None
+    if atual.cabecalho != nova.cabecalho or atual.total_linhas != nova.total_linhas:
+        return False
+    # Fim da aba diferente basta para saber que mudou (sem comparar tudo)
+    if atual.assinatura is not None and nova.assinatura is not None and atual.assinatura != nova.assinatura:
+        return False
+    return atual.datas_invalidas == nova.datas_invalidas and atual.df.equals(nova.df)
+
+
+class RepositorioPlanilha:
+    """
+    Cache de DataFrames por (planilha, aba) sobre um backend.
+
+    Com ``incremental=True`` (padrão), uma aba vencida não é baixada inteira:
+    as abas só crescem no fim e são editadas perto das datas recentes, então
+    basta buscar as linhas além da última contagem conhecida mais uma janela
+    final de ``janela`` linhas e substituí-las no DataFrame guardado. Se o
+    cabeçalho mudar, ou a cada ``recarga_completa_a_cada`` recargas parciais,
+    a aba é baixada por completo.
+
+    Os DataFrames devolvidos são compartilhados entre sessões e páginas:
+    quem precisar alterá-los deve trabalhar sobre uma cópia.
+
+    As leituras ao backend são feitas uma de cada vez, fora da trava do
+    cache: enquanto uma aba é atualizada, as demais (e a própria, se ainda
+    estiver no prazo) continuam sendo servidas. ``versao`` aumenta a cada
+    atualização que muda alguma aba e serve de chave para caches derivados
+    nas páginas.
+
+    Com ``snapshot``, cada aba atualizada é gravada em disco e
+    ``restaurar_snapshot`` recoloca essas cópias no cache ao iniciar.
+
+    Com o atualizador iniciado (``iniciar_atualizador``), todas as abas em
+    cache são atualizadas a cada ``intervalo`` segundos num thread próprio e
+    trocadas de uma vez no cache; leituras de abas vencidas devolvem a cópia
+    atual e só pedem uma atualização antecipada.
+
+    ``abas_vigentes``, se dada, devolve as abas que continuam em cache (ex.:
+    a aba de backup muda toda semana). A cada rodada do atualizador as
+    demais saem do cache e da cópia local, e ``restaurar_snapshot`` não as
+    recoloca; se alguém voltar a pedi-las, são lidas de novo.
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttl: float = TTL_PADRAO,
+        incremental: bool = True,
+        janela: int = JANELA_INCREMENTAL,
+        recarga_completa_a_cada: int = RECARGA_COMPLETA_A_CADA,
+        snapshot: Optional[SnapshotLocal] = None,
+        abas_vigentes: Optional[Callable[[], List[str]]] = None,
+    ):
+        self.backend = backend
+        self.abas_vigentes = abas_vigentes
+        self.ttl = ttl
+        self.incremental = incremental
+        self.janela = janela
+        self.recarga_completa_a_cada = recarga_completa_a_cada
+        self.snapshot = snapshot if snapshot is not None and snapshot.disponivel else None
+        self.versao = 0
+        self.ultimo_erro: Optional[Exception] = None
+        self._cache: Dict[Tuple[str, str], _Entrada] = {}
+        self._lock = threading.RLock()
+        self._recarga = threading.Lock()
+        self._acordar = threading.Event()
+        self._atualizador: Optional[threading.Thread] = None
+
+    def _chave(self, aba: str) -> Tuple[str, str]:
+        return (self.backend.spreadsheet_id, aba)
+
+    def _valida(self, entrada: Optional[_Entrada], idade_maxima: float) -> bool:
+        return entrada is not None and time.monotonic() - entrada.carregado_em <= idade_maxima
+
+    def _aceita_parcial(self, entrada: Optional[_Entrada]) -> bool:
+        return (
+            self.incremental
+            and entrada is not None
+            and entrada.df is not None
+            and len(entrada.cabecalho) > 0
+            and entrada.recargas_parciais < self.recarga_completa_a_cada
+        )
+
+    def _recarregar_completas(self, abas: List[str]) -> Dict[str, _Entrada]:
+        valores = self.backend.ler_varias(abas)
+        novas = {}
+        for aba in abas:
+            if aba in valores:
+                linhas = valores[aba]
+                cabecalho = linhas[LINHA_CABECALHO] if len(linhas) > LINHA_CABECALHO else []
+                invalidas = []
+                # A janela parte da última linha com dados, não do fim das linhas vazias
+                total_linhas = _linhas_com_conteudo(linhas)
+                entrada = _Entrada(tipar_df(valores_para_df(linhas), invalidas), list(cabecalho), total_linhas)
+                entrada.datas_invalidas = invalidas
+                inicio = max(LINHA_CABECALHO + 2, total_linhas + 1 - self.janela)
+                entrada.definir_cauda(inicio, linhas[inicio - 1:], self.janela)
+                novas[aba] = entrada
+            else:
+                # Abas ausentes também ficam em cache para não serem
+                # procuradas de novo a cada chamada
+                novas[aba] = _Entrada(None, [], 0)
+        return novas
+
+    def _recarregar_parciais(self, atuais: Dict[str, _Entrada]) -> Tuple[Dict[str, _Entrada], List[str]]:
+        """Aplica as caudas novas; devolve as entradas novas e as abas que precisam de recarga completa."""
+        primeira_linha_dados = LINHA_CABECALHO + 2
+        pedidos = {}
+        for aba, entrada in atuais.items():
+            inicio = max(primeira_linha_dados, entrada.total_linhas + 1 - self.janela)
+            pedidos[aba] = (inicio, len(entrada.cabecalho))
+
+        caudas = self.backend.ler_caudas(pedidos)
+        novas = {}
+        pendentes = []
+        for aba, entrada in atuais.items():
+            if aba not in caudas or _aparar(caudas[aba][0]) != _aparar(entrada.cabecalho):
+                pendentes.append(aba)
+                continue
+
+            novas[aba] = self._aplicar_cauda(entrada, pedidos[aba][0], caudas[aba][1])
+        return novas, pendentes
+
+    def _aplicar_cauda(self, entrada: _Entrada, inicio: int, linhas: List[List[str]]) -> _Entrada:
+        """Nova entrada com as linhas a partir de ``inicio`` trocadas pelas lidas agora."""
+        base = entrada.df[entrada.df.index < inicio]
+        invalidas = [item for item in entrada.datas_invalidas if item[0] < inicio]
+        cauda = tipar_df(linhas_para_df(linhas, list(entrada.df.columns), inicio), invalidas)
+        partes = [parte for parte in (base, cauda) if not parte.empty]
+
+        # Última linha com dados: na cauda lida ou, se ela veio vazia, na base
+        com_conteudo = _linhas_com_conteudo(linhas)
+        if com_conteudo:
+            total_linhas = inicio - 1 + com_conteudo
+        else:
+            total_linhas = int(base.index.max()) if not base.empty else LINHA_CABECALHO + 1
+        nova = _Entrada(concatenar_tipados(partes) if partes else base, entrada.cabecalho, total_linhas)
+        nova.datas_invalidas = invalidas
+        nova.recargas_parciais = entrada.recargas_parciais + 1
+        nova.definir_cauda(inicio, linhas, self.janela)
+        return nova
+
+    def _instalar(self, novas: Dict[str, _Entrada]):
+        """
+        Troca as entradas no cache de uma vez e grava as cópias locais (com
+        ``_recarga``). Abas que voltaram iguais só têm o prazo renovado: o
+        DataFrame em cache continua o mesmo objeto, e ``versao`` (com os caches
+        derivados nas páginas) e a cópia local só mudam se alguma aba mudou.
+        """
+        mudaram = {}
+        with self._lock:
+            for aba, entrada in novas.items():
+                atual = self._cache.get(self._chave(aba))
+                if atual is not None and _mesmo_conteudo(atual, entrada):
+                    atual.carregado_em = entrada.carregado_em
+                    atual.atualizado_em = entrada.atualizado_em
+                    atual.recargas_parciais = entrada.recargas_parciais
+                    atual.cauda_inicio, atual.cauda = entrada.cauda_inicio, entrada.cauda
+                    continue
+                self._cache[self._chave(aba)] = entrada
+                mudaram[aba] = entrada
+            if mudaram:
+                self.versao += 1
+
+        if self.snapshot is not None:
+            for aba, entrada in mudaram.items():
+                if entrada.df is not None:
+                    self.snapshot.salvar(
+                        self.backend.spreadsheet_id, aba, entrada.df,
+                        entrada.cabecalho, entrada.total_linhas, entrada.recargas_parciais,
+                        entrada.datas_invalidas,
+                    )
+
+    def atualizar(self, abas: List[str], idade_maxima: Optional[float] = None):
+        """
+        Atualiza já as abas no backend (bloqueia). Com ``idade_maxima``, as
+        que outro thread atualizou enquanto esta chamada esperava a vez são
+        puladas. Todas as abas novas entram no cache de uma só vez.
+        """
+        with self._recarga:
+            with self._lock:
+                atuais = {aba: self._cache.get(self._chave(aba)) for aba in abas}
+            if idade_maxima is not None:
+                atuais = {aba: e for aba, e in atuais.items() if not self._valida(e, idade_maxima)}
+            if not atuais:
+                return
+
+            parciais = {aba: e for aba, e in atuais.items() if self._aceita_parcial(e)}
+            completas = [aba for aba in atuais if aba not in parciais]
+
+            novas = {}
+            if parciais:
+                novas, pendentes = self._recarregar_parciais(parciais)
+                completas += pendentes
+            if completas:
+                novas.update(self._recarregar_completas(completas))
+            self._instalar(novas)
+
+    def carregar_abas(self, abas: List[str], ttl: Optional[float] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Devolve as abas pedidas. As que não estão em cache ou cuja cópia é
+        mais antiga que ``ttl`` segundos (padrão: o TTL do repositório) são
+        atualizadas em no máximo duas requisições em lote: uma para as
+        caudas das recargas parciais e outra para as recargas completas.
+        Abas inexistentes ficam de fora do resultado.
+
+        Com o atualizador em execução e sem ``ttl`` explícito, abas vencidas
+        não bloqueiam: a cópia atual é devolvida e a atualização é pedida ao
+        atualizador. Quem precisa de dados recentes passa ``ttl``; gravações
+        não precisam, pois ``acrescentar`` confere a versão da aba antes.
+        """
+        idade_maxima = self.ttl if ttl is None else ttl
+
+        with self._lock:
+            ausentes = [aba for aba in abas if self._chave(aba) not in self._cache]
+            vencidas = [
+                aba for aba in abas
+                if aba not in ausentes and not self._valida(self._cache[self._chave(aba)], idade_maxima)
+            ]
+        if vencidas and ttl is None and self.atualizador_ativo:
+            self.solicitar_atualizacao()
+            vencidas = []
+        if ausentes or vencidas:
+            self.atualizar(ausentes + vencidas, idade_maxima)
+
+        with self._lock:
+            resultado = {}
+            for aba in abas:
+                entrada = self._cache.get(self._chave(aba))
+                if entrada is not None and entrada.df is not None:
+                    resultado[aba] = entrada.df
+            return resultado
+
+    def listar_abas(self) -> List[str]:
+        """Títulos das abas da planilha, na vez das recargas (``_recarga``)."""
+        with self._recarga:
+            return list(self.backend.listar_abas())
+
+    def ler_sem_cache(self, abas: List[str]) -> Dict[str, List[List[str]]]:
+        """
+        Valores brutos das abas num único lote, sem passar pelo cache (ex.:
+        semanas de backup arquivadas à parte). A leitura espera a vez das
+        recargas (``_recarga``), como as do atualizador, para que as duas
+        não disputem a cota da API ao mesmo tempo.
+        """
+        with self._recarga:
+            return self.backend.ler_varias(abas)
+
+    def carregar_aba(self, aba: str, ttl: Optional[float] = None) -> pd.DataFrame:
+        """Carrega uma aba; lança ``AbaNaoEncontrada`` se ela não existir."""
+        resultado = self.carregar_abas([aba], ttl=ttl)
+        if aba not in resultado:
+            raise AbaNaoEncontrada(aba)
+        return resultado[aba]
+
+    def acrescentar(
+        self,
+        aba: str,
+        registros: List[Dict[str, object]],
+        coluna_unica: Optional[str] = None,
+    ) -> int:
+        """
+        Grava os registros (``{coluna: valor}``) no fim da aba com uma única
+        chamada de append, sem reescrever as linhas existentes. As colunas
+        seguem o cabeçalho em cache; datas e valores vão no formato da
+        planilha. Devolve o número da primeira linha gravada.
+
+        Antes de gravar, o fim da aba é relido (uma requisição) e comparado
+        com a assinatura da cópia em cache (linhas com conteúdo + hash das
+        linhas finais). Se alguém mexeu na aba desde então, a cópia é
+        atualizada com o que foi lido e a gravação segue sobre ela (um
+        append não depende das linhas anteriores). Se o append cair antes do
+        fim conhecido (linhas apagadas no fim ou uma lacuna preenchida), a
+        aba é relida inteira. Com ``coluna_unica``,
+        registros cujo valor já exista na aba atualizada recusam a gravação
+        inteira com ``ConflitoEscrita``; se a colisão vier de uma escrita
+        feita durante o próprio append, só as linhas repetidas são desfeitas
+        (ver ``ConflitoEscrita.primeira``).
+
+        As linhas gravadas entram logo no DataFrame em cache (com o número
+        de linha devolvido pela API), sem nova leitura.
+        """
+        colunas = list(self.carregar_aba(aba).columns)
+        desconhecidas = sorted({c for registro in registros for c in registro} - set(colunas))
+        if desconhecidas:
+            raise ValueError(f"Colunas inexistentes na aba {aba}: {', '.join(desconhecidas)}")
+
+        textos = para_planilha(pd.DataFrame(list(registros), columns=colunas))
+        linhas = [_aparar(linha) for linha in textos.values.tolist()]
+
+        # Serializado com as atualizações: a troca no cache não é sobrescrita
+        # por uma recarga que leu a aba antes da gravação
+        with self._recarga:
+            entrada = self._conferir_versao(aba)
+            if entrada is None:
+                raise AbaNaoEncontrada(aba)
+
+            invalidas = []
+            novas = tipar_df(linhas_para_df(linhas, colunas, 1), invalidas)
+            if coluna_unica is not None:
+                gravados = novas[coluna_unica].isin(entrada.df[coluna_unica].dropna()) & novas[coluna_unica].notna()
+                if gravados.any():
+                    raise ConflitoEscrita(aba, coluna_unica, [str(v) for v in novas.loc[gravados, coluna_unica]])
+
+            esperada = entrada.assinatura[0] + 1
+            primeira = self.backend.acrescentar_linhas(aba, linhas)
+            repetidos: List[str] = []
+
+            if primeira == esperada:
+                novas.index = novas.index + (primeira - 1)
+                nova = _Entrada(concatenar_tipados([entrada.df, novas]), entrada.cabecalho, primeira - 1 + len(linhas))
+                nova.carregado_em = entrada.carregado_em
+                nova.recargas_parciais = entrada.recargas_parciais
+                nova.definir_cauda(entrada.cauda_inicio, entrada.cauda + linhas, self.janela)
+                nova.datas_invalidas = entrada.datas_invalidas + [
+                    (linha + primeira - 1, coluna, texto) for linha, coluna, texto in invalidas
+                ]
+            elif primeira < esperada:
+                # O append caiu antes do fim conhecido (linhas finais apagadas
+                # ou uma lacuna preenchida): a cópia não serve de base e a aba
+                # é relida inteira; com coluna única, as linhas gravadas que
+                # repetem um valor de outra linha são desfeitas
+                nova = self._recarregar_completas([aba])[aba]
+                if coluna_unica is not None and nova.df is not None:
+                    gravadas = nova.df.index.isin(range(primeira, primeira + len(linhas)))
+                    outras = nova.df.loc[~gravadas, coluna_unica].dropna()
+                    colide = (novas[coluna_unica].isin(outras) & novas[coluna_unica].notna()).to_numpy()
+                    if colide.any():
+                        self.backend.limpar_linhas(aba, [primeira + p for p in (novas.index[colide] - 1)])
+                        repetidos = [str(v) for v in novas.loc[colide, coluna_unica]]
+                        nova = self._recarregar_completas([aba])[aba]
+                if nova.df is None:
+                    raise AbaNaoEncontrada(aba)
+            else:
+                # Outra escrita entrou entre a conferência e o append: relê
+                # desde o fim conhecido, desfaz as linhas que repetem a coluna
+                # única e atualiza a cópia com tudo o que foi lido
+                lidas = self.backend.ler_caudas({aba: (esperada, len(entrada.cabecalho))})[aba][1]
+                if coluna_unica is not None:
+                    intrusas = tipar_df(linhas_para_df(lidas[:primeira - esperada], colunas, esperada))
+                    colide = novas[coluna_unica].isin(intrusas[coluna_unica].dropna()).to_numpy()
+                    if colide.any():
+                        posicoes = [primeira - esperada + p for p in (novas.index[colide] - 1)]
+                        self.backend.limpar_linhas(aba, [esperada + p for p in posicoes])
+                        for p in posicoes:
+                            lidas[p] = []
+                        repetidos = [str(v) for v in novas.loc[colide, coluna_unica]]
+                nova = self._aplicar_cauda(entrada, esperada, lidas)
+                nova.recargas_parciais = entrada.recargas_parciais
+
+            with self._lock:
+                self._cache[self._chave(aba)] = nova
+                self.versao += 1
+        if repetidos:
+            raise ConflitoEscrita(aba, coluna_unica, repetidos, primeira=primeira)
+        return primeira
+
+    def _conferir_versao(self, aba: str) -> Optional[_Entrada]:
+        """
+        Relê o fim da aba e, se a assinatura não bate com a da cópia em
+        cache, instala a cópia atualizada (recarga completa se o cabeçalho
+        mudou). Chamado com ``_recarga``. Devolve a entrada em vigor.
+        """
+        with self._lock:
+            entrada = self._cache.get(self._chave(aba))
+        if entrada is None or entrada.df is None or not entrada.cabecalho:
+            self._instalar(self._recarregar_completas([aba]))
+            return self._em_cache(aba)
+
+        inicio = entrada.cauda_inicio or max(LINHA_CABECALHO + 2, entrada.total_linhas + 1 - self.janela)
+        lida = self.backend.ler_caudas({aba: (inicio, len(entrada.cabecalho))}).get(aba)
+        if lida is None or _aparar(lida[0]) != _aparar(entrada.cabecalho):
+            novas = self._recarregar_completas([aba])
+        elif _assinatura(inicio, _cauda_normalizada(lida[1], len(entrada.cabecalho))) != entrada.assinatura:
+            novas = {aba: self._aplicar_cauda(entrada, inicio, lida[1])}
+        else:
+            return entrada
+
+        self._instalar(novas)
+        return self._em_cache(aba)
+
+    def _em_cache(self, aba: str) -> Optional[_Entrada]:
+        """Entrada em vigor de uma aba existente (None se ausente do cache ou da planilha)."""
+        with self._lock:
+            entrada = self._cache.get(self._chave(aba))
+        return entrada if entrada is not None and entrada.df is not None else None
+
+    def descartar_antigas(self) -> List[str]:
+        """
+        Tira do cache e da cópia local as abas fora de ``abas_vigentes``
+        (nada sem ela). Devolve as abas descartadas.
+        """
+        if self.abas_vigentes is None:
+            return []
+        vigentes = set(self.abas_vigentes())
+        with self._lock:
+            antigas = [
+                aba for planilha, aba in self._cache
+                if planilha == self.backend.spreadsheet_id and aba not in vigentes
+            ]
+            for aba in antigas:
+                del self._cache[self._chave(aba)]
+        if self.snapshot is not None:
+            for aba in antigas:
+                self.snapshot.remover(self.backend.spreadsheet_id, aba)
+        return antigas
+
+    def expirar(self, aba: Optional[str] = None):
+        """
+        Marca uma aba (ou todas) como vencida, mantendo a última cópia: a
+        próxima leitura faz uma recarga incremental em vez de completa.
+        """
+        with self._lock:
+            for chave, entrada in self._cache.items():
+                if aba is None or chave == self._chave(aba):
+                    entrada.carregado_em = float("-inf")
+
+    def restaurar_snapshot(self) -> List[str]:
+        """
+        Coloca no cache as cópias locais das abas ainda não carregadas, como
+        se tivessem acabado de ser lidas. Cópias mais antigas que o ciclo de
+        recargas parciais ficam marcadas para recarga completa na próxima
+        atualização. Devolve as abas restauradas.
+        """
+        if self.snapshot is None:
+            return []
+
+        copias = self.snapshot.carregar(self.backend.spreadsheet_id)
+        vigentes = set(self.abas_vigentes()) if self.abas_vigentes is not None else None
+        for aba in [aba for aba in copias if vigentes is not None and aba not in vigentes]:
+            # Aba que saiu de uso (ex.: backup de uma semana anterior)
+            self.snapshot.remover(self.backend.spreadsheet_id, aba)
+            del copias[aba]
+
+        limite_parcial = self.ttl * self.recarga_completa_a_cada
+        restauradas = []
+        with self._lock:
+            for aba, (df, metadados) in copias.items():
+                if self._chave(aba) in self._cache:
+                    continue
+                # Última linha com dados pelo próprio DataFrame (cópias antigas
+                # contavam as linhas vazias do fim)
+                total_linhas = int(df.index.max()) if not df.empty else metadados["total_linhas"]
+                entrada = _Entrada(df, metadados["cabecalho"], total_linhas)
+                entrada.atualizado_em = metadados.get("salvo_em", entrada.atualizado_em)
+                entrada.recargas_parciais = metadados.get("recargas_parciais", 0)
+                entrada.datas_invalidas = [tuple(item) for item in metadados.get("datas_invalidas", [])]
+                if time.time() - metadados.get("salvo_em", 0) > limite_parcial:
+                    entrada.recargas_parciais = self.recarga_completa_a_cada
+                self._cache[self._chave(aba)] = entrada
+                restauradas.append(aba)
+            if restauradas:
+                self.versao += 1
+        return restauradas
+
+    @property
+    def atualizador_ativo(self) -> bool:
+        return self._atualizador is not None and self._atualizador.is_alive()
+
+    def iniciar_atualizador(self, intervalo: float = INTERVALO_ATUALIZACAO):
+        """
+        Inicia (uma vez) o thread que atualiza todas as abas em cache a cada
+        ``intervalo`` segundos ou quando ``solicitar_atualizacao`` é chamado,
+        depois de descartar as que saíram de ``abas_vigentes``.
+        Em caso de falha, as cópias atuais continuam valendo e o erro fica
+        em ``ultimo_erro``.
+        """
+        with self._lock:
+            if self.atualizador_ativo:
+                return
+
+            def executar():
+                while True:
+                    self._acordar.wait(intervalo)
+                    self._acordar.clear()
+                    try:
+                        self.descartar_antigas()
+                    except Exception as e:
+                        self.ultimo_erro = e
+                    with self._lock:
+                        abas = [aba for planilha, aba in self._cache if planilha == self.backend.spreadsheet_id]
+                    if not abas:
+                        continue
+                    try:
+                        self.atualizar(abas)
+                        self.ultimo_erro = None
+                    except Exception as e:
+                        self.ultimo_erro = e
+
+            self._atualizador = threading.Thread(target=executar, name="atualizador-planilha", daemon=True)
+            self._atualizador.start()
+
+    def solicitar_atualizacao(self):
+        """Antecipa a próxima rodada do atualizador (não espera por ela)."""
+        self._acordar.set()
+
+    def atualizado_em(self, abas: Optional[List[str]] = None) -> Optional[float]:
+        """
+        Horário (``time.time()``) da cópia mais antiga entre as abas pedidas
+        (ou todas); None se nenhuma estiver em cache.
+        """
+        with self._lock:
+            horarios = [
+                entrada.atualizado_em
+                for (_, aba), entrada in self._cache.items()
+                if entrada.df is not None and (abas is None or aba in abas)
+            ]
+        return min(horarios, default=None)
+
+    def relatorio_memoria(self) -> pd.DataFrame:
+        """Memória das abas em cache, como texto e tipadas (ver ``comum.tipos``)."""
+        with self._lock:
+            frames = {
+                aba: entrada.df
+                for (_, aba), entrada in self._cache.items() if entrada.df is not None
+            }
+        return relatorio_memoria(frames)
+
+    def relatorio_datas(self, abas: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Células de data que não puderam ser convertidas, uma por linha: ABA,
+        LINHA (na planilha), COLUNA e TEXTO como está na planilha.
+        """
+        with self._lock:
+            linhas = [
+                {"ABA": aba, "LINHA": linha, "COLUNA": coluna, "TEXTO": texto}
+                for (_, aba), entrada in self._cache.items()
+                if entrada.df is not None and (abas is None or aba in abas)
+                for linha, coluna, texto in entrada.datas_invalidas
+            ]
+        return pd.DataFrame(linhas, columns=["ABA", "LINHA", "COLUNA", "TEXTO"])
+
+    def invalidar(self, aba: Optional[str] = None):
+        """Descarta do cache uma aba específica ou todas (próxima leitura completa)."""
+        with self._lock:
+            if aba is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self._chave(aba), None)
+
+
+# -----------------------
+# INSTÂNCIAS POR PROCESSO
+# -----------------------
+
+@st.cache_resource(show_spinner=False)
+def get_gspread_client() -> gspread.Client:
+    """Autoriza uma única vez por processo com a conta de serviço."""
+    creds_json = st.secrets.get("google_sheets_service_account")
+
+    if creds_json:
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(creds_json), SCOPE)
+    else:
+        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDS_FILE, SCOPE)
+    return gspread.authorize(creds)
+
+
+def abas_vigentes() -> List[str]:
+    """ALTA, EMERGENCIAL e a aba de backup da semana passada (as que as páginas carregam)."""
+    # Importada aqui: comum.backup importa este módulo
+    from comum.backup import nome_aba_backup
+    return ABAS_PRINCIPAIS + [nome_aba_backup()]
+
+
+@st.cache_resource(show_spinner=False)
+def get_repositorio() -> RepositorioPlanilha:
+    """Repositório compartilhado por todas as páginas e sessões do processo."""
+    caminho_local = os.environ.get(VARIAVEL_PLANILHA_LOCAL)
+    if caminho_local:
+        backend = BackendMemoria.de_arquivo(caminho_local)
+    else:
+        # Autorização adiada até a primeira requisição (não atrasa a cópia local)
+        backend = BackendGoogleSheets(get_gspread_client, SPREADSHEET_ID)
+
+    pasta = os.environ.get(VARIAVEL_PASTA_SNAPSHOT, PASTA_SNAPSHOT_PADRAO)
+    repositorio = RepositorioPlanilha(backend, snapshot=SnapshotLocal(pasta), abas_vigentes=abas_vigentes)
+
+    # Primeira página servida da cópia local; a planilha é consultada em paralelo
+    restauradas = repositorio.restaurar_snapshot()
+    repositorio.iniciar_atualizador()
+    if restauradas:
+        repositorio.solicitar_atualizacao()
+    return repositorio
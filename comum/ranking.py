@@ -0,0 +1,93 @@
+"""
+Rankings de gastos por unidade do DASHBOARD (ALTA, EMERGENCIAL e total),
+calculados numa única passada sobre as abas já tipadas do repositório.
+
+Cada aba entra só com três vetores: código da unidade (das categorias de
+UNIDADE, normalizadas uma vez por categoria, e não por linha), valor e
+fonte. O filtro de período (e de STATUS, na ALTA) é uma máscara sobre
+o vetor de DATA (datetime64) da própria aba, VALOR (float64) é lido sem
+reconversão e só as linhas filtradas são copiadas. A soma por (fonte,
+unidade) é um único ``np.bincount``; o total é a soma das fontes, sem
+novo agrupamento.
+"""
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+FONTES = ["ALTA", "EMERGENCIAL"]
+
+# Na ALTA, entram no ranking só as linhas com este STATUS
+STATUS_RANKING = {"ALTA": "PEDIDO"}
+
+
+def _categorias_normalizadas(serie: pd.Series):
+    """(códigos por linha, categorias sem espaços nas pontas e em maiúsculas)."""
+    categorica = serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype("category")
+    nomes = categorica.cat.categories.astype(str).str.strip().str.upper()
+    return categorica.cat.codes.to_numpy(), nomes
+
+
+def _mascara_periodo(df: pd.DataFrame, d_inicio: date, d_fim: date) -> np.ndarray:
+    """Linhas com DATA de ``d_inicio`` a ``d_fim``, inclusive (NaT fica de fora)."""
+    datas = df["DATA"].to_numpy()
+    return (datas >= np.datetime64(d_inicio)) & (datas < np.datetime64(d_fim + timedelta(days=1)))
+
+
+def _ranking(unidades: pd.Index, somas: np.ndarray, presentes: np.ndarray) -> pd.DataFrame:
+    """UNIDADE e VALOR_NUM das unidades presentes, do menor para o maior valor."""
+    ranking = pd.DataFrame({"UNIDADE": unidades[presentes], "VALOR_NUM": somas[presentes]})
+    return ranking.sort_values("VALOR_NUM", ascending=True, kind="stable").reset_index(drop=True)
+
+
+def calcular_rankings(
+    frames: Dict[str, Optional[pd.DataFrame]], d_inicio: date, d_fim: date
+) -> Dict[str, pd.DataFrame]:
+    """
+    Rankings de ``d_inicio`` a ``d_fim`` (inclusive) para cada aba de
+    ``FONTES`` em ``frames`` e o "TOTAL" das duas. Cada ranking tem UNIDADE
+    e VALOR_NUM, em ordem crescente de valor (vazio se não houver linhas).
+
+    As abas precisam estar tipadas (DATA em datetime64 e VALOR em float64,
+    como as do repositório); não são alteradas nem copiadas inteiras.
+    Linhas sem unidade ficam de fora; valores vazios contam como zero.
+    """
+    codigos, valores, fontes, nomes = [], [], [], []
+    for fonte, aba in enumerate(FONTES):
+        df = frames.get(aba)
+        if df is None or df.empty:
+            continue
+        codigos_aba, nomes_aba = _categorias_normalizadas(df["UNIDADE"])
+        mascara = _mascara_periodo(df, d_inicio, d_fim) & (codigos_aba >= 0)
+        status = STATUS_RANKING.get(aba)
+        if status is not None:
+            codigos_status, nomes_status = _categorias_normalizadas(df["STATUS"])
+            aceitos = np.append(np.asarray(nomes_status == status), False)
+            mascara &= aceitos[codigos_status]
+
+        codigos.append(codigos_aba[mascara])
+        valores.append(np.nan_to_num(df["VALOR"].to_numpy(dtype="float64")[mascara], copy=False))
+        fontes.append(np.full(int(mascara.sum()), fonte))
+        nomes.append(nomes_aba)
+
+    if not codigos:
+        vazio = pd.DataFrame({"UNIDADE": pd.Series(dtype=str), "VALOR_NUM": pd.Series(dtype="float64")})
+        return {chave: vazio.copy() for chave in FONTES + ["TOTAL"]}
+
+    # Unidades das duas abas num só vocabulário (nomes iguais após normalizar)
+    unidades = pd.Index(sorted(set().union(*nomes)))
+    deslocamento = np.cumsum([0] + [len(n) for n in nomes])
+    mapa = np.concatenate([unidades.get_indexer(n) for n in nomes])
+    unidade = mapa[np.concatenate(codigos) + np.repeat(deslocamento[:-1], [len(c) for c in codigos])]
+    fonte = np.concatenate(fontes)
+
+    # Uma passada: soma e contagem por (fonte, unidade)
+    chave = fonte * len(unidades) + unidade
+    tamanho = len(FONTES) * len(unidades)
+    somas = np.bincount(chave, weights=np.concatenate(valores), minlength=tamanho).reshape(len(FONTES), -1)
+    contagens = np.bincount(chave, minlength=tamanho).reshape(len(FONTES), -1)
+
+    rankings = {aba: _ranking(unidades, somas[i], contagens[i] > 0) for i, aba in enumerate(FONTES)}
+    rankings["TOTAL"] = _ranking(unidades, somas.sum(axis=0), contagens.sum(axis=0) > 0)
+    return rankings
@@ -0,0 +1,540 @@
+"""
+Geração dos anexos do relatório do DASHBOARD (PNGs das figuras e planilha
+XLSX).
+
+Cada anexo é uma função sem argumentos que devolve os bytes do arquivo.
+``gerar_anexos`` executa todas ao mesmo tempo num pool de threads: a
+exportação pelo kaleido passa quase todo o tempo esperando o navegador
+(fora do GIL), então o relatório fica pronto no tempo do anexo mais lento,
+e não na soma de todos. O tempo de cada anexo volta junto, para exibição.
+
+As imagens saem de ``ExportadorImagens``: um navegador do kaleido aberto
+uma vez por processo (e aquecido ao iniciar), com uma página de
+renderização por exportação simultânea. Sem ele (kaleido ou Chrome
+ausentes, navegador travado), cada imagem usa ``fig.to_image``, que abre e
+fecha um navegador por chamada.
+
+Os bytes de cada anexo ficam em ``CacheArtefatos``, endereçados pelo
+conteúdo (especificação da figura ou dados da tabela, mais o tamanho):
+reenviar o mesmo relatório, ou gerá-lo em outra sessão, não exporta de
+novo o que não mudou.
+
+Geração e envio por e-mail rodam fora da página, em ``FilaRelatorios``:
+cada envio vira um ``TrabalhoRelatorio`` com identificador e estado, que a
+página consulta até terminar.
+"""
+import asyncio
+import hashlib
+import io
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import kaleido
+    from choreographer.errors import ChromeNotFoundError
+except ImportError:
+    kaleido = None
+    ChromeNotFoundError = None
+
+MAX_ANEXOS_SIMULTANEOS = 4
+
+# Limites (segundos) para abrir o navegador e para cada exportação
+TEMPO_LIMITE_ABERTURA = 60
+TEMPO_LIMITE_EXPORTACAO = 60
+
+# Intervalo mínimo (segundos) entre duas checagens de saúde do navegador:
+# uma por relatório, antes da primeira imagem que não está no cache
+INTERVALO_VERIFICACAO = 30
+
+# Servidor de e-mail padrão (Gmail, com STARTTLS)
+SERVIDOR_SMTP = "smtp.gmail.com"
+PORTA_SMTP = 587
+
+# Reenvio: tentativas por relatório e espera antes da segunda (dobra a cada
+# nova tentativa); conexão SMTP fechada depois de tanto tempo sem envios
+TENTATIVAS_ENVIO = 3
+ESPERA_REENVIO = 2.0
+OCIOSIDADE_SMTP = 60
+TEMPO_LIMITE_SMTP = 30
+
+# Teto (bytes) do cache de anexos gerados; os menos usados saem primeiro
+LIMITE_CACHE_ARTEFATOS = 64 * 1024 * 1024
+
+# Figura mínima usada para aquecer e testar o navegador
+_FIGURA_TESTE = {"data": [{"type": "bar", "x": [1], "y": [1]}], "layout": {}}
+
+
+class ExportadorImagens:
+    """
+    Navegador do kaleido mantido aberto pelo processo, num thread com o seu
+    próprio event loop. ``paginas`` exportações podem rodar ao mesmo tempo;
+    as demais esperam uma página livre.
+
+    ``iniciar`` abre o navegador e renderiza uma figura mínima (aquecimento).
+    Sem Chrome/Chromium no sistema (ver packages.txt), o kaleido baixa uma
+    cópia própria (``kaleido.get_chrome_sync``; uma tentativa por processo).
+    ``verificar`` é a checagem de saúde: renderiza a mesma figura e, se
+    falhar, reinicia o navegador. ``exportar`` a faz antes de exportar, no
+    máximo a cada ``INTERVALO_VERIFICACAO`` segundos; anexos que saem do
+    cache não exportam e não a disparam. Se uma exportação falhar no
+    navegador aberto, ele é descartado (reaberto na próxima) e a imagem sai
+    pelo caminho de reserva, ``fig.to_image``. O último erro fica em
+    ``ultimo_erro``.
+    """
+
+    def __init__(self, paginas: int = MAX_ANEXOS_SIMULTANEOS, tempo_limite: float = TEMPO_LIMITE_EXPORTACAO):
+        self.paginas = paginas
+        self.tempo_limite = tempo_limite
+        self.ultimo_erro: Optional[Exception] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._kaleido = None
+        self._verificado_em = float("-inf")
+        self._chrome_baixado = False
+        self._lock = threading.Lock()
+        self._lock_verificacao = threading.Lock()
+
+    @property
+    def disponivel(self) -> bool:
+        return kaleido is not None
+
+    @property
+    def ativo(self) -> bool:
+        return self._kaleido is not None
+
+    def iniciar(self) -> bool:
+        """Abre e aquece o navegador (uma vez). Devolve se ele está pronto."""
+        with self._lock:
+            if self.ativo:
+                return True
+            if not self.disponivel:
+                return False
+
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="exportador-imagens", daemon=True).start()
+
+            async def abrir():
+                navegador = kaleido.Kaleido(n=self.paginas, timeout=self.tempo_limite)
+                await navegador.open()
+                return navegador
+
+            try:
+                try:
+                    navegador = asyncio.run_coroutine_threadsafe(abrir(), loop).result(TEMPO_LIMITE_ABERTURA)
+                except ChromeNotFoundError:
+                    if self._chrome_baixado:
+                        raise
+                    self._chrome_baixado = True
+                    kaleido.get_chrome_sync()
+                    navegador = asyncio.run_coroutine_threadsafe(abrir(), loop).result(TEMPO_LIMITE_ABERTURA)
+            except Exception as e:
+                loop.call_soon_threadsafe(loop.stop)
+                self.ultimo_erro = e
+                return False
+            self._loop, self._kaleido = loop, navegador
+
+        try:
+            self._renderizar(_FIGURA_TESTE, 10, 10)
+        except Exception as e:
+            self._descartar(e)
+            return False
+        self.ultimo_erro = None
+        self._verificado_em = time.monotonic()
+        return True
+
+    def verificar(self) -> bool:
+        """Checagem de saúde: renderiza a figura de teste, reiniciando o navegador se preciso."""
+        if self.ativo:
+            try:
+                self._renderizar(_FIGURA_TESTE, 10, 10)
+                self._verificado_em = time.monotonic()
+                return True
+            except Exception as e:
+                self._descartar(e)
+        return self.iniciar()
+
+    def _verificar_se_preciso(self) -> bool:
+        # Exportações simultâneas esperam uma única checagem
+        with self._lock_verificacao:
+            if time.monotonic() - self._verificado_em <= INTERVALO_VERIFICACAO:
+                return self.ativo or self.iniciar()
+            return self.verificar()
+
+    def _renderizar(self, fig_dict: dict, largura: int, altura: int, formato: str = "png") -> bytes:
+        opcoes = {"format": formato, "width": largura, "height": altura, "scale": 1}
+        futuro = asyncio.run_coroutine_threadsafe(self._kaleido.calc_fig(fig_dict, opts=opcoes), self._loop)
+        return futuro.result(self.tempo_limite)
+
+    def _descartar(self, erro: Exception):
+        with self._lock:
+            navegador, loop = self._kaleido, self._loop
+            self._kaleido = self._loop = None
+            self.ultimo_erro = erro
+        if navegador is None:
+            return
+
+        async def fechar():
+            try:
+                await navegador.close()
+            finally:
+                loop.stop()
+
+        asyncio.run_coroutine_threadsafe(fechar(), loop)
+
+    def exportar(self, fig, largura: int, altura: int, formato: str = "png") -> bytes:
+        """Imagem da figura pelo navegador aberto; reserva: ``fig.to_image``."""
+        if self._verificar_se_preciso():
+            try:
+                return self._renderizar(fig.to_dict(), largura, altura, formato)
+            except Exception as e:
+                self._descartar(e)
+        return fig.to_image(format=formato, width=largura, height=altura)
+
+
+@st.cache_resource(show_spinner=False)
+def get_exportador() -> ExportadorImagens:
+    """
+    Exportador do processo. O aquecimento (abrir o navegador) roda em
+    segundo plano, para não atrasar a página que o pediu.
+    """
+    exportador = ExportadorImagens()
+    threading.Thread(target=exportador.iniciar, name="aquecer-exportador", daemon=True).start()
+    return exportador
+
+
+class CacheArtefatos:
+    """
+    Cache LRU de bytes gerados (PNG, XLSX), limitado a ``limite_bytes`` no
+    total. A chave é um hash do conteúdo de origem (ver ``_chave``), então
+    a mesma figura com os mesmos dados reaproveita o arquivo, venha de que
+    sessão vier. Artefatos maiores que o limite não são guardados.
+    """
+
+    def __init__(self, limite_bytes: int = LIMITE_CACHE_ARTEFATOS):
+        self.limite_bytes = limite_bytes
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.faltas = 0
+        self._itens: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def obter(self, chave: str, gerar: Callable[[], bytes]) -> bytes:
+        """Bytes de ``chave``; gera (fora da trava) e guarda se faltar."""
+        with self._lock:
+            conteudo = self._itens.get(chave)
+            if conteudo is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return conteudo
+            self.faltas += 1
+
+        conteudo = gerar()
+        if len(conteudo) > self.limite_bytes:
+            return conteudo
+        with self._lock:
+            if chave not in self._itens:
+                self._itens[chave] = conteudo
+                self.bytes_usados += len(conteudo)
+            while self.bytes_usados > self.limite_bytes:
+                _, antigo = self._itens.popitem(last=False)
+                self.bytes_usados -= len(antigo)
+        return conteudo
+
+
+def _chave(*partes) -> str:
+    """Hash das partes (textos, bytes ou valores simples) de um artefato."""
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else repr(parte).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache_artefatos() -> CacheArtefatos:
+    """Cache de anexos do processo, compartilhado pelas sessões."""
+    return CacheArtefatos()
+
+
+def exportar_png(
+    fig,
+    largura: int,
+    altura: int,
+    exportador: Optional[ExportadorImagens] = None,
+    cache: Optional[CacheArtefatos] = None,
+) -> Callable[[], bytes]:
+    """
+    Anexo PNG de uma figura do plotly (pelo ``exportador``, se houver). Com
+    ``cache``, a chave é a especificação JSON da figura e o tamanho.
+    """
+    if exportador is not None:
+        gerar = lambda: exportador.exportar(fig, largura, altura)
+    else:
+        gerar = lambda: fig.to_image(format="png", width=largura, height=altura)
+    if cache is None:
+        return gerar
+    return lambda: cache.obter(_chave("png", fig.to_json(), largura, altura), gerar)
+
+
+def exportar_xlsx(df: pd.DataFrame, aba: str, cache: Optional[CacheArtefatos] = None) -> Callable[[], bytes]:
+    """
+    Anexo XLSX com ``df`` numa única aba, sem o índice. Com ``cache``, a
+    chave é a aba, as colunas e o hash das linhas.
+    """
+    def gerar() -> bytes:
+        buf = io.BytesIO()
+        with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name=aba)
+        return buf.getvalue()
+    if cache is None:
+        return gerar
+
+    def gerar_em_cache() -> bytes:
+        linhas = pd.util.hash_pandas_object(df, index=False).values.tobytes()
+        return cache.obter(_chave("xlsx", aba, list(df.columns), linhas), gerar)
+    return gerar_em_cache
+
+
+def _cronometrar(gerar: Callable[[], bytes]) -> Tuple[bytes, float]:
+    inicio = time.perf_counter()
+    conteudo = gerar()
+    return conteudo, time.perf_counter() - inicio
+
+
+def gerar_anexos(
+    anexos: Dict[str, Callable[[], bytes]],
+    max_simultaneos: int = MAX_ANEXOS_SIMULTANEOS,
+) -> Tuple[Dict[str, bytes], pd.DataFrame]:
+    """
+    Gera todos os anexos (``{arquivo: funcao}``) ao mesmo tempo.
+
+    Devolve ``{arquivo: bytes}``, na ordem de ``anexos``, e uma tabela com
+    ARQUIVO, SEGUNDOS e BYTES de cada um, mais uma linha TOTAL com o tempo
+    de relógio do conjunto. Se algum anexo falhar, a exceção é relançada
+    depois que os demais terminarem.
+    """
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_simultaneos, len(anexos)))) as pool:
+        futuros = {arquivo: pool.submit(_cronometrar, gerar) for arquivo, gerar in anexos.items()}
+    total = time.perf_counter() - inicio
+
+    arquivos, tempos = {}, []
+    for arquivo, futuro in futuros.items():
+        conteudo, segundos = futuro.result()
+        arquivos[arquivo] = conteudo
+        tempos.append({"ARQUIVO": arquivo, "SEGUNDOS": round(segundos, 3), "BYTES": len(conteudo)})
+    tempos.append({"ARQUIVO": "TOTAL", "SEGUNDOS": round(total, 3), "BYTES": sum(len(c) for c in arquivos.values())})
+    return arquivos, pd.DataFrame(tempos, columns=["ARQUIVO", "SEGUNDOS", "BYTES"])
+
+
+# -----------------------
+# FILA DE RELATÓRIOS
+# -----------------------
+
+NA_FILA = "na fila"
+GERANDO = "gerando anexos"
+ENVIANDO = "enviando"
+ENVIADO = "enviado"
+FALHOU = "falhou"
+
+
+def _permanente(erro: Exception) -> bool:
+    """
+    Recusa que não adianta repetir: resposta 5xx do servidor (login,
+    remetente, destinatários, dados) ou recurso não suportado. Respostas
+    4xx e falhas de conexão são temporárias.
+    """
+    if isinstance(erro, smtplib.SMTPNotSupportedError):
+        return True
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        codigos = [codigo for codigo, _ in erro.recipients.values()]
+        return bool(codigos) and all(codigo >= 500 for codigo in codigos)
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return erro.smtp_code >= 500
+    return False
+
+
+class TrabalhoRelatorio:
+    """
+    Um relatório na fila. ``montar`` gera a mensagem pronta e a tabela de
+    tempos dos anexos (roda no thread da fila, sem chamadas ao Streamlit).
+    """
+
+    def __init__(self, montar: Callable[[], Tuple[Message, pd.DataFrame]]):
+        self.id = uuid.uuid4().hex[:8]
+        self.estado = NA_FILA
+        self.tentativas = 0
+        self.erro: Optional[str] = None
+        self.tempos: Optional[pd.DataFrame] = None
+        self.criado_em = time.time()
+        self.concluido_em: Optional[float] = None
+        self.montar = montar
+
+    @property
+    def concluido(self) -> bool:
+        return self.estado in (ENVIADO, FALHOU)
+
+
+class FilaRelatorios:
+    """
+    Fila de relatórios do processo, atendida por um thread próprio: a
+    página só enfileira (``enviar``) e consulta o estado (``trabalho``).
+
+    Os relatórios saem um de cada vez pela mesma conexão SMTP, que é
+    conferida (NOOP) antes de cada envio e fechada depois de
+    ``ociosidade`` segundos sem envios. Falhas temporárias de envio são
+    repetidas até ``tentativas`` vezes, esperando ``espera``, 2x``espera``...
+    entre elas; recusas permanentes (respostas 5xx: login, destinatário,
+    mensagem) e erros fora do SMTP falham na hora, sem parar a fila.
+    """
+
+    def __init__(
+        self,
+        servidor: str = SERVIDOR_SMTP,
+        porta: int = PORTA_SMTP,
+        usuario: Optional[str] = None,
+        senha: Optional[str] = None,
+        starttls: bool = True,
+        tentativas: int = TENTATIVAS_ENVIO,
+        espera: float = ESPERA_REENVIO,
+        ociosidade: float = OCIOSIDADE_SMTP,
+    ):
+        self.servidor = servidor
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.starttls = starttls
+        self.tentativas = tentativas
+        self.espera = espera
+        self.ociosidade = ociosidade
+        self.conexoes = 0
+        self._fila: "queue.Queue[TrabalhoRelatorio]" = queue.Queue()
+        self._trabalhos: Dict[str, TrabalhoRelatorio] = {}
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def enviar(self, montar: Callable[[], Tuple[Message, pd.DataFrame]]) -> TrabalhoRelatorio:
+        """Enfileira um relatório e devolve o trabalho (sem esperar o envio)."""
+        trabalho = TrabalhoRelatorio(montar)
+        with self._lock:
+            self._trabalhos[trabalho.id] = trabalho
+            # Só os 100 mais recentes ficam consultáveis
+            for antigo in list(self._trabalhos)[:-100]:
+                del self._trabalhos[antigo]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="fila-relatorios", daemon=True)
+                self._thread.start()
+        self._fila.put(trabalho)
+        return trabalho
+
+    def trabalho(self, identificador: str) -> Optional[TrabalhoRelatorio]:
+        with self._lock:
+            return self._trabalhos.get(identificador)
+
+    def trabalhos(self) -> List[TrabalhoRelatorio]:
+        with self._lock:
+            return list(self._trabalhos.values())
+
+    def _executar(self):
+        while True:
+            try:
+                trabalho = self._fila.get(timeout=self.ociosidade)
+            except queue.Empty:
+                self._desconectar()
+                continue
+            try:
+                self._processar(trabalho)
+            except Exception as e:
+                # Nenhum erro encerra o thread da fila nem deixa o trabalho pendente
+                self._desconectar()
+                self._concluir(trabalho, FALHOU, f"erro inesperado: {e}")
+
+    def _processar(self, trabalho: TrabalhoRelatorio):
+        trabalho.estado = GERANDO
+        try:
+            mensagem, trabalho.tempos = trabalho.montar()
+        except Exception as e:
+            self._concluir(trabalho, FALHOU, f"falha ao gerar os anexos: {e}")
+            return
+
+        trabalho.estado = ENVIANDO
+        for tentativa in range(1, self.tentativas + 1):
+            trabalho.tentativas = tentativa
+            try:
+                self._conexao().send_message(mensagem)
+            except (smtplib.SMTPException, OSError) as e:
+                self._desconectar()
+                if _permanente(e):
+                    self._concluir(trabalho, FALHOU, str(e))
+                    return
+                trabalho.erro = str(e)
+                if tentativa < self.tentativas:
+                    time.sleep(self.espera * 2 ** (tentativa - 1))
+                continue
+            except Exception as e:
+                # Erro fora do SMTP (ex.: endereço que não é ASCII): repetir não adianta
+                self._desconectar()
+                self._concluir(trabalho, FALHOU, str(e))
+                return
+            self._concluir(trabalho, ENVIADO, None)
+            return
+        self._concluir(trabalho, FALHOU, trabalho.erro)
+
+    @staticmethod
+    def _concluir(trabalho: TrabalhoRelatorio, estado: str, erro: Optional[str]):
+        trabalho.erro = erro
+        trabalho.concluido_em = time.time()
+        trabalho.estado = estado
+
+    def _conexao(self) -> smtplib.SMTP:
+        """Conexão aberta (reaproveitada se ainda responde ao NOOP)."""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._desconectar()
+
+        smtp = smtplib.SMTP(self.servidor, self.porta, timeout=TEMPO_LIMITE_SMTP)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.usuario and self.senha:
+                smtp.login(self.usuario, self.senha)
+        except Exception:
+            smtp.close()
+            raise
+        self.conexoes += 1
+        self._smtp = smtp
+        return smtp
+
+    def _desconectar(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+
+@st.cache_resource(show_spinner=False)
+def get_fila_relatorios(
+    servidor: str, porta: int, usuario: Optional[str], senha: Optional[str], starttls: bool = True
+) -> FilaRelatorios:
+    """Fila única do processo para cada servidor/conta de e-mail."""
+    return FilaRelatorios(servidor, porta, usuario, senha, starttls)
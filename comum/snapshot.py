@@ -0,0 +1,124 @@
+"""
+Cópia local das abas já tipadas, em Parquet, para que a primeira página
+depois de um reinício seja servida do disco antes de qualquer acesso ao
+Google Sheets.
+
+Cada aba é um arquivo ``.parquet`` com os dados da carga (planilha, aba,
+cabeçalho, número de linhas, esquema de tipos e momento da gravação) nos
+metadados do próprio arquivo. A gravação é atômica (arquivo temporário +
+``os.replace``) e a leitura usa ``memory_map``. Arquivos de outra planilha,
+de outro esquema ou ilegíveis são ignorados.
+
+Requer pyarrow; sem ele, ``disponivel`` é False e nada é gravado.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from comum.tipos import ESQUEMA
+
+VERSAO_FORMATO = 1
+_CHAVE_METADADOS = b"saritur"
+
+
+class SnapshotLocal:
+    """Pasta com uma cópia Parquet por (planilha, aba)."""
+
+    def __init__(self, pasta: str):
+        self.pasta = pasta
+
+    @property
+    def disponivel(self) -> bool:
+        return pa is not None
+
+    def _arquivo(self, spreadsheet_id: str, aba: str) -> str:
+        chave = hashlib.sha1(f"{spreadsheet_id}\0{aba}".encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.pasta, f"{chave}.parquet")
+
+    @staticmethod
+    def _carimbo(spreadsheet_id: str) -> dict:
+        return {"formato": VERSAO_FORMATO, "esquema": ESQUEMA, "planilha": spreadsheet_id}
+
+    def salvar(
+        self,
+        spreadsheet_id: str,
+        aba: str,
+        df: pd.DataFrame,
+        cabecalho: List[str],
+        total_linhas: int,
+        recargas_parciais: int = 0,
+        datas_invalidas: Optional[List[Tuple[int, str, str]]] = None,
+    ):
+        """Grava (ou substitui) a cópia de uma aba (e a lista de datas inválidas)."""
+        if not self.disponivel:
+            return
+        os.makedirs(self.pasta, exist_ok=True)
+
+        metadados = dict(
+            self._carimbo(spreadsheet_id),
+            aba=aba,
+            cabecalho=list(cabecalho),
+            total_linhas=total_linhas,
+            recargas_parciais=recargas_parciais,
+            datas_invalidas=[list(item) for item in datas_invalidas or []],
+            salvo_em=time.time(),
+        )
+        tabela = pa.Table.from_pandas(df, preserve_index=True)
+        tabela = tabela.replace_schema_metadata({
+            **(tabela.schema.metadata or {}),
+            _CHAVE_METADADOS: json.dumps(metadados, ensure_ascii=False).encode("utf-8"),
+        })
+
+        destino = self._arquivo(spreadsheet_id, aba)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, destino)
+
+    def remover(self, spreadsheet_id: str, aba: str):
+        """Apaga a cópia de uma aba, se houver."""
+        try:
+            os.remove(self._arquivo(spreadsheet_id, aba))
+        except FileNotFoundError:
+            pass
+
+    def carregar(self, spreadsheet_id: str) -> Dict[str, Tuple[pd.DataFrame, dict]]:
+        """Todas as cópias válidas da planilha: ``{aba: (df, metadados)}``."""
+        if not self.disponivel or not os.path.isdir(self.pasta):
+            return {}
+
+        carimbo = self._carimbo(spreadsheet_id)
+        copias = {}
+        for nome in sorted(os.listdir(self.pasta)):
+            if not nome.endswith(".parquet"):
+                continue
+            caminho = os.path.join(self.pasta, nome)
+            try:
+                # Só o esquema primeiro: cópias de outra planilha nem são lidas
+                bruto = (pq.read_schema(caminho).metadata or {}).get(_CHAVE_METADADOS)
+                metadados = json.loads(bruto) if bruto else {}
+                if any(metadados.get(campo) != valor for campo, valor in carimbo.items()):
+                    continue
+                df = pq.read_table(caminho, memory_map=True).to_pandas()
+            except (OSError, ValueError, pa.ArrowException):
+                continue
+            copias[metadados["aba"]] = (_restaurar_tipos(df), metadados)
+        return copias
+
+
+def _restaurar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """Categóricas sem nenhuma categoria voltam do Parquet como object; iguala à carga."""
+    for coluna in df.columns:
+        dtype = df[coluna].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and len(dtype.categories) == 0:
+            df[coluna] = df[coluna].cat.set_categories(pd.Index([], dtype=str))
+    return df
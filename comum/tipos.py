@@ -0,0 +1,160 @@
+"""
+Tipagem das abas carregadas, guiada por um esquema único.
+
+As abas chegam da planilha como texto. Logo após a leitura, cada coluna
+conhecida ganha um tipo compacto e todas as páginas recebem os mesmos tipos:
+
+- DATA: datetime64 (só o dia), pelo formato explícito "dd/mm/aaaa" e, só
+  nas células fora dele, por uma segunda tentativa (``converter_datas``);
+  células inválidas viram NaT e podem ser listadas (``datas_invalidas``)
+- VALOR: float64 (``parse_moeda``), células vazias viram NaN
+- PEDIDO: texto normalizado (``normalizar_pedido``)
+- UNIDADE, STATUS, AVALIAÇÃO, FORNECEDOR: categóricas (poucos valores
+  distintos repetidos em milhares de linhas)
+- demais colunas de texto: string compacta (Arrow, quando disponível)
+
+``para_planilha`` faz o caminho inverso, devolvendo os textos no formato
+usado na planilha, para escrita e exibição.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from comum.indices import normalizar_pedido
+from comum.moeda import TIPO_TEXTO, formatar_moeda, parse_moeda
+
+FORMATO_DATA = "%d/%m/%Y"
+
+ESQUEMA: Dict[str, str] = {
+    "DATA": "data",
+    "VALOR": "moeda",
+    "PEDIDO": "pedido",
+    "UNIDADE": "categoria",
+    "STATUS": "categoria",
+    "AVALIAÇÃO": "categoria",
+    "FORNECEDOR": "categoria",
+}
+
+
+def _categorica(serie: pd.Series) -> pd.Series:
+    categorica = serie.astype("category")
+    if len(categorica.cat.categories) == 0:
+        # Coluna toda vazia: categorias de texto, como as demais, qualquer que
+        # seja o tipo de origem (senão object x str impede concatenar trechos)
+        categorica = categorica.cat.set_categories(pd.Index([], dtype=str))
+    return categorica
+
+
+def converter_datas(serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Converte textos "dd/mm/aaaa" em datetime64 (só o dia) com o formato
+    explícito, sem inferência célula a célula. As células fora do formato
+    (espaços nas pontas, datas ISO vindas do Excel, ano com dois dígitos,
+    "16-10-2025") passam por uma segunda tentativa, só elas.
+
+    Devolve as datas e os textos que não viraram data (mesmo índice da
+    entrada; células vazias não contam como erro). Uma coluna que já é
+    datetime64 volta como está, sem cópia nem ``normalize``.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, serie.iloc[:0].astype(object)
+
+    datas = pd.to_datetime(serie, format=FORMATO_DATA, errors="coerce")
+    faltando = (datas.isna() & serie.notna()).to_numpy(copy=True)
+    if faltando.any():
+        resto = serie[faltando].astype(str).str.strip()
+        faltando[faltando] = (resto != "").to_numpy()
+        resto = resto[resto != ""]
+        # ISO antes: no modo misto, dayfirst troca dia e mês de "2025-01-02"
+        convertidas = pd.to_datetime(resto, format="ISO8601", errors="coerce")
+        sem_iso = convertidas.isna()
+        if sem_iso.any():
+            convertidas[sem_iso] = pd.to_datetime(resto[sem_iso], format="mixed", dayfirst=True, errors="coerce")
+        datas[faltando] = convertidas.to_numpy()
+        faltando[faltando] = convertidas.isna().to_numpy()
+    return datas.dt.normalize(), serie[faltando].astype(object)
+
+
+def _tipar_coluna(serie: pd.Series, tipo: str) -> pd.Series:
+    if tipo == "data":
+        return converter_datas(serie)[0]
+    if tipo == "moeda":
+        return parse_moeda(serie).where(serie.notna())
+    if tipo == "pedido":
+        return normalizar_pedido(serie)
+    if tipo == "categoria":
+        return _categorica(serie)
+    raise ValueError(f"Tipo desconhecido no esquema: {tipo}")
+
+
+def tipar_df(df: pd.DataFrame, datas_invalidas: Optional[List[Tuple[int, str, str]]] = None) -> pd.DataFrame:
+    """
+    Aplica o esquema às colunas de um DataFrame de textos (altera ``df``).
+    Com ``datas_invalidas``, acrescenta nela (linha, coluna, texto) de cada
+    célula de data que não pôde ser convertida; a linha é o índice de ``df``.
+    """
+    for coluna in df.columns:
+        tipo = ESQUEMA.get(coluna)
+        if tipo == "data":
+            df[coluna], invalidas = converter_datas(df[coluna])
+            if datas_invalidas is not None:
+                datas_invalidas.extend((int(linha), coluna, str(texto)) for linha, texto in invalidas.items())
+        elif tipo is not None:
+            df[coluna] = _tipar_coluna(df[coluna], tipo)
+        elif pd.api.types.is_object_dtype(df[coluna]) or pd.api.types.is_string_dtype(df[coluna]):
+            df[coluna] = df[coluna].astype(TIPO_TEXTO)
+    return df
+
+
+def concatenar_tipados(partes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena trechos já tipados da mesma aba. As categorias das colunas
+    categóricas são refeitas a partir dos valores presentes (união ordenada),
+    então o resultado tem os mesmos tipos de uma aba tipada de uma só vez.
+    """
+    df = pd.concat(partes) if len(partes) > 1 else partes[0].copy()
+    for coluna, tipo in ESQUEMA.items():
+        if tipo != "categoria" or coluna not in df.columns:
+            continue
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].cat.remove_unused_categories()
+        else:
+            # Trechos com categorias diferentes são concatenados como texto
+            df[coluna] = _categorica(df[coluna])
+    return df
+
+
+def para_planilha(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Textos no formato da planilha ("dd/mm/aaaa", "R$ 1.234,56"); células
+    vazias viram "". Colunas numéricas fora do esquema são mantidas.
+    """
+    saida = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime(FORMATO_DATA)
+        elif ESQUEMA.get(coluna) == "moeda" and pd.api.types.is_numeric_dtype(serie):
+            serie = formatar_moeda(serie).where(serie.notna())
+        serie = serie.astype(object)
+        saida[coluna] = serie.where(serie.notna(), "")
+    return pd.DataFrame(saida, index=df.index)
+
+
+def relatorio_memoria(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Memória ocupada por aba: como textos (formato em que as abas eram
+    guardadas antes da tipagem) e já tipada. Valores em bytes.
+    """
+    linhas = []
+    for aba, df in frames.items():
+        antes = int(para_planilha(df).memory_usage(deep=True).sum())
+        depois = int(df.memory_usage(deep=True).sum())
+        linhas.append({
+            "ABA": aba,
+            "LINHAS": len(df),
+            "BYTES TEXTO": antes,
+            "BYTES TIPADO": depois,
+            "REDUÇÃO %": round(100 * (1 - depois / antes), 1) if antes else 0.0,
+        })
+    return pd.DataFrame(linhas, columns=["ABA", "LINHAS", "BYTES TEXTO", "BYTES TIPADO", "REDUÇÃO %"])
@@ -2,10 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import smtplib
 import os
 import sys
-import io
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
@@ -16,38 +14,31 @@ from datetime import date, timedelta
 # --- IMPORTAÇÃO DOS DADOS ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 try:
-    from pages.BACKLOG import load_data, PLANILHA_NOME
+    from pages.BACKLOG import load_data
 except:
     st.error("Erro ao carregar BACKLOG.py")
     st.stop()
 
+from comum.moeda import br_money, formatar_moeda
+from comum.planilha import get_repositorio
+from comum.ranking import calcular_rankings
+from comum.relatorio import (
+    ENVIADO, FALHOU, PORTA_SMTP, SERVIDOR_SMTP, exportar_png, exportar_xlsx, gerar_anexos,
+    get_cache_artefatos, get_exportador, get_fila_relatorios,
+)
+from comum.tipos import para_planilha
+
 # --- TRATAMENTO DE DADOS (PANDAS) ---
-def preparar_dados_plotly(df, d_inicio, d_fim):
-    if df.empty: return pd.DataFrame()
-    df = df.copy()
-    df['UNIDADE'] = df['UNIDADE'].astype(str).str.strip().str.upper()
-    df['DATA_DT'] = pd.to_datetime(df['DATA'], dayfirst=True, errors='coerce').dt.date
-    
-    def limpar_moeda(v):
-        if pd.isna(v) or v == "": return 0.0
-        s = str(v).replace("R$", "").replace(" ", "").replace(".", "").replace(",", ".")
-        try: return float(s)
-        except: return 0.0
-
-    df['VALOR_NUM'] = df['VALOR'].apply(limpar_moeda)
-    mask = (df['DATA_DT'] >= d_inicio) & (df['DATA_DT'] <= d_fim)
-    df_filtrado = df.loc[mask]
-    ranking = df_filtrado.groupby('UNIDADE')['VALOR_NUM'].sum().reset_index()
-    return ranking.sort_values('VALOR_NUM', ascending=True)
+# Rankings por unidade em comum/ranking.py (uma passada sobre as abas tipadas)
 
 def preparar_tabela_amanha(df):
     if df.empty: return pd.DataFrame()
-    df = df.copy()
-    df['DATA_DT'] = pd.to_datetime(df['DATA'], dayfirst=True, errors='coerce').dt.date
+    # DATA e VALOR já vêm tipados do repositório (datetime64 e float64)
+    datas = df['DATA']
     amanha = date.today() + timedelta(days=1)
     
     # Filtro: Dia Seguinte E Status NÃO é "PEDIDO"
-    mask = (df['DATA_DT'] == amanha) & (df['STATUS'].astype(str).str.strip().str.upper() != "PEDIDO")
+    mask = (datas == pd.Timestamp(amanha)) & (df['STATUS'].astype(str).str.strip().str.upper() != "PEDIDO")
     df_f = df.loc[mask].copy()
     
     if df_f.empty: return pd.DataFrame()
@@ -56,13 +47,11 @@ def preparar_tabela_amanha(df):
     colunas_existentes = [c for c in colunas if c in df_f.columns]
     df_f = df_f[colunas_existentes]
 
-    def limpar_valor(v):
-        s = str(v).replace("R$", "").replace(" ", "").replace(".", "").replace(",", ".")
-        try: return float(s)
-        except: return 0.0
+    total_num = df_f['VALOR'].sum()
+    valor_formatado = br_money(total_num)
 
-    total_num = df_f['VALOR'].apply(limpar_valor).sum()
-    valor_formatado = f"R$ {total_num:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    # Colunas tipadas (data, moeda) de volta ao formato da planilha para a tabela
+    df_f = para_planilha(df_f)
 
     # Linha de total com preenchimento para todas as colunas (evita erros no PNG/Excel)
     linha_total = pd.DataFrame([{ 
@@ -79,16 +68,18 @@ def gerar_figura(df, titulo, cor):
     
     # 1. Cálculo do total para o rodapé
     total_gasto = df['VALOR_NUM'].sum()
-    total_formatado = f"TOTAL: R$ {total_gasto:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    total_formatado = f"TOTAL: {br_money(total_gasto)}"
 
     # Altura dinâmica baseada no número de barras
     altura_dinamica = max(450, len(df) * 45)
     
-    fig = px.bar(df, x='VALOR_NUM', y='UNIDADE', orientation='h', text='VALOR_NUM', title=titulo)
+    # Rótulos das barras já no formato brasileiro (R$ 1.234,56)
+    df = df.assign(VALOR_TEXTO=formatar_moeda(df['VALOR_NUM']))
+    fig = px.bar(df, x='VALOR_NUM', y='UNIDADE', orientation='h', text='VALOR_TEXTO', title=titulo)
     
     fig.update_traces(
         marker_color=cor, 
-        texttemplate='R$ %{text:,.2f}', 
+        texttemplate='%{text}', 
         textposition='outside', 
         cliponaxis=False, 
         textfont=dict(color="black", size=13)
@@ -128,6 +119,40 @@ def gerar_figura(df, titulo, cor):
         title=dict(x=0.5, font=dict(size=22))
     )
     return fig
+
+def gerar_figura_tabela(df):
+    fig_tbl = go.Figure(data=[go.Table(
+        columnwidth=[100, 150, 200, 100, 120],
+        header=dict(values=list(df.columns), fill_color='#1F617E', font=dict(color='white', size=14), align='center'),
+        cells=dict(values=[df[col] for col in df.columns], fill_color='#F5F5F5', font=dict(color='black', size=12), align='center', height=30)
+    )])
+    fig_tbl.update_layout(margin=dict(l=10, r=10, t=10, b=10))
+    return fig_tbl
+
+# --- CACHES DO PROCESSO (por versão dos dados e período) ---
+FIGURAS_RANKING = {
+    "TOTAL": ("Ranking Geral", "#106332"),
+    "ALTA": ("Ranking ALTA (PEDIDO)", "#1F617E"),
+    "EMERGENCIAL": ("Ranking EMERGENCIAL", "#942525"),
+}
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def montar_rankings(versao, d_inicio, d_fim):
+    """Rankings por unidade do período: {"ALTA", "EMERGENCIAL", "TOTAL"}."""
+    return calcular_rankings(load_data(versao), d_inicio, d_fim)
+
+@st.cache_resource(max_entries=24, show_spinner=False)
+def figura_ranking(versao, d_inicio, d_fim, tipo):
+    """Figura de um ranking (compartilhada entre sessões: não alterar)."""
+    titulo, cor = FIGURAS_RANKING[tipo]
+    ranking = montar_rankings(versao, d_inicio, d_fim)[tipo]
+    return gerar_figura(ranking, f"{titulo} - {d_inicio.strftime('%d/%m')} a {d_fim.strftime('%d/%m')}", cor)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def tabela_amanha(versao, hoje):
+    """Programação do dia seguinte a ``hoje`` (chave do cache junto com a versão)."""
+    return preparar_tabela_amanha(load_data(versao).get('ALTA', pd.DataFrame()))
+
 def app():
     st.title("📊 Gestão de Gastos Saritur")
     hoje = date.today()
@@ -135,20 +160,16 @@ def app():
     data_inicio = st.sidebar.date_input("Início", inicio_semana)
     data_fim = st.sidebar.date_input("Fim", inicio_semana + timedelta(days=6))
 
-    data_dict = load_data(PLANILHA_NOME)
-    
-    # Processamento Rankings
-    df_alta_orig = data_dict.get('ALTA', pd.DataFrame())
-    df_alta_filt = df_alta_orig[df_alta_orig['STATUS'].astype(str).str.strip().str.upper() == "PEDIDO"] if not df_alta_orig.empty else pd.DataFrame()
-    df_alta = preparar_dados_plotly(df_alta_filt, data_inicio, data_fim)
-    df_emerg = preparar_dados_plotly(data_dict.get('EMERGENCIAL', pd.DataFrame()), data_inicio, data_fim)
-
-    df_total = pd.concat([df_alta, df_emerg], ignore_index=True)
-    if not df_total.empty:
-        df_total = df_total.groupby('UNIDADE')['VALOR_NUM'].sum().reset_index().sort_values('VALOR_NUM', ascending=True)
-
-    # Processamento Tabela Amanhã
-    df_tabela_amanha = preparar_tabela_amanha(df_alta_orig)
+    # Rankings, figuras e tabela vêm de caches do processo, por versão dos
+    # dados e período: reruns e outras sessões reaproveitam o que já foi feito
+    versao = get_repositorio().versao
+    try:
+        # Falhas de carga não ficam no cache de load_data: o próximo rerun tenta de novo
+        load_data(versao)
+    except Exception as e:
+        st.error(f"Erro ao carregar dados do Google Sheets. Erro: {e}")
+        st.stop()
+    df_tabela_amanha = tabela_amanha(versao, hoje)
 
     # --- EXIBIÇÃO NO STREAMLIT ---
     st.markdown("---")
@@ -159,67 +180,116 @@ def app():
         st.info("Nenhuma programação para amanhã (Excluindo 'PEDIDO').")
 
     st.markdown("---")
-    fig_total = gerar_figura(df_total, f"Ranking Geral - {data_inicio.strftime('%d/%m')} a {data_fim.strftime('%d/%m')}", "#106332")
+    fig_total = figura_ranking(versao, data_inicio, data_fim, "TOTAL")
     if fig_total: st.plotly_chart(fig_total, use_container_width=True)
 
-    fig_a = gerar_figura(df_alta, f"Ranking ALTA (PEDIDO) - {data_inicio.strftime('%d/%m')} a {data_fim.strftime('%d/%m')}", "#1F617E")
+    fig_a = figura_ranking(versao, data_inicio, data_fim, "ALTA")
     if fig_a: st.plotly_chart(fig_a, use_container_width=True)
 
-    fig_e = gerar_figura(df_emerg, f"Ranking EMERGENCIAL - {data_inicio.strftime('%d/%m')} a {data_fim.strftime('%d/%m')}", "#942525")
+    fig_e = figura_ranking(versao, data_inicio, data_fim, "EMERGENCIAL")
     if fig_e: st.plotly_chart(fig_e, use_container_width=True)
 
+    def montar_relatorio(remetente):
+        """Gera os anexos e a mensagem (roda na fila de relatórios, fora da página)."""
+        msg = MIMEMultipart()
+        msg['Subject'] = f"Relatório Saritur: {data_inicio.strftime('%d/%m')} a {data_fim.strftime('%d/%m')}"
+        msg['From'], msg['To'] = remetente, "michael.sotero@saritur.com.br"
+        msg.attach(MIMEText(f" Relatório Orçamentario Semanal.\nPeríodo: {data_inicio} a {data_fim}\nSeguem os anexos abaixo:", 'plain'))
+
+        # Anexos gerados ao mesmo tempo (rankings, tabela de amanhã e Excel),
+        # com as imagens pelo navegador do kaleido já aberto no processo
+        anexos = {}
+        for fig, nome in [(fig_total, "Total"), (fig_a, "ALTA"), (fig_e, "EMERG")]:
+            if fig:
+                anexos[f"{nome}.png"] = exportar_png(fig, 1000, 800, exportador, cache)
+        if not df_tabela_amanha.empty:
+            # PNG da Tabela com ALTURA DINÂMICA
+            altura_calc = 150 + (len(df_tabela_amanha) * 35)
+            anexos["Programacao_Amanha.png"] = exportar_png(gerar_figura_tabela(df_tabela_amanha), 1100, altura_calc, exportador, cache)
+            anexos["Programacao_Amanha.xlsx"] = exportar_xlsx(df_tabela_amanha, "Amanha", cache)
+
+        # A checagem de saúde do navegador fica no exportador, antes da
+        # primeira imagem que não sai do cache
+        arquivos, tempos = gerar_anexos(anexos)
+
+        for arquivo, conteudo in arquivos.items():
+            if arquivo.endswith(".png"):
+                part = MIMEImage(conteudo)
+            else:
+                part = MIMEBase('application', "octet-stream")
+                part.set_payload(conteudo)
+                encoders.encode_base64(part)
+            part.add_header('Content-Disposition', 'attachment', filename=arquivo)
+            msg.attach(part)
+        return msg, tempos
+
     def enviar():
         try:
-            user, password = st.secrets["email_user"], st.secrets["email_password"]
-            msg = MIMEMultipart()
-            msg['Subject'] = f"Relatório Saritur: {data_inicio.strftime('%d/%m')} a {data_fim.strftime('%d/%m')}"
-            msg['From'], msg['To'] = user, "michael.sotero@saritur.com.br"
-            msg.attach(MIMEText(f" Relatório Orçamentario Semanal.\nPeríodo: {data_inicio} a {data_fim}\nSeguem os anexos abaixo:", 'plain'))
-
-            # 1. Anexos de Rankings (PNG)
-            for fig, nome in [(fig_total, "Total"), (fig_a, "ALTA"), (fig_e, "EMERG")]:
-                if fig:
-                    img_bytes = fig.to_image(format="png", width=1000, height=800)
-                    part = MIMEImage(img_bytes)
-                    part.add_header('Content-Disposition', 'attachment', filename=f"{nome}.png")
-                    msg.attach(part)
-
-            # 2. Anexos da Tabela de Amanhã (PNG + XLSX)
-            if not df_tabela_amanha.empty:
-                # Gerar PNG da Tabela com ALTURA DINÂMICA
-                altura_calc = 150 + (len(df_tabela_amanha) * 35)
-                fig_tbl = go.Figure(data=[go.Table(
-                    columnwidth=[100, 150, 200, 100, 120],
-                    header=dict(values=list(df_tabela_amanha.columns), fill_color='#1F617E', font=dict(color='white', size=14), align='center'),
-                    cells=dict(values=[df_tabela_amanha[col] for col in df_tabela_amanha.columns], fill_color='#F5F5F5', font=dict(color='black', size=12), align='center', height=30)
-                )])
-                fig_tbl.update_layout(margin=dict(l=10, r=10, t=10, b=10))
-                img_tbl_bytes = fig_tbl.to_image(format="png", width=1100, height=altura_calc)
-                part_tbl_png = MIMEImage(img_tbl_bytes)
-                part_tbl_png.add_header('Content-Disposition', 'attachment', filename="Programacao_Amanha.png")
-                msg.attach(part_tbl_png)
-
-                # Gerar Excel
-                buf = io.BytesIO()
-                with pd.ExcelWriter(buf, engine='xlsxwriter') as writer:
-                    df_tabela_amanha.to_excel(writer, index=False, sheet_name='Amanha')
-                part_ex = MIMEBase('application', "octet-stream")
-                part_ex.set_payload(buf.getvalue())
-                encoders.encode_base64(part_ex)
-                part_ex.add_header('Content-Disposition', 'attachment', filename="Programacao_Amanha.xlsx")
-                msg.attach(part_ex)
-
-            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                server.starttls()
-                server.login(user, password)
-                server.send_message(msg)
-            st.success("✅ Relatório e Tabela enviados com sucesso!")
+            trabalho = fila_relatorios().enviar(lambda: montar_relatorio(st.secrets["email_user"]))
+            st.session_state.setdefault("relatorios", []).append(trabalho.id)
         except Exception as e:
             st.error(f"Erro no envio: {e}")
 
+    exportador = get_exportador()
+    # Arquivos já gerados (mesmo conteúdo) são reaproveitados entre envios e sessões
+    cache = get_cache_artefatos()
+
     st.markdown("---")
     if st.button("📧 ENVIAR RELATÓRIO POR E-MAIL"):
         enviar()
+    # Só acompanha (rerun a cada 2 s) enquanto houver relatório na fila ou em envio
+    if any(not trabalho.concluido for trabalho in trabalhos_sessao()):
+        acompanhar_relatorios()
+    else:
+        mostrar_relatorios()
+
+
+def fila_relatorios():
+    """Fila de envio da conta dos secrets; servidor configurável (ex.: SMTP local em testes)."""
+    return get_fila_relatorios(
+        st.secrets.get("email_smtp_host", SERVIDOR_SMTP),
+        int(st.secrets.get("email_smtp_port", PORTA_SMTP)),
+        st.secrets["email_user"],
+        st.secrets["email_password"],
+        bool(st.secrets.get("email_starttls", True)),
+    )
+
+
+def trabalhos_sessao():
+    """Os 5 relatórios mais recentes enviados nesta sessão (mais novo primeiro)."""
+    identificadores = st.session_state.get("relatorios", [])
+    if not identificadores:
+        return []
+    fila = fila_relatorios()
+    trabalhos = (fila.trabalho(identificador) for identificador in reversed(identificadores[-5:]))
+    return [trabalho for trabalho in trabalhos if trabalho is not None]
+
+
+def mostrar_relatorios():
+    """Estado dos relatórios enviados nesta sessão."""
+    for trabalho in trabalhos_sessao():
+        if trabalho.estado == ENVIADO:
+            st.success(f"✅ Relatório {trabalho.id}: Relatório e Tabela enviados com sucesso!")
+            if trabalho.tempos is not None:
+                with st.expander("⏱️ Tempo de geração dos anexos"):
+                    if not get_exportador().ativo:
+                        st.caption(f"Imagens geradas sem o navegador aquecido. Erro: {get_exportador().ultimo_erro}")
+                    st.dataframe(trabalho.tempos, hide_index=True)
+        elif trabalho.estado == FALHOU:
+            st.error(f"Relatório {trabalho.id}: erro no envio ({trabalho.tentativas} tentativa(s)): {trabalho.erro}")
+        else:
+            detalhe = f" — tentativa {trabalho.tentativas}, último erro: {trabalho.erro}" if trabalho.erro else ""
+            st.info(f"⏳ Relatório {trabalho.id}: {trabalho.estado}{detalhe}")
+
+
+@st.fragment(run_every=2)
+def acompanhar_relatorios():
+    """``mostrar_relatorios`` a cada 2 s, enquanto algum relatório estiver pendente."""
+    mostrar_relatorios()
+    if all(trabalho.concluido for trabalho in trabalhos_sessao()):
+        # Tudo concluído: uma execução completa da página troca o fragmento
+        # com atualização periódica pela exibição fixa
+        st.rerun()
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
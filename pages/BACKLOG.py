@@ -2,28 +2,20 @@
 import streamlit as st
 import re
 import pandas as pd
-import gspread 
-from typing import List, Dict, Union
-from datetime import date, timedelta
+from typing import List, Dict, Optional, Union
 import calendar 
 import json 
-from oauth2client.service_account import ServiceAccountCredentials
 import os 
 
+from comum.backup import ArquivoBackup, get_arquivo_backup, nome_aba_backup
+from comum.indices import resolver_pedidos
+from comum.planilha import ABAS_PRINCIPAIS, AbaNaoEncontrada, get_repositorio
+from comum.tipos import FORMATO_DATA
+
 # --- CONFIGURAÇÃO ---
-PLANILHA_NOME = "Controle Orçamentário Diário V2" 
 COLUNAS_DADOS = ['PEDIDO', 'DATA', 'CARRO | UTILIZAÇÃO', 'STATUS']
 COLUNA_CARRO = 'CARRO | UTILIZAÇÃO' 
 
-# LISTA DAS ABAS A SEREM CARREGADAS
-ABAS_PRINCIPAIS = ['ALTA', 'EMERGENCIAL']
-
-# DEFINIÇÃO DO SCOPE DE PERMISSÃO
-GOOGLE_SHEET_SCOPES = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive",
-]
-
 # LISTA DOS CARROS CADASTRADOS
 LISTA_CARROS_CADASTRO = [
     "- SELECIONE UM CRITÉRIO -",
@@ -49,81 +41,45 @@ def parse_pedidos(text: str) -> List[str]:
     return sorted(list(pedidos_limpos))
 
 
-def calculate_backup_sheet_name() -> str:
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_data(versao: int = 0) -> Dict[str, pd.DataFrame]:
     """
-    Calcula o nome da aba da semana passada completa (Segunda a Sexta).
-    Lógica idêntica ao arquivo principal para manter sincronia.
-    """
-    today = date.today()
-    # Encontra a segunda-feira da semana anterior à atual
-    monday_last_week = today - timedelta(days=today.weekday() + 7)
-    # Encontra a sexta-feira daquela mesma semana
-    friday_last_week = monday_last_week + timedelta(days=4)
-    
-    return f"{monday_last_week.strftime('%d.%m')} a {friday_last_week.strftime('%d.%m')}"
-
-
-@st.cache_data
-def load_data(sheet_name: str) -> Dict[str, pd.DataFrame]:
-    """
-    Conecta ao Google Sheets e carrega os dados das abas ALTA, EMERGENCIAL,
-    e a aba de Backup calculada dinamicamente.
+    Carrega, pelo repositório compartilhado, as abas ALTA, EMERGENCIAL
+    e a aba de Backup calculada dinamicamente. As abas já vêm tipadas e são
+    as mesmas do cache (sem cópia): não devem ser alteradas.
+
+    ``versao`` é a versão do repositório, usada só como chave do cache.
+    Falhas de carga (inclusive ``AbaNaoEncontrada`` para ALTA/EMERGENCIAL)
+    são lançadas, e não guardadas no cache: quem chama mostra o erro e a
+    próxima execução tenta de novo.
     """
     data = {}
     
     # 1. Calcula o nome da aba de backup
-    BACKUP_SHEET_NAME = calculate_backup_sheet_name()
+    BACKUP_SHEET_NAME = nome_aba_backup()
     ABAS_A_BUSCAR = ABAS_PRINCIPAIS + [BACKUP_SHEET_NAME]
     
-    try:
-        creds_json = st.secrets.get("google_sheets_service_account")
-        
-        if creds_json:
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_json, GOOGLE_SHEET_SCOPES)
-            gc = gspread.authorize(creds)
-        else:
-            gc = gspread.service_account(filename="acesso.json")
-            
-    except Exception as e:
-        st.error(f"Erro ao autenticar no Google Sheets. Erro: {e}")
-        return None
+    # Todas as abas chegam numa única requisição em lote
+    frames = get_repositorio().carregar_abas(ABAS_A_BUSCAR)
+
+    for tab in ABAS_A_BUSCAR:
+        if tab not in frames: 
+            if tab == BACKUP_SHEET_NAME:
+                st.warning(f"Aviso: Aba de Backup '{BACKUP_SHEET_NAME}' não encontrada.")
+                continue
+            raise AbaNaoEncontrada(tab)
+
+        df = frames[tab]
+        if 'PEDIDO' not in df.columns:
+            continue
+
+        # PEDIDO já vem normalizado pela tipagem das abas
+        data[tab] = df
     
-    try:
-        sh = gc.open(sheet_name)
-        
-        for tab in ABAS_A_BUSCAR:
-            try:
-                worksheet = sh.worksheet(tab)
-                list_of_lists = worksheet.get_all_values()
-                
-                if len(list_of_lists) < 2:
-                    continue
-
-                header = [h.strip().upper() for h in list_of_lists[1]]
-                data_rows = list_of_lists[2:] 
-                df = pd.DataFrame(data_rows, columns=header)
-                
-                # Normaliza nomes de colunas para busca
-                df.columns = [c.strip().upper() for c in df.columns]
-                
-                df['PEDIDO'] = df['PEDIDO'].astype(str).str.strip()
-                data[tab] = df
-                
-            except gspread.WorksheetNotFound: 
-                if tab == BACKUP_SHEET_NAME:
-                    st.warning(f"Aviso: Aba de Backup '{BACKUP_SHEET_NAME}' não encontrada.")
-                    continue
-                st.error(f"Erro: Aba '{tab}' não encontrada.")
-                return None
-        
-        if BACKUP_SHEET_NAME not in LISTA_CARROS_CADASTRO:
-             LISTA_CARROS_CADASTRO.insert(1, BACKUP_SHEET_NAME) 
-        
-        return data
-        
-    except Exception as e:
-        st.error(f"Ocorreu um erro inesperado: {e}")
-        return None
+    if BACKUP_SHEET_NAME not in LISTA_CARROS_CADASTRO:
+         LISTA_CARROS_CADASTRO.insert(1, BACKUP_SHEET_NAME) 
+    
+    return data
 
 
 # ----------------------------------------------------
@@ -137,34 +93,61 @@ def initialize_state():
         st.session_state['feedback_message'] = None
 
 
-def search_pedido(pedido: str, data: Dict[str, pd.DataFrame], carro_selecionado: str) -> Dict[str, str]:
-    found_data = {
-        "Pedido": pedido, "Origem": "", "Data": "", COLUNA_CARRO: "", 
-        "Status": "Pedido Não Encontrado", "Carro Foco": carro_selecionado
-    }
-    
-    for sheet_name, df in data.items():
-        match = df[df['PEDIDO'] == pedido]
-        if not match.empty:
-            row = match.iloc[0]
-            found_data.update({
-                "Origem": sheet_name, "Data": row.get('DATA', ''), 
-                COLUNA_CARRO: row.get(COLUNA_CARRO, ''), "Status": row.get('STATUS', '')
-            })
-            return found_data
-    return found_data
-
-
-def perform_search(pedidos: List[str], data: Dict[str, pd.DataFrame], carro_selecionado: str) -> List[Dict[str, str]]:
+def _como_texto(serie: pd.Series) -> pd.Series:
+    """Coluna tipada como texto de exibição (datas em dd/mm/aaaa, NA -> '')."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        serie = serie.dt.strftime(FORMATO_DATA)
+    return serie.astype(object).where(serie.notna(), '')
+
+
+def perform_search(
+    pedidos: List[str],
+    data: Dict[str, pd.DataFrame],
+    carro_selecionado: str,
+    arquivo: Optional[ArquivoBackup] = None,
+) -> List[Dict[str, str]]:
+    """
+    Resolve todos os pedidos colados de uma vez (um merge contra a união das
+    abas). Vale a primeira aba, na ordem de ``data``, em que o pedido aparece.
+    Os que não estão em nenhuma delas são procurados numa única consulta ao
+    ``arquivo`` das semanas de backup anteriores (vale a semana mais recente).
+    """
     if not pedidos or data is None:
         return []
 
-    results = []
-    for pedido in pedidos:
-        result = search_pedido(pedido, data, carro_selecionado)
-        results.append(result)
-        
-    return results
+    resolvidos = resolver_pedidos(pedidos, data, colunas=['DATA', COLUNA_CARRO, 'STATUS'])
+    encontrado = resolvidos['ORIGEM'].notna()
+    for coluna in ['DATA', COLUNA_CARRO, 'STATUS']:
+        if coluna not in resolvidos.columns:
+            resolvidos[coluna] = ''
+
+    textos = {coluna: _como_texto(resolvidos[coluna]) for coluna in ['ORIGEM', 'DATA', COLUNA_CARRO, 'STATUS']}
+    arquivados = None
+    if arquivo is not None and not encontrado.all():
+        try:
+            arquivados = arquivo.localizar(resolvidos.loc[~encontrado, 'PEDIDO'].tolist())
+        except Exception as e:
+            # Sem o arquivo, os pedidos que faltam ficam como não encontrados
+            st.error(f"Erro ao consultar as abas de backup anteriores. Erro: {e}")
+        if arquivo.completando:
+            st.info("As semanas de backup mais antigas ainda estão sendo baixadas; pedidos delas podem aparecer se buscar de novo em instantes.")
+    if arquivados is not None:
+        arquivados = arquivados.drop_duplicates('PEDIDO', keep='first').set_index('PEDIDO')
+        chaves = resolvidos['PEDIDO'].astype(str).str.strip().str.upper()
+        no_arquivo = ~encontrado & chaves.isin(arquivados.index)
+        for coluna, origem in [('ORIGEM', 'ABA'), ('DATA', 'DATA'), (COLUNA_CARRO, COLUNA_CARRO), ('STATUS', 'STATUS')]:
+            textos[coluna] = textos[coluna].where(~no_arquivo, chaves.map(_como_texto(arquivados[origem])))
+        encontrado = encontrado | no_arquivo
+
+    resultado = pd.DataFrame({
+        "Pedido": resolvidos['PEDIDO'],
+        "Origem": textos['ORIGEM'],
+        "Data": textos['DATA'],
+        COLUNA_CARRO: textos[COLUNA_CARRO],
+        "Status": textos['STATUS'].where(encontrado, "Pedido Não Encontrado"),
+        "Carro Foco": carro_selecionado,
+    })
+    return resultado.to_dict('records')
 
 
 def handle_search(data_frames: Dict[str, pd.DataFrame]):
@@ -182,7 +165,7 @@ def handle_search(data_frames: Dict[str, pd.DataFrame]):
         st.rerun()
         return 
         
-    search_results = perform_search(parsed_pedidos, data_frames, carro_selecionado)
+    search_results = perform_search(parsed_pedidos, data_frames, carro_selecionado, get_arquivo_backup())
     
     if search_results:
         new_df = pd.DataFrame(search_results)
@@ -260,7 +243,7 @@ def app():
     st.title("🔍 BACKLOG: Pesquisa Rápida de Pedidos")
 
     try:
-        BACKUP_SHEET_NAME = calculate_backup_sheet_name()
+        BACKUP_SHEET_NAME = nome_aba_backup()
         st.info(f"Aba de Backup sendo rastreada: **{BACKUP_SHEET_NAME}**")
     except Exception:
         pass 
@@ -270,9 +253,14 @@ def app():
         st.session_state['feedback_message'] = None 
 
     with st.spinner("Carregando dados..."):
-        data_frames = load_data(PLANILHA_NOME)
-    
-    if data_frames is None: st.stop()
+        try:
+            data_frames = load_data(get_repositorio().versao)
+        except AbaNaoEncontrada as e:
+            st.error(f"Erro: Aba {e} não encontrada.")
+            st.stop()
+        except Exception as e:
+            st.error(f"Erro ao carregar dados do Google Sheets. Erro: {e}")
+            st.stop()
     
     col1, col2 = st.columns([0.6, 0.4])
     with col1:
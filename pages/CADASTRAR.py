@@ -53,89 +53,77 @@
 # acesso-python@acesso-python-480514.iam.gserviceaccount.com --> Email do usuario tecnico que irá fazer as edições automaticas
 
 # IMPORTE AS BIBLIOTECAS QUE SERÃO USADAS NESTE PROJETO
+from concurrent.futures import TimeoutError as TempoEsgotado
+
 import streamlit as st
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
+
+from comum.cadastro import AVALIACAO, COLUNAS_CADASTRO, STATUS, UNIDADE, get_fila_escrita, ler_lote, validar_lote
+from comum.indices import IndicePedidos
+from comum.planilha import ABA_ALTA, get_repositorio
+from comum.tipos import para_planilha
 
 # TÍTULO
 st.title("Pedidos/Solicitações")
 st.markdown("Sistema de Cadastro de Pedidos/Solicitações")
 
-# CONEXÃO
-conexao = st.connection("gsheets", type=GSheetsConnection)
-
-# -------------------- LEITURA DA PLANILHA --------------------
-dados_raw = conexao.read(
-    worksheet="ALTA",
-    usecols=list(range(16)),
-    ttl=5
+# Mostrado quando a planilha demora a responder: a gravação segue em andamento
+AVISO_PENDENTE = (
+    "A planilha está demorando a responder e a gravação ainda está em andamento. "
+    "Não envie de novo: confira a lista em alguns instantes antes de cadastrar outra vez."
 )
 
-# Remover linhas vazias
-dados_raw = dados_raw.dropna(how="all")
-
-if dados_raw.empty:
-    st.error("A planilha está vazia ou não pôde ser carregada.")
-    st.stop()
-
-# -------------------- AJUSTAR CABEÇALHO NA PRIMEIRA LINHA --------------------
+# Leitura e gravação pelo repositório compartilhado (mesma conta de serviço)
+repositorio = get_repositorio()
 
-# A segunda linha lida (índice 1) é onde os dados começam.
-novo_cabecalho = dados_raw.iloc[0].astype(str).str.strip()
-dados_existentes = dados_raw.iloc[1:].reset_index(drop=True)
 
-# ... (restante do seu código)
+@st.cache_resource(max_entries=2, show_spinner=False)
+def indice_alta(versao: int) -> IndicePedidos:
+    """Índice de pedidos da ALTA, refeito só quando o repositório muda de versão."""
+    return IndicePedidos({ABA_ALTA: repositorio.carregar_aba(ABA_ALTA)})
 
-dados_existentes.columns = novo_cabecalho
 
-# Padronizar colunas
-dados_existentes.columns = (
-    dados_existentes.columns
-    .astype(str)
-    .str.strip()
-    .str.upper()
-)
+# -------------------- LEITURA DA PLANILHA --------------------
+# O repositório já trata o cabeçalho (segunda linha da aba), padroniza os nomes
+# das colunas e remove as linhas vazias. A aba vem do cache compartilhado (sem
+# cópia): nossas gravações entram nele assim que o append termina.
+dados_existentes = repositorio.carregar_aba(ABA_ALTA)
+colunas_para_mostrar = list(dados_existentes.columns[:16])
 
-st.write("Colunas encontradas:", dados_existentes.columns.tolist())
+if dados_existentes.empty:
+    st.error("A planilha está vazia ou não pôde ser carregada.")
+    st.stop()
 
-# ... (código anterior, onde você define dados_existentes e dados_raw)
+st.write("Colunas encontradas:", colunas_para_mostrar)
 
 # -------------------- TRATAR COLUNA VALOR --------------------
 if "VALOR" not in dados_existentes.columns:
     st.error("A coluna 'VALOR' não existe no cabeçalho da planilha.")
     st.stop()
 
-# 1. TRATAMENTO E CONVERSÃO NUMÉRICA (Cria a coluna numérica temporária 'VALOR_NUM')
-dados_existentes["VALOR_NUM"] = (
-    dados_existentes["VALOR"]
-    .astype(str)
-    .str.replace("R$", "", regex=False)
-    .str.replace(".", "", regex=False)
-    .str.replace(",", ".", regex=False)
-    .str.strip()
-)
-# Converte para número, trata NaN como 0.0 para cálculos
-dados_existentes["VALOR_NUM"] = pd.to_numeric(dados_existentes["VALOR_NUM"], errors="coerce").fillna(0.0)
-
 
 # -------------------- PREPARAR DATAFRAME PARA EXIBIÇÃO --------------------
+# Só a página visível é convertida para o texto da planilha e enviada ao
+# navegador; por padrão, a última (pedidos mais recentes)
+TAMANHOS_PAGINA = [50, 100, 500, 1000]
+
+col_tamanho, col_pagina, col_info = st.columns([1, 1, 2])
+tamanho_pagina = col_tamanho.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1)
+total_paginas = max(1, -(-len(dados_existentes) // tamanho_pagina))
+pagina = col_pagina.number_input(
+    "Página", min_value=1, max_value=total_paginas, value=total_paginas, step=1
+)
 
-# 2. ISOLAR E CONVERTER: Cria um novo DataFrame que herda apenas os dados como string
-# Removemos a coluna VALOR_NUM, pois ela é float64 e não deve ser exibida.
-colunas_para_mostrar = [col for col in dados_existentes.columns if col != "VALOR_NUM"]
-
-# Cria o DataFrame de exibição, selecionando apenas as colunas originais
-df_show = dados_existentes[colunas_para_mostrar].copy()
-
-# Converte TUDO para string no DataFrame de exibição
-df_show = df_show.astype(str) 
+inicio = (int(pagina) - 1) * tamanho_pagina
+fim = min(inicio + tamanho_pagina, len(dados_existentes))
+col_info.caption(f"Linhas {inicio + 1} a {fim} de {len(dados_existentes)}")
 
-# Exibir tabela limpa (Linha 124 no seu novo traceback)
-st.dataframe(df_show) 
+df_show = para_planilha(dados_existentes.iloc[inicio:fim][colunas_para_mostrar])
+st.dataframe(df_show)
 
 # -------------------- CARD DE SOMA --------------------
-# 3. CÁLCULO DA SOMA (Usa a coluna numérica original de dados_existentes)
-soma = dados_existentes["VALOR_NUM"].sum()
+# Soma da aba inteira (VALOR já vem numérico do repositório; vazios são ignorados)
+soma = dados_existentes["VALOR"].sum()
 
 st.markdown(
 # ... (o código do st.markdown para o CARD DE SOMA) ...
@@ -159,15 +147,11 @@ st.markdown(
 # ...
 
 # -------------------- FORMULÁRIO --------------------
-UNIDADE = [
-    "ADMINISTRATIVO", "CEL.FABRICIANO", "DURVAL DE BARROS", "EXPEDIÇÃO", "GARANTIA",
-    "INDUSTRIA", "ITAUNA", "JARDIM MONTANHÊS", "LAGOA SANTA", "LAVRAS",
-    "MONTES CLAROS", "OLIVEIRA", "PREDIO ADM", "SÃO MARCOS", "VENDA DE VEICULOS",
-    "IPATINGA", "MORRO ALTO", "NEVES", "NOVA LIMA", "VARGINHA", "VESPASIANO",
-]
+# Listas de UNIDADE, STATUS e AVALIACAO em comum/cadastro.py (usadas também na
+# validação dos lotes)
 
-STATUS = ["APROVADA", "NÃO APROVADA", "COTAÇÃO", "PEDIDO"]
-AVALIACAO = ["EXPEDIÇÃO", "FINANCEIRO", "UNIDADE"]
+# Gravações passam pela fila do processo: envios simultâneos viram um só append
+fila = get_fila_escrita()
 
 with st.form(key="vendor_form"):
     pedido = st.sidebar.text_input(label="Pedido/Solicitação*")
@@ -193,21 +177,15 @@ with st.form(key="vendor_form"):
             st.stop()
         
 
-        # -------------------- Verificar duplicidade (Ajustado) --------------------
-        if "PEDIDO" in dados_existentes.columns:
-    # Padroniza o pedido de entrada
-            pedido_upper = str(pedido).strip().upper() 
-    
-    # Padroniza a coluna do DataFrame
-            col_pedido = dados_existentes["PEDIDO"].astype(str).str.strip().str.upper()
-    
-    # Compara exatamente
-            if (col_pedido == pedido_upper).any(): # <-- Mudança aqui
-                st.warning(f"O pedido '{pedido}' já foi cadastrado!")
-                st.stop()
+        # -------------------- Verificar duplicidade --------------------
+        # Consulta no índice em cache (inclui os pedidos já gravados por este
+        # processo, que entram no cache assim que o append termina)
+        if pedido in indice_alta(repositorio.versao):
+            st.warning(f"O pedido '{pedido}' já foi cadastrado!")
+            st.stop()
 
         # Criar novo registro
-        dado = pd.DataFrame([{
+        dado = {
             "DATA": data_formatada,
             "UNIDADE": unidade,
             "CARRO | UTILIZAÇÃO": carro,
@@ -217,11 +195,63 @@ with st.form(key="vendor_form"):
             "STATUS": status,
             "AVALIAÇÃO": avaliacao,
             "OBSERVAÇÕES": observacao,
-        }])
+        }
+
+        # Salvar no Google Sheets: só a linha nova é enviada (append)
+        try:
+            resultado = fila.enviar(ABA_ALTA, [dado]).result(timeout=60)[0]
+        except TempoEsgotado:
+            # A gravação continua na fila: reenviar agora criaria um pedido duplicado
+            st.warning(AVISO_PENDENTE)
+            st.stop()
+        if resultado["ERRO"]:
+            st.error(f"Erro ao gravar o pedido na planilha. Erro: {resultado['ERRO']}")
+            st.stop()
 
-        update_df = pd.concat([dados_existentes, dado], ignore_index=True)
+        st.success("Pedido cadastrado com sucesso!")
 
-        # Salvar no Google Sheets
-        conexao.update(worksheet="ALTA", data=update_df)
 
-        st.success("Pedido cadastrado com sucesso!")
+# -------------------- CADASTRO EM LOTE --------------------
+st.markdown("---")
+st.subheader("📥 Cadastro em lote")
+st.caption(
+    "Cole as linhas copiadas do Excel (com o cabeçalho) ou envie um arquivo CSV/XLSX com as colunas: "
+    + ", ".join(COLUNAS_CADASTRO)
+)
+
+texto_lote = st.text_area("Colar pedidos", height=150)
+arquivo_lote = st.file_uploader("Ou envie um arquivo", type=["csv", "xlsx"])
+
+if st.button("VALIDAR E CADASTRAR LOTE"):
+    try:
+        if arquivo_lote is not None:
+            lote = ler_lote(arquivo_lote.getvalue(), arquivo_lote.name)
+        else:
+            lote = ler_lote(texto_lote)
+    except Exception as e:
+        st.error(f"Não foi possível ler o lote. Erro: {e}")
+        st.stop()
+
+    if lote.empty:
+        st.warning("Nenhum pedido no lote.")
+        st.stop()
+
+    registros, recusas = validar_lote(lote, indice_alta(repositorio.versao))
+    if not recusas.empty:
+        st.warning(f"{len(recusas)} linha(s) recusada(s) na validação:")
+        st.dataframe(recusas, hide_index=True)
+
+    if registros:
+        with st.spinner(f"Gravando {len(registros)} pedido(s)..."):
+            try:
+                resultados = pd.DataFrame(fila.enviar(ABA_ALTA, registros).result(timeout=120))
+            except TempoEsgotado:
+                st.warning(AVISO_PENDENTE)
+                st.stop()
+
+        gravados = resultados["LINHA"].notna()
+        if gravados.any():
+            st.success(f"{int(gravados.sum())} pedido(s) cadastrado(s) com sucesso!")
+        if not gravados.all():
+            st.error(f"{int((~gravados).sum())} pedido(s) não gravado(s):")
+            st.dataframe(resultados.loc[~gravados, ["PEDIDO", "ERRO"]], hide_index=True)